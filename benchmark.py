@@ -0,0 +1,572 @@
+"""Замеры производительности: сетка, журнал и история турнира, загрузка списков, отчёты, рейтинги, сервер и окно.
+
+Каждый замер повторяется несколько раз, в результат идут медиана и минимум.
+Результаты выводятся в JSON; с --baseline они сравниваются с сохранённым
+ранее файлом, и при замедлении больше допуска программа завершается с
+кодом 1, так что проверку можно ставить перед выпуском.
+
+    python benchmark.py --output bench.json
+    python benchmark.py --quick --only bracket journal
+    python benchmark.py --baseline bench_baseline.json --tolerance 0.25
+
+Базовые замеры в репозиторий не кладутся: время зависит от машины, и
+чужие цифры дали бы ложные замедления. Базовый файл создаётся на той же
+машине, где потом идёт проверка, — обычно на последней выпущенной версии:
+
+    python benchmark.py --output bench_baseline.json
+
+и пересоздаётся так же после намеренных изменений скорости или смены
+машины. Без файла --baseline сразу завершается с ошибкой (код 2) и
+подсказкой, как его создать.
+
+Замеры не проверяют правильность результатов: это делают тесты в tests/
+(сетка и стратегии, журнал, история, построчная разница, сервер), их
+стоит запускать перед замерами:
+
+    python -m unittest discover -s tests
+
+Замеры окна выполняются без дисплея (платформа Qt offscreen) и
+пропускаются, если PyQt5 не установлен; замеры рейтингов — если не
+установлен NumPy.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from bracket import Bracket, start_event
+from bracket_history import BracketHistory
+from journal import Journal, JournalWriter
+from line_reader import iter_line_batches
+from report_index import ReportIndex
+from requirement_pool import RequirementPool
+from round_log import format_round, render_log
+from server import TournamentServer
+
+FULL_SIZES = (1000, 100000, 1000000)
+QUICK_SIZES = (1000, 100000)
+FULL_REPORTS = (100, 1000, 10000)
+QUICK_REPORTS = (100, 1000)
+RATING_TOURNAMENTS = 10  # Турниров в истории для замеров рейтингов
+SERVER_CLIENTS = 100  # Одновременных судей в замерах сервера
+SERVER_REQUESTS = 5000  # Не больше стольких выборов победителя за замер
+GROUPS = ("bracket", "journal", "history", "lines", "reports", "ratings", "server", "widgets")
+MIN_REGRESSION_SECONDS = 0.001  # Более мелкие разницы — шум таймера
+
+
+class Runner:
+    """Выполняет замеры и собирает результаты по именам."""
+
+    def __init__(self, repeat, quick=False, log=None):
+        self.repeat = repeat
+        self.quick = quick
+        self.results = {}
+        self.log = log or (lambda text: print(text, file=sys.stderr, flush=True))
+
+    def measure(self, name, func, setup=None, repeat=None, **params):
+        """Время func(*setup()) в секундах; setup выполняется перед каждым повтором и не замеряется."""
+        times = []
+        for _ in range(repeat or self.repeat):
+            args = setup() if setup is not None else ()
+            gc.collect()
+            started = time.perf_counter()
+            func(*args)
+            times.append(time.perf_counter() - started)
+        result = dict(params, seconds=statistics.median(times), min=min(times), repeat=len(times))
+        self.results[name] = result
+        self.log(f"{name:<40} {result['seconds'] * 1000:>10.2f} мс")
+        return result
+
+
+def names_for(count):
+    return [f"Участник {i}" for i in range(count)]
+
+
+def repeat_for(count, repeat):
+    """Миллионные замеры повторяются реже, иначе набор идёт слишком долго."""
+    return 1 if count >= 1000000 else repeat
+
+
+def play(bracket, pool=None, rng=None):
+    """Доводит турнир до конца, как кнопка «Следующий этап»: требования, победители, переход."""
+    rng = rng or random.Random(1)
+    while not bracket.is_finished:
+        if pool is not None:
+            bracket.current.requirements = pool.deal(bracket.current)
+        bracket.current.pick_random(rng)
+        bracket.advance()
+    return bracket
+
+
+def display_round(bracket, pool):
+    """Требования раунда и текст протокола, как при показе нового раунда во вкладке."""
+    bracket.current.requirements = pool.deal(bracket.current)
+    return format_round(bracket)
+
+
+def bench_bracket(runner, sizes, workdir):
+    for count in sizes:
+        names = names_for(count)
+        requirements = [f"Требование {i}" for i in range(count)]
+        repeat = repeat_for(count, runner.repeat)
+        runner.measure(
+            f"bracket/start/{count}", lambda: Bracket.start(names, rng=random.Random(1)),
+            repeat=repeat, participants=count
+        )
+        runner.measure(
+            f"bracket/display_round/{count}", display_round,
+            setup=lambda: (Bracket.start(names, rng=random.Random(1)), RequirementPool(requirements, random.Random(1))),
+            repeat=repeat, participants=count
+        )
+        runner.measure(
+            f"bracket/play/{count}", play,
+            setup=lambda: (Bracket.start(names, rng=random.Random(1)), RequirementPool(requirements, random.Random(1))),
+            repeat=repeat, participants=count
+        )
+        runner.measure(
+            f"bracket/render_log/{count}", render_log,
+            setup=lambda: (play(Bracket.start(names, rng=random.Random(1))),),
+            repeat=repeat, participants=count
+        )
+
+
+def winner_events(bracket, limit):
+    """События выбора победителей первого раунда, не больше limit."""
+    current = bracket.current
+    return [
+        {"type": "winner", "round": 1, "group": index, "id": current.ids[current.offsets[index]]}
+        for index in range(min(limit, current.group_count))
+    ]
+
+
+def bench_journal(runner, sizes, workdir):
+    """Сохранение и восстановление турнира (save_tournament_state и загрузка вкладки)."""
+    path = os.path.join(workdir, "journal", "tournament.json")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def fresh_journal(snapshot_every=float("inf")):
+        journal = Journal(path, snapshot_every)
+        journal.remove_files()
+        return journal
+
+    def restore(journal):
+        state, events = journal.load()
+        bracket = Bracket.from_state(state["bracket"]) if state else Bracket([])
+        for event in events:
+            bracket.apply(event)
+        journal.close_file()
+        return bracket
+
+    for count in sizes:
+        names = names_for(count)
+        bracket = Bracket.start(names, rng=random.Random(1))
+        state = {"participants": names, "bracket": bracket.to_state(), "current_round_number": 1}
+        repeat = repeat_for(count, runner.repeat)
+        runner.measure(
+            f"journal/snapshot/{count}", lambda journal: journal.replace_snapshot(dict(state, seq=0)),
+            setup=lambda: (fresh_journal(),), repeat=repeat, participants=count
+        )
+        journal = fresh_journal()
+        journal.replace_snapshot(dict(state, seq=0))
+        runner.measure(f"journal/load_snapshot/{count}", restore, setup=lambda: (journal,), repeat=repeat,
+                       participants=count)
+
+    # Журнал растёт: каждое событие — отдельная запись, как при выборе победителей по одному
+    bracket = Bracket.start(names_for(20000), rng=random.Random(1))
+    start = {"type": "start", "names": bracket.names, "ids": bracket.rounds[0].ids.tolist()}
+    for events_count in (100, 1000, 10000):
+        events = winner_events(bracket, events_count)
+
+        def append_all(journal):
+            for event in events:
+                journal.append(event)
+            journal.close_file()
+
+        def written_journal():
+            journal = fresh_journal()
+            journal.extend([start] + events)
+            journal.close_file()
+            return (journal,)
+
+        runner.measure(f"journal/append/{len(events)}", append_all, setup=lambda: (fresh_journal(),),
+                       events=len(events))
+        runner.measure(f"journal/replay/{len(events)}", restore, setup=written_journal, events=len(events))
+
+
+def play_recorded(names):
+    """Турнир до конца с записью в историю, как во вкладке: победители по одному, затем переход."""
+    rng = random.Random(1)
+    bracket = Bracket([])
+    history = BracketHistory()
+    history.record(bracket, [start_event(names, rng=rng)], "do")
+    while not bracket.is_finished:
+        current = bracket.current
+        winners = []
+        for group in range(current.group_count):
+            members = current.ids[current.offsets[group]:current.offsets[group + 1]]
+            winners.append({"type": "winner", "round": bracket.round_number, "group": group, "id": rng.choice(members)})
+        history.record(bracket, winners, "do")
+        history.record(bracket, [{"type": "advance"}], "do")
+    return history, bracket
+
+
+def bench_history(runner, sizes, workdir):
+    """Запись истории, просмотр прошлых моментов, отмена и повтор хода."""
+    for count in sizes:
+        names = names_for(count)
+        repeat = repeat_for(count, runner.repeat)
+        runner.measure(f"history/record/{count}", play_recorded, setup=lambda: (names,), repeat=repeat,
+                       participants=count)
+        history, bracket = play_recorded(names)
+        positions = random.Random(1).sample(range(history.position + 1), min(100, history.position + 1))
+        runner.measure(
+            f"history/state_at/{count}", lambda: [history.state_at(position) for position in positions],
+            repeat=repeat, participants=count, positions=len(positions)
+        )
+
+        def undo_redo():
+            history.undo(bracket)
+            history.undo(bracket)  # Переход и выбор победителей последнего раунда
+            history.redo(bracket)
+            history.redo(bracket)
+
+        runner.measure(f"history/undo_redo/{count}", undo_redo, repeat=repeat, participants=count)
+
+
+def write_lines_file(path, count):
+    with open(path, "w", encoding="utf-8") as file:
+        file.writelines(f"Участник {i}\n" for i in range(count))
+
+
+def bench_lines(runner, sizes, workdir):
+    """Чтение файла списка пачками, как в LoadLinesThread."""
+    for count in sizes:
+        path = os.path.join(workdir, f"lines_{count}.txt")
+        write_lines_file(path, count)
+
+        def consume():
+            for _ in iter_line_batches(path):
+                pass
+
+        runner.measure(f"lines/read/{count}", consume, repeat=repeat_for(count, runner.repeat), lines=count)
+
+
+def bench_reports(runner, sizes, workdir):
+    """Индекс отчётов при большом числе файлов в json_folder: импорт, страницы, поиск."""
+    sample = play(Bracket.start(names_for(16), rng=random.Random(1)))
+    report = {
+        "participants": sample.names,
+        "winner": sample.names[sample.champion],
+        "finalists": [sample.names[i] for i in sample.strategy.finalists(sample)],
+        "bracket": sample.to_state(),
+    }
+    text = json.dumps(report, ensure_ascii=False)
+    for count in QUICK_REPORTS if runner.quick else FULL_REPORTS:
+        folder = os.path.join(workdir, f"reports_{count}")
+        os.makedirs(folder, exist_ok=True)
+        for report_id in range(1, count + 1):
+            with open(os.path.join(folder, f"tournament_{report_id}.json"), "w", encoding="utf-8") as file:
+                file.write(text)
+        index_path = os.path.join(workdir, f"reports_{count}.sqlite3")
+
+        def fresh_index():
+            if os.path.exists(index_path):
+                os.remove(index_path)
+            return ()
+
+        def import_reports():
+            ReportIndex(index_path, folder).close()
+
+        runner.measure(f"reports/import/{count}", import_reports, setup=fresh_index,
+                       repeat=1 if count >= 10000 else runner.repeat, reports=count)
+        index = ReportIndex(index_path, folder)
+        runner.measure(f"reports/list/{count}", lambda: (index.count(), index.list_reports(0, 100),
+                                                         index.list_reports(max(0, count - 100), 100)),
+                       reports=count)
+        runner.measure(f"reports/search/{count}", lambda: (index.count("Участник 3"),
+                                                           index.list_reports(0, 100, "Участник 3")),
+                       reports=count)
+        index.close()
+
+
+def bench_ratings(runner, sizes, workdir):
+    """Рейтинги участников: досчёт по истории из RATING_TOURNAMENTS турниров и посев по рейтингу."""
+    try:
+        from participant_store import ParticipantStore
+    except ImportError:
+        runner.log("NumPy не установлен: замеры рейтингов пропущены")
+        return
+    for count in sizes:
+        names = names_for(count)
+        folder = os.path.join(workdir, f"ratings_{count}")
+        os.makedirs(folder, exist_ok=True)
+        index = ReportIndex(os.path.join(workdir, f"ratings_{count}.sqlite3"), folder)
+        for seed in range(RATING_TOURNAMENTS):
+            index.add_report(names, play(Bracket.start(names, rng=random.Random(seed))))
+        store_path = os.path.join(workdir, f"participants_{count}.sqlite3")
+
+        def fresh_store():
+            if os.path.exists(store_path):
+                os.remove(store_path)
+            return (ParticipantStore(store_path),)
+
+        def update(store):
+            store.update(index)
+            store.close()
+
+        repeat = repeat_for(count, runner.repeat)
+        matches = RATING_TOURNAMENTS * (count - 1)
+        runner.measure(f"ratings/update/{count}", update, setup=fresh_store, repeat=repeat, matches=matches)
+        store = ParticipantStore(store_path)
+        runner.measure(f"ratings/seeded/{count}", lambda: store.seeded(names), repeat=repeat, participants=count)
+        store.close()
+        index.close()
+
+
+async def http_exchange(reader, writer, path, payload, key):
+    """POST в открытом соединении keep-alive; статус ответа."""
+    body = json.dumps(payload).encode("utf-8")
+    writer.write((
+        f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n"
+        f"Idempotency-Key: {key}\r\n\r\n"
+    ).encode("latin-1") + body)
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    length = next(int(line.split(":", 1)[1]) for line in lines if line.lower().startswith("content-length:"))
+    await reader.readexactly(length)
+    return int(lines[0].split()[1])
+
+
+async def judge(port, submissions):
+    """Один судья: свои выборы победителей подряд в одном соединении."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for key, group, winner in submissions:
+            status = await http_exchange(reader, writer, f"/rounds/1/groups/{group}/winner", {"winner": winner}, key)
+            if status != 200:
+                raise RuntimeError(f"Сервер ответил {status} на выбор победителя группы {group}")
+    finally:
+        writer.close()
+
+
+def bench_server(runner, sizes, workdir):
+    """Сетевой режим: SERVER_CLIENTS судей одновременно присылают победителей первого раунда.
+
+    В замер входит и запись журнала: сервер отвечает только после неё, а
+    остановка дописывает всё принятое.
+    """
+    writers = []
+    for count in sizes:
+        names = names_for(count)
+        bracket = Bracket.start(names, rng=random.Random(1))
+        groups = bracket.groups()[:SERVER_REQUESTS]
+        submissions = [(f"{count}-{index}", index + 1, members[0]) for index, members in enumerate(groups)]
+        if not submissions:
+            continue
+        shares = [submissions[start::SERVER_CLIENTS] for start in range(SERVER_CLIENTS)]
+        repeat = repeat_for(count, runner.repeat)
+
+        def fresh_server():
+            folder = tempfile.mkdtemp(dir=workdir)
+            server = TournamentServer("bench", None, None, None, log=lambda text: None)
+            writer = JournalWriter(on_error=server.journal_write_failed)
+            writers.append(writer)
+            server.journal = Journal(os.path.join(folder, "tournament.json"), writer=writer)
+            server.open(names, rng=random.Random(1))
+            return (server,)
+
+        async def load(server):
+            port = await server.start("127.0.0.1", 0)
+            await asyncio.gather(*(judge(port, share) for share in shares if share))
+            await server.stop()
+
+        runner.measure(
+            f"server/winners/{count}", lambda server: asyncio.run(load(server)), setup=fresh_server,
+            repeat=repeat, participants=count, requests=len(submissions), clients=SERVER_CLIENTS
+        )
+    for writer in writers:
+        writer.stop()
+
+
+def bench_widgets(runner, sizes, workdir):
+    """Заполнение виджетов без дисплея: списки имён, таблица результатов, протокол, отчёты."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtWidgets import QApplication, QListView, QTextEdit
+    except ImportError:
+        runner.log("PyQt5 не установлен: замеры окна пропущены")
+        return
+    from name_list_model import CheckableNameListModel
+    from report_browser import ReportBrowser
+    from results_panel import RoundResultsPanel
+
+    app = QApplication.instance() or QApplication([])
+    for count in sizes:
+        names = names_for(count)
+        repeat = repeat_for(count, runner.repeat)
+
+        def fill_list(view, model):
+            for start in range(0, count, 5000):  # Пачками, как приходят из LoadLinesThread
+                model.append_names(names[start:start + 5000])
+            app.processEvents()
+
+        def list_view():
+            view = QListView()
+            model = CheckableNameListModel(view)
+            view.setUniformItemSizes(True)
+            view.setModel(model)
+            view.show()
+            return view, model
+
+        runner.measure(f"widgets/name_list/{count}", fill_list, setup=list_view, repeat=repeat, participants=count)
+
+        panel = RoundResultsPanel()
+        panel.show()
+        bracket = Bracket.start(names, rng=random.Random(1))
+
+        def show_round():
+            panel.set_round(bracket)
+            app.processEvents()
+
+        runner.measure(f"widgets/results_panel/{count}", show_round, repeat=repeat, participants=count)
+        panel.close()
+
+        display = QTextEdit()
+        display.setReadOnly(True)
+        display.show()
+
+        def append_round():
+            display.clear()
+            display.append(format_round(bracket))
+            app.processEvents()
+
+        runner.measure(f"widgets/round_log/{count}", append_round, repeat=repeat, participants=count)
+        display.close()
+
+    # Окно отчётов открывается на самом большом индексе из замеров reports
+    for count in reversed(FULL_REPORTS):
+        index_path = os.path.join(workdir, f"reports_{count}.sqlite3")
+        if not os.path.exists(index_path):
+            continue
+        index = ReportIndex(index_path, os.path.join(workdir, f"reports_{count}"))
+
+        def open_browser():
+            browser = ReportBrowser(index)
+            browser.show()
+            app.processEvents()
+            browser.close()
+
+        runner.measure(f"widgets/report_browser/{count}", open_browser, reports=count)
+        index.close()
+        break
+
+
+BENCHMARKS = {
+    "bracket": bench_bracket,
+    "journal": bench_journal,
+    "history": bench_history,
+    "lines": bench_lines,
+    "reports": bench_reports,
+    "ratings": bench_ratings,
+    "server": bench_server,
+    "widgets": bench_widgets,
+}
+
+
+def compare(results, baseline, tolerance):
+    """Замедления относительно baseline: список (имя, было, стало, отношение)."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        before, after = previous["seconds"], result["seconds"]
+        if after - before > MIN_REGRESSION_SECONDS and after > before * (1 + tolerance):
+            regressions.append((name, before, after, after / before if before else float("inf")))
+    return regressions
+
+
+def read_baseline(path):
+    """Замеры из файла базовых результатов; ValueError с подсказкой, если файла нет или он не тот."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)["results"]
+    except FileNotFoundError:
+        raise ValueError(
+            f"Нет файла базовых замеров {path}. Создайте его на этой машине: python benchmark.py --output {path}"
+        ) from None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Не удалось прочитать базовые замеры {path}: {e}") from None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Замеры производительности турнирной схемы")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, help="Только указанные группы замеров")
+    parser.add_argument("--sizes", nargs="+", type=int, help=f"Число участников (по умолчанию {FULL_SIZES})")
+    parser.add_argument(
+        "--quick", action="store_true", help=f"Без самых долгих замеров: участников {QUICK_SIZES}, отчётов {QUICK_REPORTS}"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов каждого замера")
+    parser.add_argument("--output", help="Сохранить результаты в JSON-файл (иначе — вывод в stdout)")
+    parser.add_argument(
+        "--baseline", help="JSON-файл прошлых результатов для сравнения (создаётся через --output на этой машине)"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Допустимое замедление, доля (0.25 = 25%%)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    baseline = None
+    if args.baseline:
+        # Проверяется до замеров, чтобы не ждать их впустую
+        try:
+            baseline = read_baseline(args.baseline)
+        except ValueError as e:
+            print(f"Ошибка: {e}", file=sys.stderr)
+            return 2
+    sizes = tuple(args.sizes or (QUICK_SIZES if args.quick else FULL_SIZES))
+    runner = Runner(args.repeat, args.quick)
+    workdir = tempfile.mkdtemp(prefix="tournament_bench_")
+    try:
+        for group in GROUPS:
+            if not args.only or group in args.only:
+                BENCHMARKS[group](runner, sizes, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": runner.results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if baseline is not None:
+        regressions = compare(runner.results, baseline, args.tolerance)
+        for name, before, after, ratio in regressions:
+            print(f"Замедление {name}: {before * 1000:.2f} мс -> {after * 1000:.2f} мс (×{ratio:.2f})",
+                  file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"Замедлений больше {args.tolerance:.0%} нет", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
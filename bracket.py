@@ -0,0 +1,385 @@
+"""Движок турнирной сетки без зависимостей от Qt.
+
+Участники хранятся по номерам (индексам в списке имён), раунд — это
+компактный массив номеров и таблица смещений групп, поэтому сетку на
+миллион участников можно построить и продвинуть из обычного скрипта.
+"""
+import random
+from array import array
+from bisect import bisect_right
+
+NO_WINNER = -1
+SHUFFLE_VECTOR_MIN = 1 << 16  # С этого числа участников перестановку строит NumPy, если он установлен
+
+
+def group_offsets(count):
+    """Таблица смещений групп по правилу display_round.
+
+    При нечётном числе участников первая группа — тройка, остальные — пары;
+    один оставшийся участник образует группу из одного.
+    """
+    offsets = array("l", [0])
+    if count < 2:
+        if count:
+            offsets.append(count)
+        return offsets
+    offsets.extend(range(3 if count % 2 else 2, count + 1, 2))
+    return offsets
+
+
+def shuffled_ids(count, rng):
+    """Случайная перестановка номеров 0..count-1, воспроизводимая при одном и том же rng.
+
+    Небольшие списки перемешиваются rng.shuffle, как раньше. Для больших
+    перестановку строит NumPy с зерном из rng — миллион участников за
+    десятки миллисекунд вместо секунды; без NumPy — тасование Фишера —
+    Йейтса на rng.random(), которое быстрее rng.shuffle.
+    """
+    if count < SHUFFLE_VECTOR_MIN:
+        ids = list(range(count))
+        rng.shuffle(ids)
+        return ids
+    try:
+        import numpy as np  # Нужен только для больших турниров
+    except ImportError:
+        ids = list(range(count))
+        next_random = rng.random
+        for i in range(count - 1, 0, -1):
+            j = int(next_random() * (i + 1))
+            ids[i], ids[j] = ids[j], ids[i]
+        return ids
+    return np.random.default_rng(rng.getrandbits(64)).permutation(count).tolist()
+
+
+class BracketSchedule:
+    """Форма турнира, рассчитанная один раз при старте.
+
+    Для каждого раунда: число участников, пар, троек и свободных проходов
+    (групп из одного). Отсюда число групп, требований раунда и всего
+    турнира, а также номер раунда по числу оставшихся участников или по
+    порядковому номеру требования — без пересчёта в цикле при каждом вопросе.
+    Форма рассчитана в предположении, что в каждой группе выбран победитель.
+    """
+
+    def __init__(self, shapes):
+        """shapes — последовательность (участников, пар, троек, свободных проходов) по раундам."""
+        self.participants = array("l")
+        self.pairs = array("l")
+        self.triples = array("l")
+        self.byes = array("l")
+        # requirement_offsets[r] — сколько требований выдано до раунда r
+        self.requirement_offsets = array("l", [0])
+        self.round_by_participants = {}
+        for participants, pairs, triples, byes in shapes:
+            self.round_by_participants.setdefault(participants, len(self.participants))
+            self.participants.append(participants)
+            self.pairs.append(pairs)
+            self.triples.append(triples)
+            self.byes.append(byes)
+            self.requirement_offsets.append(self.requirement_offsets[-1] + pairs + triples)
+
+    @classmethod
+    def knockout(cls, count):
+        """Выбывание по правилу display_round: в раунде r остаётся count >> r участников."""
+        sizes = (count >> r for r in range(max(0, count.bit_length() - 1)))
+        return cls((size, size // 2 - size % 2, size % 2, 0) for size in sizes)
+
+    @classmethod
+    def seeded(cls, count):
+        """Выбывание по посеву: первый раунд дополнен свободными проходами до степени двойки."""
+        size = 1 << max(0, count - 1).bit_length()
+        if count < 2:
+            return cls(())
+        first = (count, count - size // 2, 0, size - count)
+        rest = ((size >> r, size >> (r + 1), 0, 0) for r in range(1, size.bit_length() - 1))
+        return cls([first, *rest])
+
+    def __len__(self):
+        return len(self.participants)
+
+    @property
+    def total_requirements(self):
+        return self.requirement_offsets[-1]
+
+    def group_count(self, index):
+        return self.pairs[index] + self.triples[index] + self.byes[index]
+
+    def requirements_in(self, index):
+        return self.requirement_offsets[index + 1] - self.requirement_offsets[index]
+
+    def round_index(self, participants):
+        """Индекс первого раунда с данным числом участников или None."""
+        return self.round_by_participants.get(participants)
+
+    def round_of_requirement(self, position):
+        """Индекс раунда, в котором выдаётся требование с порядковым номером position (с 0)."""
+        if not 0 <= position < self.total_requirements:
+            raise IndexError(f"Требования с номером {position} в турнире нет")
+        return bisect_right(self.requirement_offsets, position) - 1
+
+
+class KnockoutPairing:
+    """Стратегия по умолчанию: жеребьёвка и выбывание по правилу display_round.
+
+    Стратегия решает, как составить первый раунд, следующий раунд по итогам
+    текущего и кто победил в турнире. Она не хранит собственного состояния:
+    всё выводится из раундов сетки, поэтому повтор журнала детерминирован.
+    Другие стратегии — в pairing.py.
+    """
+    name = "random"
+
+    def __init__(self, shuffle=True):
+        self.shuffle = shuffle
+
+    def to_state(self):
+        return {"name": self.name, "shuffle": self.shuffle}
+
+    def first_round(self, count, rng):
+        """Порядок участников и таблица смещений групп (None — по правилу display_round)."""
+        return shuffled_ids(count, rng) if self.shuffle else list(range(count)), None
+
+    def schedule(self, count):
+        """Форма турнира на count участников (см. BracketSchedule)."""
+        return BracketSchedule.knockout(count)
+
+    def next_round(self, bracket):
+        """Следующий раунд из победителей текущего; None, если турнир окончен."""
+        winners = bracket.current.chosen_winners()
+        return Round(winners) if len(winners) > 1 else None
+
+    def champion(self, bracket):
+        return bracket.current.chosen_winners()[0]
+
+    def finalists(self, bracket):
+        """Участники финала завершённого турнира: последняя группа сетки."""
+        return list(bracket.current.ids)
+
+
+def strategy_from_state(state):
+    if not state or state.get("name") == KnockoutPairing.name:
+        return KnockoutPairing(**{key: value for key, value in (state or {}).items() if key != "name"})
+    import pairing  # pairing импортирует этот модуль, поэтому импорт отложенный
+    return pairing.strategy_from_state(state)
+
+
+def start_event(names, shuffle=True, rng=random, strategy=None):
+    """Событие начала турнира: имена, стратегия и состав групп первого раунда."""
+    strategy = strategy or KnockoutPairing(shuffle)
+    ids, offsets = strategy.first_round(len(names), rng)
+    event = {"type": "start", "names": list(names), "ids": ids, "strategy": strategy.to_state()}
+    if offsets is not None:
+        event["offsets"] = list(offsets)
+    return event
+
+
+class Round:
+    """Один этап турнира: участники, группы, требования и победители групп."""
+
+    __slots__ = ("ids", "offsets", "requirements", "winners")
+
+    def __init__(self, ids, offsets=None):
+        self.ids = ids if isinstance(ids, array) else array("l", ids)
+        if offsets is None:
+            offsets = group_offsets(len(self.ids))
+        self.offsets = offsets if isinstance(offsets, array) else array("l", offsets)
+        self.requirements = [None] * self.group_count
+        self.winners = array("l", [NO_WINNER]) * self.group_count
+
+    @classmethod
+    def from_groups(cls, groups):
+        """Раунд из списка групп (номеров участников); группа из одного проходит без игры."""
+        ids, offsets = array("l"), array("l", [0])
+        for group in groups:
+            ids.extend(group)
+            offsets.append(len(ids))
+        round_ = cls(ids, offsets)
+        round_.fill_byes()
+        return round_
+
+    def fill_byes(self):
+        """Отмечает победителем единственного участника каждой группы из одного."""
+        offsets = self.offsets
+        for index in range(self.group_count):
+            if offsets[index + 1] - offsets[index] == 1:
+                self.winners[index] = self.ids[offsets[index]]
+
+    @property
+    def group_count(self):
+        return len(self.offsets) - 1
+
+    def group(self, index):
+        """Номера участников группы с индексом index."""
+        return self.ids[self.offsets[index]:self.offsets[index + 1]]
+
+    def set_winner(self, index, participant_id):
+        if participant_id not in self.group(index):
+            raise ValueError(f"Участник {participant_id} не состоит в группе {index + 1}")
+        self.winners[index] = participant_id
+
+    def chosen_winners(self):
+        """Победители групп в порядке групп; группы без победителя пропускаются."""
+        return array("l", (w for w in self.winners if w != NO_WINNER))
+
+    def pick_first(self):
+        """Отмечает победителем первого участника каждой группы."""
+        self.winners = array("l", map(self.ids.__getitem__, self.offsets[:-1]))
+
+    def pick_random(self, rng=random):
+        """Отмечает случайного победителя в каждой группе."""
+        ids, offsets = self.ids, self.offsets
+        self.winners = array("l", (
+            ids[lo + int(rng.random() * (hi - lo))] for lo, hi in zip(offsets, offsets[1:])
+        ))
+
+    def to_state(self):
+        state = {
+            "ids": self.ids.tolist(),
+            "requirements": self.requirements,
+            "winners": self.winners.tolist(),
+        }
+        if self.offsets != group_offsets(len(self.ids)):
+            state["offsets"] = self.offsets.tolist()
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        round_ = cls(state["ids"], state.get("offsets"))
+        requirements = state.get("requirements")
+        if requirements is not None:
+            round_.requirements = list(requirements)
+        winners = state.get("winners")
+        if winners is not None:
+            round_.winners = array("l", winners)
+        return round_
+
+
+class Bracket:
+    """Турнирная сетка: список имён и последовательность раундов."""
+
+    def __init__(self, names, strategy=None):
+        self.names = list(names)
+        self.rounds = []
+        self.champion = NO_WINNER
+        self.strategy = strategy or KnockoutPairing()
+        self.schedule = self.strategy.schedule(len(self.names))
+
+    @classmethod
+    def start(cls, names, shuffle=True, rng=random, strategy=None):
+        """Создаёт сетку и первый раунд; по умолчанию участники перемешиваются."""
+        bracket = cls([])
+        bracket.apply(start_event(names, shuffle, rng, strategy))
+        return bracket
+
+    @property
+    def current(self):
+        return self.rounds[-1] if self.rounds else None
+
+    @property
+    def round_number(self):
+        return len(self.rounds)
+
+    @property
+    def is_finished(self):
+        return self.champion != NO_WINNER
+
+    def group_names(self, index, round_=None):
+        names = self.names
+        return [names[i] for i in (round_ or self.current).group(index)]
+
+    def groups(self, round_=None):
+        """Группы раунда в виде списков имён."""
+        round_ = round_ or self.current
+        names, ids, offsets = self.names, round_.ids, round_.offsets
+        return [[names[i] for i in ids[lo:hi]] for lo, hi in zip(offsets, offsets[1:])]
+
+    def member_id(self, index, name):
+        """Номер участника с именем name в группе index текущего раунда."""
+        for participant_id in self.current.group(index):
+            if self.names[participant_id] == name:
+                return participant_id
+        raise ValueError(f"Участник {name} не состоит в группе {index + 1}")
+
+    def advance(self):
+        """Переводит победителей текущего раунда в следующий.
+
+        Возвращает новый раунд либо None, если определился победитель турнира.
+        Победитель должен быть выбран в каждой группе: иначе участники
+        группы без победителя молча выбыли бы, поэтому это ValueError.
+        """
+        winners = self.current.winners
+        if NO_WINNER in winners:
+            raise ValueError(
+                f"Не выбран победитель в группе {winners.index(NO_WINNER) + 1} "
+                f"(всего групп без победителя: {winners.count(NO_WINNER)})"
+            )
+        next_round = self.strategy.next_round(self)
+        if next_round is None:
+            self.champion = self.strategy.champion(self)
+            return None
+        self.rounds.append(next_round)
+        return next_round
+
+    def apply(self, event):
+        """Применяет событие журнала турнира (см. journal.py).
+
+        События: start — начало турнира, requirements — требования групп
+        раунда, winner — выбор победителя группы, advance — переход к
+        следующему раунду, rewind — отмена переходов: остаются только
+        первые rounds раундов (см. bracket_history.py). Раунды в событиях
+        нумеруются с 1.
+        """
+        kind = event["type"]
+        if kind == "start":
+            self.names = list(event["names"])
+            self.strategy = strategy_from_state(event.get("strategy"))
+            self.schedule = self.strategy.schedule(len(self.names))
+            first_round = Round(event["ids"], event.get("offsets"))
+            if "offsets" in event:
+                first_round.fill_byes()
+            self.rounds = [first_round]
+            self.champion = NO_WINNER
+        elif kind == "requirements":
+            self.rounds[event["round"] - 1].requirements = list(event["requirements"])
+        elif kind == "winner":
+            round_ = self.rounds[event["round"] - 1]
+            if event["id"] == NO_WINNER:
+                round_.winners[event["group"]] = NO_WINNER
+            else:
+                round_.set_winner(event["group"], event["id"])
+        elif kind == "advance":
+            self.advance()
+        elif kind == "rewind":
+            del self.rounds[event["rounds"]:]
+            self.champion = NO_WINNER
+        else:
+            raise ValueError(f"Неизвестное событие турнира: {kind}")
+
+    def winner_names(self, round_=None):
+        names = self.names
+        return [names[i] for i in (round_ or self.current).chosen_winners()]
+
+    def to_state(self):
+        return {
+            "names": self.names,
+            "rounds": [round_.to_state() for round_ in self.rounds],
+            "champion": self.champion,
+            "strategy": self.strategy.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        bracket = cls(state["names"], strategy_from_state(state.get("strategy")))
+        bracket.rounds = [Round.from_state(round_state) for round_state in state.get("rounds", [])]
+        bracket.champion = state.get("champion", NO_WINNER)
+        return bracket
+
+    @classmethod
+    def from_groups(cls, groups):
+        """Восстанавливает сетку из старого формата состояния (списки имён по группам)."""
+        names = [name for group in groups for name in group]
+        bracket = cls(names)
+        offsets = array("l", [0])
+        for group in groups:
+            offsets.append(offsets[-1] + len(group))
+        bracket.rounds.append(Round(array("l", range(len(names))), offsets))
+        return bracket
@@ -0,0 +1,310 @@
+"""История турнира: отмена и повтор ходов, просмотр любого прошлого момента.
+
+Журнал турнира (journal.py) хранит все события с начала турнира, а здесь
+они лежат в памяти в компактном виде: выбор победителя — несколько чисел в
+массивах, а не словарь. Позиция в истории — число применённых событий:
+позиция 0 — состояние до первого события.
+
+Отмена — тоже события, поэтому журнал остаётся только дописываемым, а
+перезапуск воспроизводит отмены как обычные события: выбор победителя
+отменяется выбором прежнего (или NO_WINNER), выдача требований — прежними
+требованиями, переход раунда — событием rewind. Ход — пачка событий одного
+действия; его первое событие помечается полем step: do, undo или redo, и
+по этим пометкам при загрузке восстанавливаются стопки отмены и повтора.
+События без пометки продолжают предыдущий ход. Ход с началом турнира не
+отменяется.
+
+Состояние на любую позицию строится от ближайшей контрольной точки не
+позже неё. Точка ставится после начала турнира, каждого перехода и отмены
+перехода, а внутри раунда — через max(CHECKPOINT_EVERY, групп раунда /
+CHECKPOINTS_PER_ROUND) событий, так что переход к произвольной позиции
+воспроизводит не больше этого числа событий. В точке копируются только
+массивы победителей раундов, изменившихся с прошлой точки (до
+CHECKPOINTS_PER_ROUND копий на раунд); составы групп и требования
+неизменяемы и общие у всех точек. Указатель по раундам и
+группам (round_start, round_end, group_position) даёт позицию начала и
+конца раунда и последнего выбора победителя в группе.
+"""
+from array import array
+from bisect import bisect_right
+
+from bracket import NO_WINNER, Bracket, Round, strategy_from_state
+
+CHECKPOINT_EVERY = 1024  # Не реже чем через столько событий ставится контрольная точка
+CHECKPOINTS_PER_ROUND = 16  # Точек на раунд с большим числом групп
+
+WINNER, OTHER = 0, 1  # Виды событий в компактной записи
+
+
+class Checkpoint:
+    """Состояние сетки на позицию истории.
+
+    rounds — кортежи (участники, границы групп, требования, победители);
+    массив победителей — копия, которая больше не меняется.
+    """
+
+    __slots__ = ("position", "names", "strategy", "champion", "rounds")
+
+    def __init__(self, position, names, strategy, champion, rounds):
+        self.position = position
+        self.names = names
+        self.strategy = strategy
+        self.champion = champion
+        self.rounds = rounds
+
+    def restore(self):
+        """Новая сетка в состоянии точки; её можно менять, не затрагивая историю."""
+        bracket = Bracket(self.names, strategy_from_state(self.strategy))
+        for ids, offsets, requirements, winners in self.rounds:
+            round_ = Round.__new__(Round)
+            round_.ids, round_.offsets, round_.requirements = ids, offsets, requirements
+            round_.winners = array("l", winners)
+            bracket.rounds.append(round_)
+        bracket.champion = self.champion
+        return bracket
+
+
+class BracketHistory:
+    def __init__(self, base=None):
+        """Пустая история, начинающаяся с сетки base (None — с начала турнира).
+
+        base нужна для турниров, журнал которых сохранился не с начала
+        (старые версии очищали его после снимка): её раунды считаются
+        сыгранными до начала истории.
+        """
+        self.kinds = bytearray()
+        self.event_rounds = array("l")
+        self.event_groups = array("l")
+        self.event_ids = array("l")
+        self.previous = array("l")  # Прежний победитель группы для выбора победителя
+        self.other = {}  # Позиция события -> событие, кроме выбора победителя
+        self.other_inverse = {}  # Позиция события -> отменяющее его событие
+        self.round_counts = array("l")  # Число раундов после каждого события
+        self.checkpoints = []
+        self.checkpoint_positions = array("l")
+        self.next_checkpoint = 0  # Позиция, на которой ставится следующая точка
+        self.dirty = set()  # Раунды, победители которых менялись после последней точки
+        self.round_starts = []  # Позиции появления раундов текущей ветви
+        self.decided = []  # По раундам: позиция последнего выбора победителя группы, -1 — не было
+        self.undo_stack = []  # (начало, конец) ходов, которые можно отменить
+        self.redo_stack = []  # (начало, конец) отменённых ходов для повтора
+        self.last_step = None  # Пометка хода, который продолжают события без пометки
+
+        base = base if base is not None else Bracket([])
+        for round_ in base.rounds:
+            self.round_starts.append(0)
+            self.decided.append(array("l", (0 if winner != NO_WINNER else -1 for winner in round_.winners)))
+        self.checkpoint(base)
+
+    @classmethod
+    def replay(cls, events, base=None):
+        """История из событий журнала; возвращает (история, сетка после всех событий)."""
+        bracket = base if base is not None else Bracket([])
+        history = cls(bracket)
+        for event in events:
+            if event["type"] == "log":
+                continue  # Текст протокола теперь строится по сетке
+            history.record(bracket, [event], event.get("step"))
+        return history, bracket
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @property
+    def position(self):
+        return len(self.kinds)
+
+    @property
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    # Запись
+
+    def record(self, bracket, events, step=None):
+        """Применяет события к сетке и добавляет их в историю.
+
+        step — пометка хода (do, undo, redo) или None для продолжения
+        предыдущего хода. Пометка записывается в первое событие, поэтому
+        события нужно передавать в журнал уже после этого вызова.
+        """
+        start = self.position
+        started = False
+        for event in events:
+            started = self.push(bracket, event) or started
+        if not events:
+            return events
+        if step is not None:
+            events[0]["step"] = step
+        end = self.position
+        if started:
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self.last_step = None
+        elif step == "do":
+            self.undo_stack.append((start, end))
+            self.redo_stack.clear()
+            self.last_step = step
+        elif step == "undo":
+            self.redo_stack.append(self.undo_stack.pop())
+            self.last_step = step
+        elif step == "redo":
+            self.redo_stack.pop()
+            self.undo_stack.append((start, end))
+            self.last_step = step
+        elif self.last_step in ("do", "redo") and self.undo_stack and self.undo_stack[-1][1] == start:
+            self.undo_stack[-1] = (self.undo_stack[-1][0], end)
+        return events
+
+    def push(self, bracket, event):
+        """Применяет одно событие; возвращает True для начала турнира."""
+        index = self.position
+        kind = event["type"]
+        if kind == "winner":
+            round_number, group = event["round"], event["group"]
+            previous = bracket.rounds[round_number - 1].winners[group]
+            bracket.apply(event)
+            self.kinds.append(WINNER)
+            self.event_rounds.append(round_number)
+            self.event_groups.append(group)
+            self.event_ids.append(event["id"])
+            self.previous.append(previous)
+            self.round_counts.append(bracket.round_number)
+            self.decided[round_number - 1][group] = index + 1
+            self.dirty.add(round_number - 1)
+            if index + 1 >= self.next_checkpoint:
+                self.checkpoint(bracket)
+            return False
+
+        inverse = None
+        if kind == "requirements":
+            round_number = event["round"]
+            inverse = {
+                "type": "requirements", "round": round_number,
+                "requirements": bracket.rounds[round_number - 1].requirements,
+            }
+        elif kind == "advance":
+            inverse = {"type": "rewind", "rounds": bracket.round_number}
+        rounds_before = bracket.round_number
+        bracket.apply(event)
+        self.kinds.append(OTHER)
+        self.event_rounds.append(0)
+        self.event_groups.append(0)
+        self.event_ids.append(NO_WINNER)
+        self.previous.append(NO_WINNER)
+        self.round_counts.append(bracket.round_number)
+        self.other[index] = {key: value for key, value in event.items() if key not in ("seq", "step")}
+        if inverse is not None:
+            self.other_inverse[index] = inverse
+
+        if kind == "requirements":
+            if index + 1 >= self.next_checkpoint:
+                self.checkpoint(bracket)
+            return False
+        # Начало, переход и отмена перехода меняют состав раундов: указатель и точка обновляются сразу
+        if kind == "start":
+            del self.round_starts[:], self.decided[:]
+        del self.round_starts[bracket.round_number:], self.decided[bracket.round_number:]
+        for round_ in bracket.rounds[len(self.round_starts):]:
+            self.round_starts.append(index + 1)
+            self.decided.append(array("l", [-1]) * round_.group_count)
+        if kind == "start" or bracket.round_number != rounds_before or kind == "rewind":
+            self.checkpoint(bracket)
+        return kind == "start"
+
+    def checkpoint(self, bracket):
+        """Контрольная точка на текущую позицию; неизменившиеся раунды берутся из прошлой точки."""
+        previous = self.checkpoints[-1].rounds if self.checkpoints else []
+        rounds = []
+        for index, round_ in enumerate(bracket.rounds):
+            if index < len(previous) and index not in self.dirty:
+                saved = previous[index]
+                if saved[0] is round_.ids and saved[2] is round_.requirements:
+                    rounds.append(saved)
+                    continue
+            rounds.append((round_.ids, round_.offsets, round_.requirements, array("l", round_.winners)))
+        self.dirty.clear()
+        groups = bracket.current.group_count if bracket.rounds else 0
+        self.next_checkpoint = self.position + max(CHECKPOINT_EVERY, groups // CHECKPOINTS_PER_ROUND)
+        point = Checkpoint(self.position, bracket.names, bracket.strategy.to_state(), bracket.champion, rounds)
+        if self.checkpoints and self.checkpoints[-1].position == point.position:
+            self.checkpoints[-1] = point
+        else:
+            self.checkpoints.append(point)
+            self.checkpoint_positions.append(point.position)
+
+    # События
+
+    def event(self, index):
+        """Событие с номером index (позиция после него — index + 1)."""
+        if self.kinds[index] == WINNER:
+            return {
+                "type": "winner", "round": self.event_rounds[index],
+                "group": self.event_groups[index], "id": self.event_ids[index],
+            }
+        return dict(self.other[index])
+
+    def inverse(self, index):
+        """Событие, отменяющее событие index."""
+        if self.kinds[index] == WINNER:
+            return {
+                "type": "winner", "round": self.event_rounds[index],
+                "group": self.event_groups[index], "id": self.previous[index],
+            }
+        inverse = self.other_inverse.get(index)
+        if inverse is None:
+            raise ValueError(f"Событие {self.other[index]['type']} не отменяется")
+        return dict(inverse)
+
+    # Отмена и повтор
+
+    def undo(self, bracket):
+        """Отменяет последний ход; возвращает отменяющие события для журнала (пусто, если нечего)."""
+        if not self.undo_stack:
+            return []
+        start, end = self.undo_stack[-1]
+        events = [self.inverse(index) for index in range(end - 1, start - 1, -1)]
+        return self.record(bracket, events, "undo")
+
+    def redo(self, bracket):
+        """Повторяет последний отменённый ход; возвращает его события для журнала."""
+        if not self.redo_stack:
+            return []
+        start, end = self.redo_stack[-1]
+        return self.record(bracket, [self.event(index) for index in range(start, end)], "redo")
+
+    # Просмотр прошлого
+
+    def state_at(self, position):
+        """Сетка на позицию position; воспроизводит события только от ближайшей точки."""
+        if not 0 <= position <= self.position:
+            raise ValueError(f"Позиция {position} вне истории 0–{self.position}")
+        point = self.checkpoints[bisect_right(self.checkpoint_positions, position) - 1]
+        bracket = point.restore()
+        for index in range(point.position, position):
+            bracket.apply(self.event(index))
+        return bracket
+
+    def round_count_at(self, position):
+        """Число раундов сетки на позицию position."""
+        if position == 0:
+            return len(self.checkpoints[0].rounds)
+        return self.round_counts[position - 1]
+
+    def round_start(self, round_number):
+        """Позиция, с которой в текущей ветви истории есть раунд round_number."""
+        return self.round_starts[round_number - 1]
+
+    def round_end(self, round_number):
+        """Последняя позиция раунда round_number, до перехода к следующему."""
+        if round_number < len(self.round_starts):
+            return max(self.round_starts[round_number] - 1, 0)
+        return self.position
+
+    def group_position(self, round_number, group):
+        """Позиция сразу после последнего выбора победителя группы или None."""
+        position = self.decided[round_number - 1][group]
+        return position if position >= 0 else None
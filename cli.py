@@ -0,0 +1,450 @@
+"""Пакетный режим: проведение и моделирование турниров без графического интерфейса.
+
+Qt здесь не импортируется, поэтому запуск быстрый и работает без дисплея.
+
+    python cli.py run --seed 42
+    python cli.py run --results results.txt
+    python cli.py run --pairing swiss --swiss-rounds 5
+    python cli.py simulate --count 10000 --workers 8
+    python cli.py odds --ratings ratings.txt --mode sampled --trials 1000000
+    python cli.py odds --ratings ratings.txt --mode averaged --shuffles 64
+    python cli.py serve --port 8765 --auto-advance
+    python cli.py export-history --output resources/history
+    python cli.py ratings --top 20
+    python cli.py ratings --recompute
+    python cli.py ratings --alias "Ваня" "Иван Петров" --versus "Иван Петров" "Пётр Иванов"
+    python cli.py --pairing seeded --seed-by-rating run
+"""
+import argparse
+import os
+import random
+import secrets
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from bracket import NO_WINNER, Bracket, KnockoutPairing
+from line_reader import read_lines
+from report_index import ReportIndex
+from requirement_pool import RequirementPool
+from round_log import render_log
+
+BASE_FOLDER = os.path.join(os.getcwd(), "resources")
+PARTICIPANTS_FILE = os.path.join(BASE_FOLDER, "txt", "participants.txt")
+REQUIREMENTS_FILE = os.path.join(BASE_FOLDER, "txt", "tournament_req.txt")
+REPORTS_FOLDER = os.path.join(BASE_FOLDER, "json_folder")
+REPORT_INDEX_FILE = os.path.join(BASE_FOLDER, "reports.sqlite3")
+ACTIVE_FOLDER = os.path.join(REPORTS_FOLDER, "active")
+HISTORY_FOLDER = os.path.join(BASE_FOLDER, "history")
+PARTICIPANT_STORE_FILE = os.path.join(BASE_FOLDER, "participants.sqlite3")
+
+
+class ResultsPolicy:
+    """Победители из файла результатов: по одному имени на строку, группа за группой."""
+
+    def __init__(self, winners):
+        self.winners = iter(winners)
+
+    def __call__(self, bracket, rng):
+        current = bracket.current
+        for index in range(current.group_count):
+            if current.winners[index] != NO_WINNER:
+                continue  # Свободный проход
+            name = next(self.winners, None)
+            if name is None:
+                raise ValueError(
+                    f"В файле результатов нет победителя для раунда {bracket.round_number}, группы {index + 1}"
+                )
+            current.set_winner(index, bracket.member_id(index, name))
+
+
+def random_policy(bracket, rng):
+    """Случайный победитель в каждой группе."""
+    bracket.current.pick_random(rng)
+
+
+def play_tournament(names, requirements, pick_winners, rng, strategy=None):
+    """Проводит турнир до конца и возвращает сетку.
+
+    Требования раздаются так же, как в окне приложения: без повторов за
+    весь турнир, а их число проверяется до начала. Если список требований
+    пуст, группы остаются без требования. Без strategy — случайная
+    жеребьёвка с выбыванием.
+    """
+    strategy = strategy or KnockoutPairing()
+    pool = None
+    if requirements:
+        pool = RequirementPool(requirements, rng)
+        needed = strategy.schedule(len(names)).total_requirements
+        if pool.remaining < needed:
+            raise ValueError(f"Недостаточно требований для турнира: есть {pool.remaining}, нужно {needed}")
+    bracket = Bracket.start(names, rng=rng, strategy=strategy)
+    while not bracket.is_finished:
+        if pool is not None:
+            bracket.current.requirements = pool.deal(bracket.current)
+        pick_winners(bracket, rng)
+        bracket.advance()
+    return bracket
+
+
+def load_lists(args):
+    names = read_lines(args.participants)
+    if len(names) < 2:
+        raise ValueError(f"В файле {args.participants} меньше 2 участников")
+    requirements = read_lines(args.requirements)
+    if args.seed_by_rating:
+        names = seed_by_rating(args, names)
+    return names, requirements
+
+
+def open_report_index(args):
+    os.makedirs(args.reports, exist_ok=True)
+    os.makedirs(os.path.dirname(os.path.abspath(args.index)), exist_ok=True)
+    report_index = ReportIndex(args.index, args.reports)
+    for file_name, reason in report_index.import_failures:
+        print(f"Не удалось проиндексировать отчёт {file_name}: {reason}", file=sys.stderr)
+    return report_index
+
+
+def open_participant_store(args):
+    # NumPy нужен только для рейтингов
+    from participant_store import ParticipantStore
+    return ParticipantStore(args.ratings_store)
+
+
+def seed_by_rating(args, names):
+    """Имена по убыванию рейтинга; рейтинги сначала досчитываются по новым отчётам."""
+    store = open_participant_store(args)
+    report_index = open_report_index(args)
+    try:
+        store.update(report_index)
+        return store.seeded(names)
+    finally:
+        report_index.close()
+        store.close()
+
+
+def update_ratings(args, report_index):
+    """Досчитывает рейтинги участников по новым отчётам, если хранилище рейтингов уже ведётся."""
+    if not os.path.exists(args.ratings_store):
+        return
+    store = open_participant_store(args)
+    try:
+        store.update(report_index)
+    finally:
+        store.close()
+
+
+def pairing_strategy(args):
+    """Стратегия жеребьёвки по параметрам командной строки; None — случайная с выбыванием."""
+    if args.pairing == "random":
+        return None
+    from pairing import PoolsPairing, SeededPairing, SwissPairing
+    if args.pairing == "seeded":
+        return SeededPairing()
+    if args.pairing == "swiss":
+        return SwissPairing(args.swiss_rounds)
+    return PoolsPairing(args.pool_size, args.pool_advance)
+
+
+def run_command(args):
+    names, requirements = load_lists(args)
+    if args.results:
+        pick_winners = ResultsPolicy(read_lines(args.results))
+    else:
+        pick_winners = random_policy
+    bracket = play_tournament(names, requirements, pick_winners, random.Random(args.seed), pairing_strategy(args))
+    if args.no_report:
+        print(render_log(bracket))
+    else:
+        report_index = open_report_index(args)
+        report_id = report_index.add_report(names, bracket)
+        update_ratings(args, report_index)
+        report_index.close()
+        print(f"Отчёт сохранён: tournament_{report_id}.json")
+        print(f"Победитель: {bracket.names[bracket.champion]}")
+    return 0
+
+
+# Данные рабочего процесса пула, передаются один раз через initializer
+worker_names = []
+worker_requirements = []
+worker_args = None
+
+
+def init_worker(names, requirements, args):
+    global worker_names, worker_requirements, worker_args
+    worker_names = names
+    worker_requirements = requirements
+    worker_args = args
+
+
+def simulate_one(seed, keep_bracket):
+    bracket = play_tournament(
+        worker_names, worker_requirements, random_policy, random.Random(seed), pairing_strategy(worker_args)
+    )
+    return bracket.names[bracket.champion], bracket if keep_bracket else None
+
+
+def simulate_command(args):
+    names, requirements = load_lists(args)
+    base_seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    seeds = range(base_seed, base_seed + args.count)
+    report_index = open_report_index(args) if args.save_reports else None
+
+    wins = Counter()
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+            max_workers=args.workers, initializer=init_worker, initargs=(names, requirements, args)) as executor:
+        chunk_size = max(1, args.count // ((args.workers or os.cpu_count() or 1) * 4))
+        for winner, bracket in executor.map(
+                simulate_one, seeds, [args.save_reports] * args.count, chunksize=chunk_size):
+            wins[winner] += 1
+            if report_index is not None:
+                report_index.add_report(names, bracket)
+    elapsed = time.perf_counter() - started
+    if report_index is not None:
+        update_ratings(args, report_index)
+        report_index.close()
+
+    for name, count in wins.most_common(10):
+        print(f"{name}: {count} побед ({count * 100 / args.count:.2f}%)")
+    print(f"Турниров: {args.count}, время: {elapsed:.2f} с, "
+          f"скорость: {args.count / elapsed:.1f} турниров/с")
+    return 0
+
+
+DEFAULT_RATING = 1500.0
+
+
+def read_ratings(path, names):
+    """Рейтинги из файла со строками вида «имя;рейтинг»; остальным — DEFAULT_RATING."""
+    ratings = {}
+    if path:
+        for line in read_lines(path):
+            name, _, rating = line.rpartition(";")
+            if not name:
+                raise ValueError(f"Строка рейтинга без разделителя «;»: {line}")
+            ratings[name.strip()] = float(rating)
+    return [ratings.get(name, DEFAULT_RATING) for name in names]
+
+
+def odds_command(args):
+    # NumPy нужен только для расчёта шансов, поэтому импортируется здесь
+    import csv
+    import numpy as np
+    from simulation import (
+        strengths_from_ratings, exact_probabilities, averaged_draw_probabilities, sampled_probabilities
+    )
+
+    names = read_lines(args.participants)
+    if len(names) < 2:
+        raise ValueError(f"В файле {args.participants} меньше 2 участников")
+    ratings = read_ratings(args.ratings, names)
+    strengths = strengths_from_ratings(ratings)
+
+    started = time.perf_counter()
+    if args.mode == "exact":
+        if not args.no_shuffle:
+            raise ValueError(
+                "Точный расчёт возможен только для порядка из файла (--no-shuffle); "
+                "для случайной жеребьёвки — --mode averaged или --mode sampled"
+            )
+        result = exact_probabilities(strengths)
+    elif args.mode == "averaged":
+        if args.no_shuffle:
+            result = exact_probabilities(strengths)
+        else:
+            result = averaged_draw_probabilities(strengths, args.shuffles, args.seed)
+    else:
+        order = np.arange(len(names)) if args.no_shuffle else None
+        result = sampled_probabilities(strengths, args.trials, workers=args.workers, seed=args.seed, order=order)
+    elapsed = time.perf_counter() - started
+
+    win, reach = result["win"], result["reach"]
+    print(f"{'Участник':<30} {'Рейтинг':>8} {'Победа':>8} {'Финал':>8}")
+    for i in np.argsort(-win)[:args.top]:
+        print(f"{names[i]:<30} {ratings[i]:>8.0f} {win[i] * 100:>7.2f}% {reach[-1, i] * 100:>7.2f}%")
+    if args.mode == "averaged" and not args.no_shuffle:
+        print(f"Приближённо: среднее точных расчётов по {args.shuffles} случайным жеребьёвкам")
+    print(f"Время расчёта: {elapsed:.2f} с")
+
+    if args.csv:
+        with open(args.csv, "w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["participant", "rating", "win"] + [f"round_{r + 1}" for r in range(len(reach))])
+            for i, name in enumerate(names):
+                writer.writerow([name, ratings[i], win[i]] + reach[:, i].tolist())
+    return 0
+
+
+def serve_command(args):
+    # Сетевой режим подключается только по этой команде
+    from journal import Journal
+    from server import serve
+
+    names, requirements = load_lists(args)
+    os.makedirs(ACTIVE_FOLDER, exist_ok=True)
+    tournament_id = args.tournament or time.strftime("%Y%m%d-%H%M%S-") + secrets.token_hex(3)
+    path = os.path.join(ACTIVE_FOLDER, f"{tournament_id}.json")
+    report_index = open_report_index(args)
+    try:
+        serve(
+            tournament_id, lambda writer: Journal(path, writer=writer), report_index, names, requirements,
+            args.host, args.port, pairing_strategy(args), random.Random(args.seed), args.auto_advance
+        )
+    finally:
+        report_index.close()
+    return 0
+
+
+def export_history_command(args):
+    # NumPy (и pyarrow, если есть) нужны только для архива
+    from history_export import HistoryExport
+
+    report_index = open_report_index(args)
+    try:
+        history = HistoryExport(args.output, None if args.format == "auto" else args.format)
+        started = time.perf_counter()
+        exported = history.update(report_index)
+        elapsed = time.perf_counter() - started
+    finally:
+        report_index.close()
+    rows = history.manifest["rows"]
+    print(f"Выгружено турниров: {exported} за {elapsed:.2f} с")
+    print(f"Архив {args.output} ({history.manifest['format']}): турниров {rows['tournaments']}, "
+          f"групп {rows['groups']}, результатов участников {rows['outcomes']}")
+    return 0
+
+
+def ratings_command(args):
+    store = open_participant_store(args)
+    report_index = open_report_index(args)
+    try:
+        if args.alias and store.add_alias(*args.alias):
+            print(f"Участник «{args.alias[0]}» объединён с «{args.alias[1]}»")
+        started = time.perf_counter()
+        if args.recompute or store.stale:
+            # Архив ускоряет пересчёт, если он ведётся (см. export-history)
+            history = args.history if os.path.exists(os.path.join(args.history, "manifest.json")) else None
+            played = store.recompute(report_index, history)
+            print(f"Рейтинги пересчитаны по турнирам: {played} за {time.perf_counter() - started:.2f} с")
+        else:
+            played = store.update(report_index)
+            print(f"Учтено новых турниров: {played} за {time.perf_counter() - started:.2f} с")
+
+        if args.versus:
+            name, other = args.versus
+            score = store.versus(name, other)
+            if score is None:
+                raise ValueError(f"Нет сыгранных турниров у «{name}» или «{other}»")
+            print(f"Личные встречи {name} — {other}: {score[0]}:{score[1]}")
+        if args.top:
+            print(f"{'Участник':<30} {'Глико':>7} {'±':>5} {'Эло':>7} {'Встреч':>7} {'Побед':>7}")
+            for name, rating, deviation, elo, matches, wins in store.top(args.top):
+                print(f"{name:<30} {rating:>7.0f} {deviation:>5.0f} {elo:>7.0f} {matches:>7} {wins:>7}")
+    finally:
+        report_index.close()
+        store.close()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Турнирная схема без графического интерфейса")
+    parser.add_argument("--participants", default=PARTICIPANTS_FILE, help="Файл участников")
+    parser.add_argument("--requirements", default=REQUIREMENTS_FILE, help="Файл требований")
+    parser.add_argument("--reports", default=REPORTS_FOLDER, help="Папка отчётов")
+    parser.add_argument("--index", default=REPORT_INDEX_FILE, help="Файл индекса отчётов")
+    parser.add_argument(
+        "--pairing", choices=("random", "seeded", "swiss", "pools"), default="random",
+        help="Жеребьёвка: случайная, посев 1–N, швейцарская система, круговые группы + плей-офф"
+    )
+    parser.add_argument("--swiss-rounds", type=int, help="Число туров швейцарской системы (по умолчанию — log2 N)")
+    parser.add_argument("--pool-size", type=int, default=4, help="Размер круговой группы")
+    parser.add_argument("--pool-advance", type=int, default=2, help="Сколько выходит из каждой группы в плей-офф")
+    parser.add_argument("--ratings-store", default=PARTICIPANT_STORE_FILE, help="Файл рейтингов участников")
+    parser.add_argument(
+        "--seed-by-rating", action="store_true",
+        help="Упорядочить участников по рейтингу перед жеребьёвкой (для посева 1–N и групп)"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Провести один турнир")
+    run_parser.add_argument("--results", help="Файл с именами победителей групп по порядку")
+    run_parser.add_argument("--seed", type=int, help="Зерно для жеребьёвки и случайных победителей")
+    run_parser.add_argument("--no-report", action="store_true", help="Вывести протокол вместо сохранения отчёта")
+    run_parser.set_defaults(handler=run_command)
+
+    simulate_parser = commands.add_parser("simulate", help="Смоделировать много независимых турниров")
+    simulate_parser.add_argument("--count", type=int, default=1000, help="Число турниров")
+    simulate_parser.add_argument("--workers", type=int, help="Число процессов (по умолчанию — число ядер)")
+    simulate_parser.add_argument("--seed", type=int, help="Начальное зерно; турнир i использует seed + i")
+    simulate_parser.add_argument("--save-reports", action="store_true", help="Сохранять отчёт каждого турнира")
+    simulate_parser.set_defaults(handler=simulate_command)
+
+    odds_parser = commands.add_parser("odds", help="Рассчитать шансы участников по рейтингам")
+    odds_parser.add_argument("--ratings", help="Файл рейтингов, строки вида «имя;рейтинг»")
+    odds_parser.add_argument(
+        "--mode", choices=("averaged", "exact", "sampled"), default="averaged",
+        help="averaged — точный расчёт, усреднённый по --shuffles случайным жеребьёвкам (приближённо); "
+             "exact — точно для порядка из файла (только с --no-shuffle); sampled — метод Монте-Карло"
+    )
+    odds_parser.add_argument("--trials", type=int, default=100000, help="Число турниров в режиме sampled")
+    odds_parser.add_argument("--shuffles", type=int, default=16, help="Число случайных жеребьёвок в режиме averaged")
+    odds_parser.add_argument("--no-shuffle", action="store_true", help="Без жеребьёвки: порядок как в файле")
+    odds_parser.add_argument("--workers", type=int, help="Число процессов (по умолчанию — число ядер)")
+    odds_parser.add_argument("--seed", type=int, help="Зерно генератора")
+    odds_parser.add_argument("--top", type=int, default=20, help="Сколько участников вывести")
+    odds_parser.add_argument("--csv", help="Сохранить вероятности всех участников в CSV")
+    odds_parser.set_defaults(handler=odds_command)
+
+    serve_parser = commands.add_parser("serve", help="Принимать результаты групп по сети (HTTP и WebSocket)")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="Адрес (0.0.0.0 — все сетевые интерфейсы)")
+    serve_parser.add_argument("--port", type=int, default=8765, help="Порт")
+    serve_parser.add_argument(
+        "--tournament", help="Идентификатор турнира в папке active: продолжить его или начать новый с этим именем"
+    )
+    serve_parser.add_argument(
+        "--auto-advance", action="store_true", help="Переходить к следующему этапу, когда выбраны все победители"
+    )
+    serve_parser.add_argument("--seed", type=int, help="Зерно для жеребьёвки нового турнира")
+    serve_parser.set_defaults(handler=serve_command)
+
+    export_parser = commands.add_parser(
+        "export-history", help="Выгрузить отчёты в колоночный архив для анализа (дописывает новые)"
+    )
+    export_parser.add_argument("--output", default=HISTORY_FOLDER, help="Папка архива")
+    export_parser.add_argument(
+        "--format", choices=("auto", "arrow", "numpy"), default="auto",
+        help="Arrow IPC (нужен pyarrow) или файлы .npy; auto — arrow, если pyarrow установлен"
+    )
+    export_parser.set_defaults(handler=export_history_command)
+
+    ratings_parser = commands.add_parser(
+        "ratings", help="Рейтинги Эло и Глико участников по завершённым турнирам (дописывает новые)"
+    )
+    ratings_parser.add_argument("--recompute", action="store_true", help="Пересчитать рейтинги по всем отчётам")
+    ratings_parser.add_argument(
+        "--history", default=HISTORY_FOLDER, help="Колоночный архив для быстрого пересчёта, если он есть"
+    )
+    ratings_parser.add_argument(
+        "--alias", nargs=2, metavar=("ALIAS", "NAME"), help="Считать ALIAS другим написанием участника NAME"
+    )
+    ratings_parser.add_argument("--versus", nargs=2, metavar=("NAME", "OTHER"), help="Счёт личных встреч двух участников")
+    ratings_parser.add_argument("--top", type=int, default=20, help="Сколько лучших участников вывести (0 — не выводить)")
+    ratings_parser.set_defaults(handler=ratings_command)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
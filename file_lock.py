@@ -0,0 +1,67 @@
+"""Межпроцессная блокировка файла турнира.
+
+Блокировка берётся на отдельный файл «<имя>.lock» и держится, пока турнир
+открыт; второй экземпляр приложения её не получит и не станет писать в тот
+же журнал. Блокировку снимает операционная система, если процесс завершился
+аварийно, поэтому «зависших» блокировок не бывает.
+"""
+import os
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLockedError(OSError):
+    """Файл уже заблокирован другим процессом."""
+
+
+class FileLock:
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    @property
+    def locked(self):
+        return self.file is not None
+
+    def acquire(self):
+        """Берёт блокировку без ожидания; если она занята, вызывает FileLockedError."""
+        if self.file is not None:
+            return
+        file = open(self.path, "a+b")
+        try:
+            if os.name == "nt":
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            raise FileLockedError(f"Файл {self.path} занят другим экземпляром приложения")
+        self.file = file
+
+    def release(self, remove=False):
+        """Снимает блокировку; remove — удалить и сам файл блокировки."""
+        if self.file is None:
+            return
+        if remove:
+            # Удаляем, пока блокировка ещё наша; на Windows открытый файл не удалить
+            try:
+                if os.name != "nt":
+                    os.remove(self.path)
+            except OSError:
+                pass
+        if os.name == "nt":
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.file.close()
+        self.file = None
+        if remove and os.name == "nt":
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -0,0 +1,442 @@
+"""Выгрузка архива турниров в колоночный формат для анализа.
+
+Отчёты хранят сетку турнира (см. report_index.py); здесь она раскладывается
+в нормализованные таблицы с числовыми столбцами, так что для анализа не
+нужно ни разбирать текст протокола, ни создавать объект на каждый матч:
+
+    tournaments   id, finished_at, participants, rounds, champion, strategy
+    participants  id, name                  (единый словарь имён всех турниров)
+    requirements  id, text                  (единый словарь требований)
+    groups        tournament, round, group, size, requirement, winner
+    outcomes      group_row, tournament, round, participant, won
+
+Участники, требования и победители хранятся номерами из словарей; -1 —
+нет значения. outcomes.group_row — номер строки в groups, strategy — индекс
+в списке strategies файла manifest.json.
+
+Формат выбирается по установленным библиотекам. С pyarrow каждая выгрузка
+дописывает в папку таблицы файл Arrow IPC (part-000001.arrow, ...), их
+можно открыть через pyarrow.memory_map или pyarrow.dataset. Без pyarrow
+каждый столбец — файл .npy, который дописывается на месте (заголовок
+фиксированной длины переписывается после записи данных) и открывается
+через numpy.load(path, mmap_mode="r"); строки хранятся парой файлов
+<столбец>.offsets.npy и <столбец>.data.npy (UTF-8).
+
+Выгрузка дописывает только отчёты с номером больше уже выгруженных;
+manifest.json обновляется последним, а при открытии всё записанное после
+него отрезается, поэтому прерванная выгрузка не портит архив.
+"""
+import json
+import os
+
+import numpy as np
+
+from bracket import Bracket
+from file_lock import FileLock, FileLockedError
+
+MANIFEST = "manifest.json"
+BATCH_TOURNAMENTS = 1000  # Турниров в одной записи
+NPY_HEADER_SIZE = 128  # Заголовок .npy фиксированной длины, чтобы его можно было переписать
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+TABLES = {
+    "tournaments": (
+        ("id", "int64"), ("finished_at", "float64"), ("participants", "int32"), ("rounds", "int32"),
+        ("champion", "int32"), ("strategy", "int16"),
+    ),
+    "participants": (("id", "int32"), ("name", "str")),
+    "requirements": (("id", "int32"), ("text", "str")),
+    "groups": (
+        ("tournament", "int64"), ("round", "int16"), ("group", "int32"), ("size", "int16"),
+        ("requirement", "int32"), ("winner", "int32"),
+    ),
+    "outcomes": (
+        ("group_row", "int64"), ("tournament", "int64"), ("round", "int16"), ("participant", "int32"),
+        ("won", "int8"),
+    ),
+}
+
+
+def available_format():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "numpy"
+    return "arrow"
+
+
+class NameDictionary:
+    """Строки -> номера по порядку появления; новые строки копятся до записи."""
+
+    def __init__(self, names=()):
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.added = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, name):
+        number = self.ids.get(name)
+        if number is None:
+            number = self.ids[name] = len(self.ids)
+            self.added.append(name)
+        return number
+
+    def take_added(self):
+        added, self.added = self.added, []
+        return added
+
+
+def tournament_columns(report_id, finished_at, bracket, participants, requirements, strategies):
+    """Строки всех таблиц одного турнира в виде массивов по столбцам."""
+    global_ids = np.fromiter((participants.lookup(name) for name in bracket.names), np.int32, len(bracket.names))
+    strategy = bracket.strategy.to_state().get("name", "")
+    if strategy not in strategies:
+        strategies.append(strategy)
+
+    groups = {name: [] for name, _ in TABLES["groups"]}
+    outcomes = {name: [] for name, _ in TABLES["outcomes"]}
+    for number, round_ in enumerate(bracket.rounds, 1):
+        ids = global_ids[np.asarray(round_.ids, dtype=np.int64)]
+        sizes = np.diff(np.asarray(round_.offsets, dtype=np.int64))
+        local_winners = np.asarray(round_.winners, dtype=np.int64)
+        winners = np.where(local_winners >= 0, global_ids[np.maximum(local_winners, 0)], -1)
+        count = len(sizes)
+        groups["tournament"].append(np.full(count, report_id, np.int64))
+        groups["round"].append(np.full(count, number, np.int16))
+        groups["group"].append(np.arange(count, dtype=np.int32))
+        groups["size"].append(sizes.astype(np.int16))
+        groups["requirement"].append(np.fromiter(
+            (requirements.lookup(text) if text else -1 for text in round_.requirements), np.int32, count
+        ))
+        groups["winner"].append(winners.astype(np.int32))
+
+        # group_row — номер группы внутри турнира; в номер строки таблицы он переводится при записи
+        group_index = np.repeat(np.arange(count, dtype=np.int64), sizes)
+        outcomes["group_row"].append(group_index)
+        outcomes["tournament"].append(np.full(len(ids), report_id, np.int64))
+        outcomes["round"].append(np.full(len(ids), number, np.int16))
+        outcomes["participant"].append(ids.astype(np.int32))
+        outcomes["won"].append((ids == np.repeat(winners, sizes)).astype(np.int8))
+
+    # Номера групп по раундам сдвигаются, чтобы стать сквозными для турнира
+    shift = 0
+    for index, count in enumerate(len(rows) for rows in groups["group"]):
+        outcomes["group_row"][index] += shift
+        shift += count
+
+    tournament = {
+        "id": np.array([report_id], np.int64),
+        "finished_at": np.array([finished_at], np.float64),
+        "participants": np.array([len(bracket.names)], np.int32),
+        "rounds": np.array([bracket.round_number], np.int32),
+        "champion": np.array([global_ids[bracket.champion] if bracket.is_finished else -1], np.int32),
+        "strategy": np.array([strategies.index(strategy)], np.int16),
+    }
+    return tournament, groups, outcomes
+
+
+class NumpyColumns:
+    """Столбцы таблиц в файлах .npy, дописываемых на месте."""
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def path(self, table, column):
+        return os.path.join(self.folder, table, column + ".npy")
+
+    def write_header(self, file, dtype, length):
+        header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (length,)})
+        prefix = b"\x93NUMPY\x01\x00"
+        size = NPY_HEADER_SIZE - len(prefix) - 2
+        text = header.encode("latin-1").ljust(size - 1) + b"\n"
+        file.seek(0)
+        file.write(prefix + size.to_bytes(2, "little") + text)
+
+    def append_array(self, path, values):
+        """Дописывает массив в конец файла .npy и обновляет длину в заголовке."""
+        values = np.ascontiguousarray(values)
+        exists = os.path.exists(path)
+        with open(path, "r+b" if exists else "w+b") as file:
+            length = 0
+            if exists:
+                length = (os.path.getsize(path) - NPY_HEADER_SIZE) // values.dtype.itemsize
+            else:
+                self.write_header(file, values.dtype, 0)
+            file.seek(NPY_HEADER_SIZE + length * values.dtype.itemsize)
+            file.write(values.tobytes())
+            self.write_header(file, values.dtype, length + len(values))
+
+    def truncate_array(self, path, dtype, length):
+        if not os.path.exists(path):
+            return
+        dtype = np.dtype(dtype)
+        with open(path, "r+b") as file:
+            file.truncate(NPY_HEADER_SIZE + length * dtype.itemsize)
+            self.write_header(file, dtype, length)
+
+    def append(self, table, columns, rows_before, strings_before):
+        os.makedirs(os.path.join(self.folder, table), exist_ok=True)
+        for name, dtype in TABLES[table]:
+            values = columns[name]
+            if dtype == "str":
+                encoded = [text.encode("utf-8") for text in values]
+                lengths = np.fromiter((len(data) for data in encoded), np.int64, len(encoded))
+                if rows_before == 0:
+                    self.append_array(self.path(table, name + ".offsets"), np.zeros(1, np.int64))
+                offsets = strings_before[name] + np.cumsum(lengths)
+                self.append_array(self.path(table, name + ".data"), np.frombuffer(b"".join(encoded), np.uint8))
+                self.append_array(self.path(table, name + ".offsets"), offsets)
+            else:
+                self.append_array(self.path(table, name), np.asarray(values, dtype))
+
+    def truncate(self, manifest):
+        """Отрезает записанное после последнего обновления manifest.json."""
+        for table, fields in TABLES.items():
+            rows = manifest["rows"][table]
+            for name, dtype in fields:
+                if dtype == "str":
+                    self.truncate_array(self.path(table, name + ".offsets"), np.int64, rows + 1 if rows else 0)
+                    self.truncate_array(self.path(table, name + ".data"), np.uint8, manifest["bytes"][table][name])
+                else:
+                    self.truncate_array(self.path(table, name), dtype, rows)
+
+    def read_strings(self, table, column):
+        offsets = np.load(self.path(table, column + ".offsets"), mmap_mode="r")
+        data = np.load(self.path(table, column + ".data"), mmap_mode="r")
+        return [bytes(data[offsets[i]:offsets[i + 1]]).decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+class ArrowColumns:
+    """Таблицы в файлах Arrow IPC: каждая выгрузка — новый файл в папке таблицы."""
+
+    def __init__(self, folder):
+        import pyarrow
+        self.pa = pyarrow
+        self.folder = folder
+
+    def schema(self, table):
+        pa = self.pa
+        return pa.schema([
+            (name, pa.string() if dtype == "str" else pa.from_numpy_dtype(np.dtype(dtype)))
+            for name, dtype in TABLES[table]
+        ])
+
+    def append(self, table, columns, part):
+        pa = self.pa
+        folder = os.path.join(self.folder, table)
+        os.makedirs(folder, exist_ok=True)
+        schema = self.schema(table)
+        batch = pa.record_batch([pa.array(columns[name], type=schema.field(name).type) for name, _ in TABLES[table]],
+                                schema=schema)
+        with pa.OSFile(os.path.join(folder, f"part-{part:06d}.arrow"), "wb") as sink:
+            with pa.ipc.new_file(sink, schema) as writer:
+                writer.write_batch(batch)
+
+    def truncate(self, manifest):
+        """Удаляет файлы выгрузок, не попавших в manifest.json."""
+        for table in TABLES:
+            folder = os.path.join(self.folder, table)
+            if not os.path.isdir(folder):
+                continue
+            for file_name in os.listdir(folder):
+                if file_name.startswith("part-") and int(file_name[5:11]) > manifest["parts"]:
+                    os.remove(os.path.join(folder, file_name))
+
+    def read_strings(self, table, column):
+        names = []
+        for file_name in sorted(os.listdir(os.path.join(self.folder, table))):
+            with self.pa.memory_map(os.path.join(self.folder, table, file_name)) as source:
+                names.extend(self.pa.ipc.open_file(source).read_all().column(column).to_pylist())
+        return names
+
+
+class HistoryExport:
+    """Папка колоночного архива турниров; дописывается по мере завершения турниров."""
+
+    def __init__(self, folder, format=None):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self.lock = FileLock(os.path.join(folder, "export.lock"))
+        self.manifest_path = os.path.join(folder, MANIFEST)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as file:
+                self.manifest = json.load(file)
+            if format is not None and format != self.manifest["format"]:
+                raise ValueError(f"Архив {folder} уже записан в формате {self.manifest['format']}")
+        else:
+            self.manifest = {
+                "format": format or available_format(),
+                "last_report": 0,
+                "parts": 0,
+                "strategies": [],
+                "rows": {table: 0 for table in TABLES},
+                "bytes": {table: {name: 0 for name, dtype in fields if dtype == "str"}
+                          for table, fields in TABLES.items()},
+            }
+        self.columns = ArrowColumns(folder) if self.manifest["format"] == "arrow" else NumpyColumns(folder)
+        self.participants = None  # Словари загружаются при первой выгрузке
+        self.requirements = None
+
+    @classmethod
+    def existing(cls, folder):
+        """Архив в папке folder, если его уже начали вести; иначе None."""
+        return cls(folder) if os.path.exists(os.path.join(folder, MANIFEST)) else None
+
+    @property
+    def last_report(self):
+        return self.manifest["last_report"]
+
+    def update(self, report_index):
+        """Дописывает отчёты индекса с номером больше уже выгруженных; возвращает их число.
+
+        Если архив сейчас дописывает другой экземпляр приложения, ничего не
+        делает: пропущенные отчёты попадут в архив при следующем обновлении.
+        """
+        try:
+            self.lock.acquire()
+        except FileLockedError:
+            return 0
+        try:
+            self.reload()
+            exported = 0
+            batch = []
+            for row in report_index.reports_after(self.last_report):
+                batch.append(row)
+                if len(batch) >= BATCH_TOURNAMENTS:
+                    exported += self.append(batch)
+                    batch = []
+            if batch:
+                exported += self.append(batch)
+            return exported
+        finally:
+            self.lock.release()
+
+    def reload(self):
+        """Перечитывает manifest.json (его мог обновить другой процесс) и отрезает недописанное."""
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+            if manifest != self.manifest:
+                self.participants = self.requirements = None
+            self.manifest = manifest
+        self.columns.truncate(self.manifest)
+        if self.participants is None:
+            rows = self.manifest["rows"]
+            self.participants = NameDictionary(
+                self.columns.read_strings("participants", "name") if rows["participants"] else ()
+            )
+            self.requirements = NameDictionary(
+                self.columns.read_strings("requirements", "text") if rows["requirements"] else ()
+            )
+
+    def append(self, reports):
+        """Записывает пачку отчётов (номер, время завершения, JSON сетки); возвращает число выгруженных."""
+        manifest = self.manifest
+        strategies = manifest["strategies"]
+        tables = {table: {name: [] for name, _ in fields} for table, fields in TABLES.items()}
+        group_rows = manifest["rows"]["groups"]
+        last_report = manifest["last_report"]
+        exported = 0
+        for report_id, finished_at, bracket_json in reports:
+            last_report = max(last_report, report_id)
+            if not bracket_json:
+                continue  # Отчёт старого формата: сетки нет, только текст протокола
+            bracket = Bracket.from_state(json.loads(bracket_json))
+            tournament, groups, outcomes = tournament_columns(
+                report_id, (finished_at - UNIX_EPOCH_JULIAN_DAY) * 86400.0, bracket,
+                self.participants, self.requirements, strategies
+            )
+            # Номера групп турнира становятся номерами строк таблицы groups
+            for values in outcomes["group_row"]:
+                values += group_rows
+            group_rows += sum(len(values) for values in groups["group"])
+            for name, values in tournament.items():
+                tables["tournaments"][name].append(values)
+            for name, values in groups.items():
+                tables["groups"][name].extend(values)
+            for name, values in outcomes.items():
+                tables["outcomes"][name].extend(values)
+            exported += 1
+
+        participants_before, requirements_before = manifest["rows"]["participants"], manifest["rows"]["requirements"]
+        new_participants = self.participants.take_added()
+        new_requirements = self.requirements.take_added()
+        columns = {
+            table: {
+                name: np.concatenate(tables[table][name]) if tables[table][name] else np.zeros(0, dtype)
+                for name, dtype in TABLES[table]
+            }
+            for table in ("tournaments", "groups", "outcomes")
+        }
+        columns["participants"] = {
+            "id": np.arange(participants_before, participants_before + len(new_participants), dtype=np.int32),
+            "name": new_participants,
+        }
+        columns["requirements"] = {
+            "id": np.arange(requirements_before, requirements_before + len(new_requirements), dtype=np.int32),
+            "text": new_requirements,
+        }
+
+        part = manifest["parts"] + 1
+        rows = dict(manifest["rows"])
+        sizes = {table: dict(counts) for table, counts in manifest["bytes"].items()}
+        for table, values in columns.items():
+            count = len(values[TABLES[table][0][0]])
+            if not count:
+                continue
+            if isinstance(self.columns, ArrowColumns):
+                self.columns.append(table, values, part)
+            else:
+                self.columns.append(table, values, rows[table], sizes[table])
+            rows[table] += count
+            for name, dtype in TABLES[table]:
+                if dtype == "str":
+                    sizes[table][name] += sum(len(text.encode("utf-8")) for text in values[name])
+
+        self.write_manifest(dict(manifest, last_report=last_report, parts=part, rows=rows, bytes=sizes))
+        return exported
+
+    def write_manifest(self, manifest):
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, ensure_ascii=False, indent=1)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.manifest_path)
+        self.manifest = manifest
+
+
+def open_columns(folder):
+    """Таблицы архива без загрузки в объекты Python.
+
+    Для формата numpy — словарь «таблица -> столбец -> массив numpy.memmap»
+    (строковые столбцы — пара массивов offsets и data); для arrow — словарь
+    «таблица -> pyarrow.Table» поверх отображённых в память файлов.
+    """
+    with open(os.path.join(folder, MANIFEST), "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    tables = {}
+    if manifest["format"] == "arrow":
+        import pyarrow as pa
+        for table in TABLES:
+            folder_path = os.path.join(folder, table)
+            parts = sorted(os.listdir(folder_path)) if os.path.isdir(folder_path) else []
+            batches = [pa.ipc.open_file(pa.memory_map(os.path.join(folder_path, name))).read_all() for name in parts
+                       if int(name[5:11]) <= manifest["parts"]]
+            tables[table] = pa.concat_tables(batches) if batches else None
+        return tables
+    columns = NumpyColumns(folder)
+    for table, fields in TABLES.items():
+        tables[table] = {}
+        if not manifest["rows"][table]:
+            continue
+        for name, dtype in fields:
+            if dtype == "str":
+                tables[table][name] = (
+                    np.load(columns.path(table, name + ".offsets"), mmap_mode="r"),
+                    np.load(columns.path(table, name + ".data"), mmap_mode="r"),
+                )
+            else:
+                tables[table][name] = np.load(columns.path(table, name), mmap_mode="r")
+    return tables
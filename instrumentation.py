@@ -0,0 +1,324 @@
+"""Диагностика производительности: замеры операций, зависания интерфейса, профилирование.
+
+Замеры выключены по умолчанию; выключенный замер — одна проверка флага,
+поэтому декоратор timed можно оставлять на горячих операциях. Включаются
+они в меню «Диагностика» или переменной окружения до запуска:
+
+    TOURNAMENT_DIAGNOSTICS=metrics          замеры и поиск зависаний
+    TOURNAMENT_DIAGNOSTICS=metrics,trace    плюс трасса операций для chrome://tracing
+    TOURNAMENT_DIAGNOSTICS=profile          плюс cProfile с момента запуска
+    TOURNAMENT_DIAGNOSTICS_DIR=diagnostics  куда сохранить всё собранное при выходе
+
+По каждой операции хранится скользящее окно последних замеров, из него
+считаются перцентили и гистограмма по корзинам. Зависанием считается
+время, когда главный поток дольше порога не обрабатывал события; в этот
+момент снимается его стек, так что видно, чем он был занят.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from functools import wraps
+
+WINDOW = 1024  # Последних замеров в окне операции
+BUCKETS = (0.001, 0.004, 0.016, 0.064, 0.25, 1.0, 4.0)  # Верхние границы корзин гистограммы, секунды
+TRACE_LIMIT = 200000  # Операций в трассе; старые вытесняются
+STALL_THRESHOLD = 0.2  # Секунд без обработки событий, после которых интерфейс считается зависшим
+STALL_LIMIT = 100  # Сколько последних зависаний хранить
+PROFILE_TOP = 200  # Функций профиля в JSON
+
+
+class Histogram:
+    """Замеры одной операции: итоги за всё время и скользящее окно последних WINDOW."""
+
+    __slots__ = ("samples", "count", "total", "max")
+
+    def __init__(self):
+        self.samples = deque(maxlen=WINDOW)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        buckets = [0] * (len(BUCKETS) + 1)
+        for seconds in ordered:
+            buckets[bisect_left(BUCKETS, seconds)] += 1
+
+        def percentile(share):
+            return ordered[min(len(ordered) - 1, int(share * len(ordered)))] if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "window": len(ordered),
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "buckets": dict(zip([f"<={bound}" for bound in BUCKETS] + [f">{BUCKETS[-1]}"], buckets)),
+        }
+
+
+class Span:
+    """Замер блока кода: with metrics.span("имя"): ..."""
+
+    __slots__ = ("instrumentation", "name", "started")
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.instrumentation.record(self.name, self.started, time.perf_counter() - self.started)
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self.tracing = False
+        self.lock = threading.Lock()  # Замеры приходят и из потока записи журнала
+        self.histograms = {}
+        self.trace = deque(maxlen=TRACE_LIMIT)  # (имя, начало, длительность, поток)
+        self.stalls = deque(maxlen=STALL_LIMIT)
+        self.profiler = None
+        self.origin = time.perf_counter()
+
+    def span(self, name):
+        return Span(self, name) if self.enabled else NULL_SPAN
+
+    def record(self, name, started, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+            if self.tracing:
+                self.trace.append((name, started, seconds, threading.get_ident()))
+
+    def record_stall(self, stall):
+        with self.lock:
+            self.stalls.append(stall)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.trace.clear()
+            self.stalls.clear()
+
+    # Профилирование
+
+    @property
+    def profiling(self):
+        return self.profiler is not None
+
+    def start_profile(self):
+        """Запускает cProfile в текущем (главном) потоке."""
+        if self.profiler is None:
+            import cProfile  # Нужен только при профилировании
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop_profile(self):
+        """Останавливает профилирование; возвращает собранный профиль или None."""
+        profiler, self.profiler = self.profiler, None
+        if profiler is not None:
+            profiler.disable()
+        return profiler
+
+    # Выгрузка
+
+    def report(self):
+        """Все замеры одним словарём для JSON."""
+        with self.lock:
+            operations = {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+            stalls = list(self.stalls)
+        return {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "operations": operations, "stalls": stalls}
+
+    def chrome_trace(self):
+        """Трасса в формате Chrome Trace Event (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        with self.lock:
+            spans = list(self.trace)
+            stalls = list(self.stalls)
+        events = [
+            {
+                "name": name, "ph": "X", "pid": pid, "tid": thread,
+                "ts": (started - self.origin) * 1e6, "dur": seconds * 1e6,
+            }
+            for name, started, seconds, thread in spans
+        ]
+        events += [
+            {
+                "name": "Зависание интерфейса", "ph": "X", "pid": pid, "tid": stall["thread"],
+                "ts": stall["started"] * 1e6, "dur": stall["seconds"] * 1e6, "args": {"stack": stall["stack"]},
+            }
+            for stall in stalls
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+metrics = Instrumentation()
+
+
+def timed(name):
+    """Декоратор: замеряет каждый вызов функции под именем name, когда замеры включены.
+
+    Обёртка принимает любые аргументы, поэтому к сигналам Qt с аргументами
+    (например, clicked(bool)) её не подключают напрямую — только через lambda.
+    """
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.record(name, started, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def profile_stats(profiler, limit=PROFILE_TOP):
+    """Самые затратные по собственному времени функции профиля списком словарей."""
+    import pstats
+    stats = pstats.Stats(profiler).stats
+    if profiler is metrics.profiler:
+        profiler.enable()  # Сбор статистики останавливает профиль; продолжаем его
+    rows = [
+        {
+            "function": f"{file}:{line}({function})",
+            "calls": calls,
+            "primitive_calls": primitive_calls,
+            "own": own,
+            "cumulative": cumulative,
+        }
+        for (file, line, function), (primitive_calls, calls, own, cumulative, _) in stats.items()
+    ]
+    rows.sort(key=lambda row: row["own"], reverse=True)
+    return rows[:limit]
+
+
+def save_json(path, data):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=1)
+
+
+def save_profile(path, profiler):
+    """Профиль в формате pstats (*.prof) или JSON-список функций (любое другое расширение)."""
+    if path.endswith(".prof"):
+        profiler.dump_stats(path)
+        if profiler is metrics.profiler:
+            profiler.enable()
+    else:
+        save_json(path, profile_stats(profiler))
+
+
+class StallWatchdog:
+    """Фоновый поток, замечающий зависания главного потока.
+
+    Главный поток вызывает beat() по таймеру цикла событий; если очередной
+    вызов запаздывает дольше порога, поток снимает стек главного потока и
+    записывает зависание. Длительность уточняется при следующем beat().
+    """
+
+    def __init__(self, instrumentation=metrics, threshold=STALL_THRESHOLD, on_stall=None):
+        self.instrumentation = instrumentation
+        self.threshold = threshold
+        self.on_stall = on_stall
+        self.main_thread = threading.main_thread().ident
+        self.last_beat = time.perf_counter()
+        self.stall = None  # Текущее незакончившееся зависание
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="stall-watchdog", daemon=True)
+
+    def start(self):
+        self.last_beat = time.perf_counter()
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def beat(self):
+        now = time.perf_counter()
+        stall = self.stall
+        if stall is not None:
+            self.stall = None
+            stall["seconds"] = now - self.last_beat
+            if self.on_stall is not None:
+                self.on_stall(stall)
+        self.last_beat = now
+
+    def run(self):
+        import traceback  # Нужен только сторожевому потоку; не задерживает запуск приложения
+        while not self.stopped.wait(self.threshold / 4):
+            last_beat = self.last_beat
+            lag = time.perf_counter() - last_beat
+            if lag < self.threshold or self.stall is not None:
+                continue
+            frame = sys._current_frames().get(self.main_thread)
+            stall = {
+                "started": last_beat - self.instrumentation.origin,
+                "seconds": lag,
+                "thread": self.main_thread,
+                "stack": traceback.format_stack(frame) if frame is not None else [],
+            }
+            self.stall = stall
+            self.instrumentation.record_stall(stall)
+
+
+def print_stall(stall):
+    """Сообщение о зависании с местом, где стоял главный поток."""
+    where = stall["stack"][-1].strip() if stall["stack"] else "стек недоступен"
+    print(f"Интерфейс не отвечал {stall['seconds'] * 1000:.0f} мс: {where}", file=sys.stderr)
+
+
+def diagnostics_from_environment():
+    """Включённые переменной TOURNAMENT_DIAGNOSTICS режимы: множество из metrics, trace, profile."""
+    value = os.environ.get("TOURNAMENT_DIAGNOSTICS", "")
+    modes = {mode.strip() for mode in value.split(",") if mode.strip()}
+    if value.strip() in ("1", "all"):
+        modes = {"metrics", "trace", "profile"}
+    return modes
+
+
+def save_diagnostics(folder, profiler=None):
+    """Сохраняет замеры, трассу и профиль в папку folder."""
+    os.makedirs(folder, exist_ok=True)
+    save_json(os.path.join(folder, "metrics.json"), metrics.report())
+    if metrics.trace:
+        save_json(os.path.join(folder, "trace.json"), metrics.chrome_trace())
+    if profiler is not None:
+        save_profile(os.path.join(folder, "profile.json"), profiler)
+        profiler.dump_stats(os.path.join(folder, "profile.prof"))
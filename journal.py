@@ -0,0 +1,242 @@
+"""Журнал текущего турнира: снимок состояния плюс дописываемый журнал событий.
+
+Каждое изменение турнира (начало, требования, выбор победителя, переход
+раунда, запись в протокол) дописывается одной строкой JSON в журнал, так что
+стоимость сохранения пропорциональна размеру изменения. Время от времени
+полное состояние записывается снимком через временный файл и атомарное
+переименование. Журнал при этом не очищается — он хранит всю историю
+турнира (см. bracket_history.py), — а снимок запоминает, с какого места
+журнала начинаются события после него. При загрузке снимок дополняется
+событиями журнала с этого места; оборванная при сбое последняя запись
+отбрасывается.
+
+Запись может выполняться в фоновом потоке (JournalWriter): номера событий
+и решение о снимке принимаются сразу, а файловые операции ставятся в
+очередь, так что запись одного турнира не задерживает интерфейс и другие
+турниры. Журнал блокирует файл «<имя>.lock» (см. file_lock.py), чтобы два
+экземпляра приложения не писали в один турнир.
+"""
+import json
+import os
+import queue
+import threading
+
+from file_lock import FileLock
+from instrumentation import timed
+
+SNAPSHOT_EVERY = 1000
+
+
+def dump_line(record):
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class JournalWriter:
+    """Фоновый поток файловых операций журналов; задания выполняются строго по очереди.
+
+    Один поток обслуживает все открытые турниры, поэтому порядок записей
+    каждого журнала сохраняется. Любая ошибка задания (не только ошибка
+    записи) передаётся в on_error (вызывается из фонового потока), а поток
+    продолжает работу: иначе очередь перестала бы разбираться, и flush и
+    stop зависли бы.
+    """
+
+    def __init__(self, on_error=None):
+        self.on_error = on_error
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="journal-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, job):
+        self.queue.put(job)
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                job()
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(e)
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """Ждёт выполнения всех поставленных заданий."""
+        self.queue.join()
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+class Journal:
+    def __init__(self, snapshot_path, snapshot_every=SNAPSHOT_EVERY, writer=None):
+        self.snapshot_path = snapshot_path
+        base = os.path.splitext(snapshot_path)[0]
+        self.journal_path = base + ".journal.jsonl"
+        self.snapshot_every = snapshot_every
+        self.writer = writer
+        self.lock = FileLock(base + ".lock")
+        self.seq = 0  # Номер последнего записанного события
+        self.pending = 0  # Событий в журнале после последнего снимка
+        self.file = None  # Открытый журнал; используется только в потоке записи
+
+    def run(self, job):
+        """Выполняет файловую операцию в потоке записи или сразу, если его нет."""
+        if self.writer is not None:
+            self.writer.submit(job)
+        else:
+            job()
+
+    def wait(self):
+        if self.writer is not None:
+            self.writer.flush()
+
+    def append(self, event):
+        self.extend([event])
+
+    def extend(self, events):
+        """Дописывает пачку событий одной записью в файл."""
+        lines = []
+        for event in events:
+            self.seq += 1
+            lines.append(dump_line(dict(event, seq=self.seq)))
+        if not lines:
+            return
+        self.pending += len(lines)
+        self.run(lambda: self.write_lines("".join(lines)))
+
+    @timed("journal.write")
+    def write_lines(self, text):
+        if self.file is None:
+            self.file = open(self.journal_path, "a", encoding="utf-8")
+        start = self.file.tell()
+        try:
+            self.file.write(text)
+            self.file.flush()
+        except OSError:
+            # Оборванная пачка не должна остаться в файле: повтор записи склеился бы с ней в одну строку
+            try:
+                self.file.close()
+            except OSError:
+                pass
+            self.file = None
+            try:
+                os.truncate(self.journal_path, start)
+            except OSError:
+                pass
+            raise
+
+    @property
+    def needs_snapshot(self):
+        return self.pending >= self.snapshot_every
+
+    def write_snapshot(self, state, skip=None):
+        """Атомарно записывает полное состояние вместе с текущим размером журнала.
+
+        state не должен меняться после вызова: при фоновой записи он
+        сериализуется позже, в потоке записи. skip вызывается там же перед
+        записью; если он вернул True (например, не записалась пачка событий
+        перед снимком), снимок не пишется.
+        """
+        state = dict(state, seq=self.seq)
+        self.pending = 0
+
+        def write():
+            if skip is None or not skip():
+                self.replace_snapshot(state)
+
+        self.run(write)
+
+    @timed("journal.write_snapshot")
+    def replace_snapshot(self, state):
+        # Все события до state["seq"] уже записаны: загрузка продолжит журнал с этого места
+        offset = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        state = dict(state, journal_offset=offset)
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(state, file, ensure_ascii=False, separators=(",", ":"))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+    @timed("journal.load")
+    def load(self):
+        """Возвращает (снимок или None, события журнала после снимка)."""
+        self.wait()
+        state = None
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+        base = state.get("seq", 0) if state else 0
+
+        events = []
+        if os.path.exists(self.journal_path):
+            size = os.path.getsize(self.journal_path)
+            # Снимки старого формата очищали журнал и места в нём не запоминали
+            offset = state.get("journal_offset", 0) if state else 0
+            if offset > size:
+                offset = 0
+            records, valid_size = self.read_events(offset)
+            events = [record for record in records if record["seq"] > base]
+            if valid_size != size:
+                # Отрезаем оборванный хвост, чтобы новые записи не склеились с ним
+                with open(self.journal_path, "r+b") as file:
+                    file.truncate(valid_size)
+
+        self.close_file()
+        self.seq = events[-1]["seq"] if events else base
+        self.pending = len(events)
+        return state, events
+
+    def read_events(self, offset=0):
+        """События журнала начиная с байта offset и размер целой его части."""
+        events = []
+        valid_size = offset
+        with open(self.journal_path, "rb") as file:
+            file.seek(offset)
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Запись оборвалась при сбое
+                if not line.endswith(b"\n"):
+                    break
+                valid_size += len(line)
+                events.append(record)
+        return events, valid_size
+
+    @timed("journal.read_history")
+    def read_history(self):
+        """Все события журнала с начала турнира (после load, когда хвост уже выровнен)."""
+        self.wait()
+        if not os.path.exists(self.journal_path):
+            return []
+        return self.read_events()[0]
+
+    def clear(self):
+        """Удаляет снимок и журнал."""
+        self.seq = 0
+        self.pending = 0
+        self.run(self.remove_files)
+
+    def remove_files(self):
+        self.close_file()
+        for path in (self.snapshot_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self, remove_lock=False):
+        """Закрывает журнал и снимает блокировку после всех уже поставленных записей."""
+        def close():
+            self.close_file()
+            self.lock.release(remove_lock)
+        self.run(close)
@@ -0,0 +1,54 @@
+"""Построчная разница двух списков строк.
+
+Используется при изменении файлов участников и требований: вместо полной
+перезагрузки списка применяются только вставки и удаления строк.
+"""
+
+
+def diff_lines(old, new):
+    """Список правок (i1, i2, j1, j2): строки old[i1:i2] заменяются на new[j1:j2].
+
+    Общие начало и конец списков отбрасываются сразу, поэтому правка одной
+    строки в большом файле сводится к сравнению нескольких строк. Середина
+    сравнивается одним проходом двумя указателями: строки в списках почти все
+    уникальны, и по словарю «строка -> позиция» видно, встретится ли
+    несовпавшая строка дальше в другом списке. Если встретятся обе, короткий
+    отрезок считается вставкой или удалением, а длинный — совпадением.
+    Результат всегда переводит old в new, а для нескольких правок в большом
+    файле он минимален; время — линейное от длины изменённой середины.
+    """
+    end = min(len(old), len(new))
+    start = 0
+    while start < end and old[start] == new[start]:
+        start += 1
+    suffix = 0
+    while suffix < end - start and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    old_end, new_end = len(old) - suffix, len(new) - suffix
+    if start == old_end and start == new_end:
+        return []
+
+    # Позиция первого вхождения строки в середине каждого списка
+    in_old = {line: i for i, line in zip(range(old_end - 1, start - 1, -1), reversed(old[start:old_end]))}
+    in_new = {line: j for j, line in zip(range(new_end - 1, start - 1, -1), reversed(new[start:new_end]))}
+
+    edits = []
+    i = j = edit_i = edit_j = start
+    while i < old_end and j < new_end:
+        line = old[i]
+        if line == new[j]:
+            if edit_i != i or edit_j != j:
+                edits.append((edit_i, i, edit_j, j))
+            i += 1
+            j += 1
+            edit_i, edit_j = i, j
+            continue
+        ahead_new = in_new.get(line, -1) - j
+        ahead_old = in_old.get(new[j], -1) - i
+        if ahead_new < 0 or 0 <= ahead_old < ahead_new:
+            i += 1  # Строка old[i] удалена (или встретится в new нескоро)
+        else:
+            j += 1  # Строка new[j] вставлена
+    if edit_i != old_end or edit_j != new_end:
+        edits.append((edit_i, old_end, edit_j, new_end))
+    return edits
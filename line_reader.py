@@ -0,0 +1,65 @@
+"""Потоковое чтение текстовых списков (участники, требования) пачками строк."""
+import os
+import time
+
+CHUNK_SIZE = 1 << 20
+BATCH_SIZE = 5000
+BATCH_INTERVAL = 0.016
+
+
+def iter_line_batches(path, batch_size=BATCH_SIZE, batch_interval=BATCH_INTERVAL, chunk_size=CHUNK_SIZE):
+    """Читает файл блоками и выдаёт пачки непустых строк.
+
+    Пачка отдаётся, когда набрано batch_size строк или с прошлой пачки прошло
+    batch_interval секунд. Каждый элемент — кортеж
+    (строки, прочитано байт, размер файла).
+    """
+    if not os.path.exists(path):
+        return
+    total = os.path.getsize(path)
+    consumed = 0
+    batch = []
+    deadline = time.monotonic() + batch_interval
+    with open(path, "rb") as file:
+        tail = b""
+        while True:
+            chunk = file.read(chunk_size)
+            if chunk:
+                data = tail + chunk
+                # Конец строки — "\n", "\r\n" или одиночный "\r". Если "\r\n" разрезан между блоками,
+                # "\n" в начале следующего даст пустую строку, а пустые строки пропускаются
+                cut = max(data.rfind(b"\n"), data.rfind(b"\r")) + 1
+                if not cut:
+                    tail = data
+                    continue
+                data, tail = data[:cut], data[cut:]
+            else:
+                data, tail = tail, b""
+            consumed += len(data)
+            # Концы строк как при построчном чтении файла в текстовом режиме (newline=None):
+            # "\n", "\r\n" и "\r". splitlines делил бы ещё по \x0b, \x0c, \x1c–\x1e, \x85, \u2028, \u2029
+            text = data.decode("utf-8-sig" if consumed == len(data) else "utf-8")
+            for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+                line = line.strip()
+                if line:
+                    batch.append(line)
+                    if len(batch) >= batch_size:
+                        yield batch, consumed, total
+                        batch = []
+                        deadline = time.monotonic() + batch_interval
+            if batch and time.monotonic() >= deadline:
+                yield batch, consumed, total
+                batch = []
+                deadline = time.monotonic() + batch_interval
+            if not chunk:
+                break
+    if batch:
+        yield batch, consumed, total
+
+
+def read_lines(path):
+    """Все непустые строки файла одним списком."""
+    lines = []
+    for batch, _, _ in iter_line_batches(path, batch_interval=float("inf")):
+        lines.extend(batch)
+    return lines
@@ -0,0 +1,58 @@
+"""Двоичный кэш разобранных текстовых списков (участники, требования).
+
+Кэш лежит рядом с другими служебными файлами (resources/cache) и хранит
+уже разобранные строки списка и их ключи сравнения (normalize_name из
+name_index.py) вместе с ключом файла — временем изменения и размером. Если
+ключ совпал, при запуске текст не читается и не разбирается; любое
+изменение файла меняет ключ, и кэш просто перестаёт совпадать, а после
+следующего разбора перезаписывается.
+
+Строки и ключи хранятся двумя большими строками через "\n" (переводов
+строк внутри строк списка не бывает): marshal читает их копированием
+памяти, а split разбирает быстрее, чем marshal — миллион отдельных строк.
+"""
+import marshal
+import os
+
+CACHE_VERSION = 3  # 3: строки делятся по "\n", "\r\n" и "\r" (см. line_reader.py)
+
+
+def cache_path(folder, path):
+    """Файл кэша для списка path."""
+    return os.path.join(folder, os.path.basename(path) + ".cache")
+
+
+def file_key(path):
+    """Ключ кэша: (время изменения в наносекундах, размер) или None, если файла нет."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_cached_lines(cache_file, key):
+    """(строки, ключи сравнения) из кэша, если он записан для того же ключа файла; иначе None."""
+    if key is None:
+        return None
+    try:
+        with open(cache_file, "rb") as file:
+            version, cached_key, lines, normalized = marshal.loads(file.read())
+        if version != CACHE_VERSION or tuple(cached_key) != key:
+            return None
+        lines = lines.split("\n") if lines else []
+        normalized = normalized.split("\n") if normalized else []
+    except (OSError, EOFError, ValueError, TypeError, AttributeError):
+        return None  # Кэша нет или он повреждён: список разбирается заново
+    if len(lines) != len(normalized):
+        return None
+    return lines, normalized
+
+
+def write_cached_lines(cache_file, key, lines, normalized):
+    """Атомарно записывает строки списка и их ключи сравнения в кэш под ключом key."""
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    temp_path = cache_file + ".tmp"
+    with open(temp_path, "wb") as file:
+        marshal.dump((CACHE_VERSION, key, "\n".join(lines), "\n".join(normalized)), file)
+    os.replace(temp_path, cache_file)
@@ -1,55 +1,221 @@
 import sys
-import random
 import os
-import json
-import subprocess
+import sqlite3
+import time
+
+# Отсчёт времени запуска: от импорта модуля, включая загрузку Qt
+STARTED = time.perf_counter()
+
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QWidget, QPushButton, QLineEdit,
-    QLabel, QTextEdit, QInputDialog, QMessageBox, QCheckBox, QScrollArea, QGridLayout, QHBoxLayout, QListWidget
+    QLabel, QMessageBox, QHBoxLayout, QTableView, QHeaderView, QAbstractItemView,
+    QComboBox, QTabWidget, QFileDialog, QCheckBox
+)
+from PyQt5.QtCore import QFileSystemWatcher, QThread, QTimer, pyqtSignal
+
+from bracket import KnockoutPairing
+from file_lock import FileLockedError
+from instrumentation import (
+    STALL_THRESHOLD, StallWatchdog, diagnostics_from_environment, metrics, print_stall, profile_stats,
+    save_diagnostics, save_json, save_profile, timed
+)
+from journal import Journal, JournalWriter
+from list_cache import cache_path, file_key, read_cached_lines, write_cached_lines
+from name_index import normalize_name
+from report_index import ReportIndex
+from round_log import format_schedule
+from line_reader import BATCH_SIZE, iter_line_batches, read_lines
+from name_list_model import CheckableNameListModel
+from requirement_pool import RequirementPool
+
+# Стратегии жеребьёвки в выпадающем списке: (подпись, имя стратегии из pairing.STRATEGIES)
+PAIRING_CHOICES = (
+    ("Случайная жеребьёвка", "random"),
+    ("Посев 1–N", "seeded"),
+    ("Швейцарская система", "swiss"),
+    ("Круговые группы + плей-офф", "pools"),
 )
-from PyQt5.QtCore import QThread, pyqtSignal
 
+# Задержка перед применением изменений файла списка, мс
+FILE_SYNC_DELAY_MS = 300
 
-class LoadParticipantsThread(QThread):
-    participants_loaded = pyqtSignal(list)
 
-    def __init__(self, participants_file, parent=None):
-        super().__init__(parent)  # Передаем parent
-        self.participants_file = participants_file
+class LoadLinesThread(QThread):
+    """Потоковая загрузка списка (участников или требований) пачками строк.
+
+    Каждая загрузка помечается номером поколения: пачки от отменённой или
+    устаревшей загрузки получатель просто отбрасывает. Ключи сравнения имён
+    тоже считаются здесь, а не в потоке интерфейса. Если для файла есть
+    действительный двоичный кэш (см. list_cache.py), строки и ключи берутся
+    из него без разбора текста; иначе после разбора кэш записывается заново.
+    """
+    # Списки передаются как object: тип list заставил бы Qt копировать каждую строку в QVariantList
+    batch_loaded = pyqtSignal(int, object, object)  # Поколение, пачка строк, их ключи сравнения
+    progress = pyqtSignal(int, int, int)  # Поколение, прочитано байт, размер файла
+    loading_finished = pyqtSignal(int, str)  # Поколение, текст ошибки (пустой при успехе)
+
+    def __init__(self, path, generation, cache_file=None, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.generation = generation
+        self.cache_file = cache_file
 
     def run(self):
-        participants = []
-        if os.path.exists(self.participants_file):
-            with open(self.participants_file, "r", encoding="utf-8") as file:
-                for line in file:
-                    participant = line.strip()
-                    if participant:
-                        participants.append(participant)
-        self.participants_loaded.emit(participants)
+        error = ""
+        try:
+            key = file_key(self.path)
+            cached = read_cached_lines(self.cache_file, key) if self.cache_file else None
+            if cached is not None:
+                self.emit_cached(*cached, key[1])
+            else:
+                self.parse(key)
+        except Exception as e:
+            error = str(e)
+        if not self.isInterruptionRequested():
+            self.loading_finished.emit(self.generation, error)
+
+    @timed("lists.load_cached")
+    def emit_cached(self, lines, normalized, total):
+        for start in range(0, len(lines), BATCH_SIZE):
+            if self.isInterruptionRequested():
+                return
+            end = start + BATCH_SIZE
+            self.batch_loaded.emit(self.generation, lines[start:end], normalized[start:end])
+        self.progress.emit(self.generation, total, total)
+
+    @timed("lists.parse")
+    def parse(self, key):
+        lines, normalized = [], []
+        for batch, consumed, total in iter_line_batches(self.path):
+            if self.isInterruptionRequested():
+                return
+            keys = [normalize_name(line) for line in batch]
+            lines.extend(batch)
+            normalized.extend(keys)
+            self.batch_loaded.emit(self.generation, batch, keys)
+            self.progress.emit(self.generation, consumed, total)
+        # Файл могли изменить во время разбора: такой результат в кэш не кладём
+        if self.cache_file and key is not None and file_key(self.path) == key:
+            try:
+                write_cached_lines(self.cache_file, key, lines, normalized)
+            except OSError:
+                pass  # Без кэша следующий запуск просто разберёт файл заново
+
 
+class RestoreTournamentsThread(QThread):
+    """Чтение снимков и журналов открытых при запуске турниров в фоне.
 
-class LoadRequirementsThread(QThread):
-    requirements_loaded = pyqtSignal(list)  # Сигнал для передачи списка требований
+    Вкладки с уже взятыми блокировками создаются в потоке интерфейса, здесь
+    только читаются файлы и строятся сетки; готовый турнир передаётся
+    сигналом обратно и показывается в своей вкладке.
+    """
+    restored = pyqtSignal(object, object, str)  # Вкладка, прочитанный турнир или None, текст ошибки
 
-    def __init__(self, requirements_file, parent=None):
+    def __init__(self, tabs, parent=None):
         super().__init__(parent)
-        self.requirements_file = requirements_file
+        self.tabs = tabs
 
     def run(self):
-        requirements = []
-        if os.path.exists(self.requirements_file):
+        from tournament_tab import read_saved_tournament
+        for tab in self.tabs:
+            if self.isInterruptionRequested():
+                return
             try:
-                with open(self.requirements_file, "r", encoding="utf-8") as file:
-                    for line in file:
-                        requirement = line.strip()
-                        if requirement:
-                            requirements.append(requirement)
+                saved, error = read_saved_tournament(tab.journal), ""
             except Exception as e:
-                print(f"Ошибка при загрузке требований: {e}")
-        self.requirements_loaded.emit(requirements)  # Передаем данные через сигнал
+                saved, error = None, str(e)
+            self.restored.emit(tab, saved, error)
+
+
+class ImportReportsThread(QThread):
+    """Первый перенос в индекс отчётов, сохранённых до его появления (см. ReportIndex).
+
+    Поток открывает собственное соединение с индексом; прерванный импорт
+    продолжится при следующем запуске.
+    """
+    imported = pyqtSignal(object, str)  # [(файл, ошибка)] по отчётам, текст общей ошибки
+
+    def __init__(self, index_path, reports_folder, parent=None):
+        super().__init__(parent)
+        self.index_path = index_path
+        self.reports_folder = reports_folder
+
+    def run(self):
+        failures, error = [], ""
+        try:
+            report_index = ReportIndex(self.index_path, self.reports_folder, import_existing=False)
+            try:
+                failures = report_index.import_existing_reports(self.isInterruptionRequested)
+            finally:
+                report_index.close()
+        except Exception as e:
+            error = str(e)
+        self.imported.emit(failures, error)
+
+
+class RatingsUpdateThread(QThread):
+    """Досчёт рейтингов участников по новым отчётам в фоне (см. participant_store.py).
+
+    Поток открывает собственные соединения с хранилищем и индексом отчётов:
+    соединения SQLite нельзя передавать между потоками.
+    """
+    updated = pyqtSignal(int, str)  # Учтено турниров, текст ошибки (пустой при успехе)
+
+    def __init__(self, store_path, index_path, reports_folder, parent=None):
+        super().__init__(parent)
+        self.store_path = store_path
+        self.index_path = index_path
+        self.reports_folder = reports_folder
+
+    def run(self):
+        played, error = 0, ""
+        try:
+            from participant_store import ParticipantStore  # NumPy нужен только для рейтингов
+            store = ParticipantStore(self.store_path)
+            report_index = ReportIndex(self.index_path, self.reports_folder, import_existing=False)
+            try:
+                played = store.update(report_index)
+            finally:
+                report_index.close()
+                store.close()
+        except Exception as e:
+            error = str(e)
+        self.updated.emit(played, error)
+
+
+class HistoryUpdateThread(QThread):
+    """Дописывание новых отчётов в колоночный архив турниров в фоне (см. history_export.py).
+
+    NumPy импортируется, а архив открывается в самом потоке; с индексом
+    отчётов поток работает через собственное соединение, как RatingsUpdateThread.
+    """
+    updated = pyqtSignal(int, str)  # Дописано отчётов, текст ошибки (пустой при успехе)
+
+    def __init__(self, history_folder, index_path, reports_folder, parent=None):
+        super().__init__(parent)
+        self.history_folder = history_folder
+        self.index_path = index_path
+        self.reports_folder = reports_folder
+
+    def run(self):
+        exported, error = 0, ""
+        try:
+            from history_export import HistoryExport  # NumPy нужен только для архива
+            history = HistoryExport(self.history_folder)
+            report_index = ReportIndex(self.index_path, self.reports_folder, import_existing=False)
+            try:
+                exported = history.update(report_index)
+            finally:
+                report_index.close()
+        except Exception as e:
+            error = str(e)
+        self.updated.emit(exported, error)
 
 
 class TournamentApp(QMainWindow):
+    # Ошибка фоновой записи журнала; сигнал передаёт её в поток интерфейса
+    journal_write_failed = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Турнирная схема")
@@ -59,6 +225,7 @@ class TournamentApp(QMainWindow):
         self.base_folder = os.path.join(os.getcwd(), "resources")
         self.txt_folder = os.path.join(self.base_folder, "txt")
         self.json_folder = os.path.join(self.base_folder, "json_folder")
+        self.tournaments_folder = self.json_folder  # Отчёты о завершённых турнирах
 
         # Создаём папки, если они не существуют
         os.makedirs(self.txt_folder, exist_ok=True)
@@ -67,19 +234,50 @@ class TournamentApp(QMainWindow):
         # Файлы
         self.participants_file = os.path.join(self.txt_folder, "participants.txt")
         self.requirements_file = os.path.join(self.txt_folder, "tournament_req.txt")
+        # Турнир старого формата: единственный, в одном файле
         self.current_tournament_file = os.path.join(self.json_folder, "current_tournament.json")
+        # Идущие турниры: снимок, журнал и блокировка у каждого свои
+        self.active_tournaments_folder = os.path.join(self.json_folder, "active")
+        os.makedirs(self.active_tournaments_folder, exist_ok=True)
+        self.journal_writer = JournalWriter(on_error=lambda e: self.journal_write_failed.emit(str(e)))
+        self.journal_write_failed.connect(self.show_journal_error)
+        self.report_index_path = os.path.join(self.base_folder, "reports.sqlite3")
+        # Старые отчёты переносятся в новый индекс в фоне (см. import_reports_async)
+        self.report_index = ReportIndex(self.report_index_path, self.tournaments_folder, import_existing=False)
+        self.import_thread = None
+        # Разобранные списки участников и требований для быстрого повторного запуска
+        self.cache_folder = os.path.join(self.base_folder, "cache")
+        # Колоночный архив для анализа ведётся, если его создали командой cli.py export-history
+        self.history_folder = os.path.join(self.base_folder, "history")
+        self.history_thread = None
+        self.history_pending = False  # Турнир завершился, пока архив дописывался
+        # Рейтинги участников ведутся, если хоть раз включали посев по рейтингу
+        self.participant_store_path = os.path.join(self.base_folder, "participants.sqlite3")
+        self.participant_store = None
+        self.ratings_thread = None
+        self.ratings_pending = False  # Турнир завершился, пока рейтинги досчитывались
 
         # Инициализация данных
-        self.participants = []
-        self.current_round = []
-        self.next_round = []
-        self.checkboxes = []
+        self.participants_model = CheckableNameListModel(self)
+        self.requirements_model = CheckableNameListModel(self)
+        self.load_thread = None
+        self.load_requirements_thread = None
+        self.participants_generation = 0
+        self.requirements_generation = 0
+        self.participants_collisions = []
+        self.requirements_collisions = []
+        self.restore_thread = None
+        self.restoring_tabs = set()  # Вкладки, турнир которых ещё читается в фоне
+
+        # Запуск идёт этапами: сначала показывается окно, затем в фоне
+        # загружаются списки и турниры (см. continue_startup)
+        self.startup_pending = {"participants", "requirements", "tournaments", "reports"}
+        self.startup_continued = False
+        self.first_paint = 0.0  # Секунд от запуска до показа окна
 
         # Инициализация интерфейса
         self.initUI()
-        self.load_participants_async()
-        self.load_last_tournament()
-        self.load_requirements_async()
+        self.init_diagnostics()
 
     def initUI(self):
         main_layout = QHBoxLayout()
@@ -97,13 +295,7 @@ class TournamentApp(QMainWindow):
         self.add_participant_button.clicked.connect(self.add_participant)
         left_panel.addWidget(self.add_participant_button)
 
-        self.scroll_area = QScrollArea()
-        self.scroll_area_widget = QWidget()
-        self.scroll_layout = QVBoxLayout()
-        self.scroll_area_widget.setLayout(self.scroll_layout)
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setWidget(self.scroll_area_widget)
-        left_panel.addWidget(self.scroll_area)
+        self.participants_view = self.add_name_list(left_panel, self.participants_model)
 
         # Кнопка для открытия файла участников
         self.open_participants_button = QPushButton("Открыть файл участников")
@@ -120,18 +312,36 @@ class TournamentApp(QMainWindow):
         # Центральная панель: основное окно турнира
         center_panel = QVBoxLayout()
 
+        self.pairing_combo = QComboBox()
+        for title, name in PAIRING_CHOICES:
+            self.pairing_combo.addItem(title, name)
+        center_panel.addWidget(self.pairing_combo)
+
+        # Порядок участников задаёт посев; при случайной жеребьёвке он не важен
+        self.rating_seed_check = QCheckBox("Посев по рейтингу")
+        self.rating_seed_check.setToolTip("Участники с большим рейтингом (Глико) получают верхние номера посева")
+        center_panel.addWidget(self.rating_seed_check)
+        self.pairing_combo.currentIndexChanged.connect(self.update_rating_seed_check)
+        self.update_rating_seed_check()
+
         self.start_button = QPushButton("Начать турнир")
-        self.start_button.clicked.connect(self.start_tournament)
+        self.start_button.clicked.connect(lambda: self.start_tournament())
         center_panel.addWidget(self.start_button)
 
-        self.round_display = QTextEdit()
-        self.round_display.setReadOnly(True)
-        center_panel.addWidget(self.round_display)
-
-        self.next_round_button = QPushButton("Следующий этап")
-        self.next_round_button.clicked.connect(self.next_round_selection)
-        self.next_round_button.setEnabled(False)
-        center_panel.addWidget(self.next_round_button)
+        # Форма турнира: раунды, группы и нужные требования
+        self.schedule_label = QLabel()
+        center_panel.addWidget(self.schedule_label)
+        self.pairing_combo.currentIndexChanged.connect(self.show_schedule)
+        self.participants_model.dataChanged.connect(self.show_schedule)
+        self.participants_model.rowsInserted.connect(self.show_schedule)
+        self.participants_model.rowsRemoved.connect(self.show_schedule)
+        self.participants_model.modelReset.connect(self.show_schedule)
+
+        # Открытые турниры, по вкладке на каждый
+        self.tournament_tabs = QTabWidget()
+        self.tournament_tabs.setTabsClosable(True)
+        self.tournament_tabs.tabCloseRequested.connect(self.close_tournament_tab)
+        center_panel.addWidget(self.tournament_tabs)
 
         self.view_reports_button = QPushButton("Просмотр отчетов")
         self.view_reports_button.clicked.connect(self.view_reports)
@@ -144,8 +354,17 @@ class TournamentApp(QMainWindow):
 
         main_layout.addLayout(center_panel)
 
-        # Правая панель: список требований
-        right_panel = QVBoxLayout()
+        # Правая панель: список требований; строится после первого показа окна
+        self.requirements_panel = QVBoxLayout()
+        main_layout.addLayout(self.requirements_panel)
+
+        container = QWidget()
+        container.setLayout(main_layout)
+        self.setCentralWidget(container)
+
+    @timed("startup.requirements_panel")
+    def build_requirements_panel(self):
+        right_panel = self.requirements_panel
 
         self.add_requirement_label = QLabel("Добавить новое требование:")
         right_panel.addWidget(self.add_requirement_label)
@@ -157,13 +376,7 @@ class TournamentApp(QMainWindow):
         self.add_requirement_button.clicked.connect(self.add_requirement)
         right_panel.addWidget(self.add_requirement_button)
 
-        self.requirements_scroll_area = QScrollArea()
-        self.requirements_scroll_area_widget = QWidget()
-        self.requirements_scroll_layout = QVBoxLayout()
-        self.requirements_scroll_area_widget.setLayout(self.requirements_scroll_layout)
-        self.requirements_scroll_area.setWidgetResizable(True)
-        self.requirements_scroll_area.setWidget(self.requirements_scroll_area_widget)
-        right_panel.addWidget(self.requirements_scroll_area)
+        self.requirements_view = self.add_name_list(right_panel, self.requirements_model)
 
         # Кнопка для открытия файла требований
         self.open_requirements_button = QPushButton("Открыть файл требований")
@@ -175,35 +388,160 @@ class TournamentApp(QMainWindow):
         self.refresh_requirements_button.clicked.connect(self.refresh_requirements)
         right_panel.addWidget(self.refresh_requirements_button)
 
-        main_layout.addLayout(right_panel)
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self.startup_continued:
+            # Окно уже на экране; остальное — со следующего прохода цикла событий
+            self.startup_continued = True
+            QTimer.singleShot(0, self.continue_startup)
+
+    def continue_startup(self):
+        """Второй этап запуска: фоновая загрузка списков и турниров, панель требований."""
+        self.first_paint = self.record_startup("startup.first_paint")
+        self.watch_list_files()
+        self.load_participants_async()
+        self.open_saved_tournaments()
+        self.import_reports_async()
+        QTimer.singleShot(0, self.finish_requirements_panel)
 
-        container = QWidget()
-        container.setLayout(main_layout)
-        self.setCentralWidget(container)
+    def finish_requirements_panel(self):
+        self.build_requirements_panel()
+        self.load_requirements_async()
+
+    def record_startup(self, name):
+        """Записывает время от запуска до этапа name; замеры запуска ведутся всегда."""
+        seconds = time.perf_counter() - STARTED
+        metrics.record(name, STARTED, seconds)
+        return seconds
+
+    def startup_stage_done(self, stage):
+        if stage not in self.startup_pending:
+            return
+        self.startup_pending.discard(stage)
+        if self.startup_pending:
+            return
+        ready = self.record_startup("startup.ready")
+        self.update_ratings()  # Отчёты могли добавиться из cli.py без окна
+        if not self.statusBar().currentMessage():
+            self.statusBar().showMessage(
+                f"Запуск: окно за {self.first_paint * 1000:.0f} мс, данные за {ready * 1000:.0f} мс", 10000
+            )
+
+    def add_name_list(self, panel, model):
+        """Добавляет в панель фильтр, кнопки выбора и виртуализированный список с флажками."""
+        filter_input = QLineEdit()
+        filter_input.setPlaceholderText("Фильтр по началу имени")
+        filter_input.textChanged.connect(model.set_prefix)
+        panel.addWidget(filter_input)
+
+        buttons = QHBoxLayout()
+        select_all_button = QPushButton("Выбрать все")
+        select_all_button.clicked.connect(lambda: model.set_all_checked(True))
+        buttons.addWidget(select_all_button)
+        select_none_button = QPushButton("Снять все")
+        select_none_button.clicked.connect(lambda: model.set_all_checked(False))
+        buttons.addWidget(select_none_button)
+        panel.addLayout(buttons)
+
+        # QTableView с фиксированной высотой строк не обходит модель построчно,
+        # поэтому даже на сотнях тысяч строк отрисовываются только видимые
+        view = QTableView()
+        view.setModel(model)
+        view.horizontalHeader().hide()
+        view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        view.verticalHeader().hide()
+        view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        view.verticalHeader().setDefaultSectionSize(view.fontMetrics().height() + 6)
+        view.setShowGrid(False)
+        view.setSelectionMode(QAbstractItemView.NoSelection)
+        panel.addWidget(view)
+        return view
+
+    def start_loading(self, path, generation, previous_thread, on_batch, on_finished):
+        """Отменяет предыдущую загрузку и запускает новую потоковую загрузку файла."""
+        if previous_thread is not None:
+            if previous_thread.isRunning():
+                previous_thread.requestInterruption()
+                previous_thread.finished.connect(previous_thread.deleteLater)
+            else:
+                previous_thread.deleteLater()
+        thread = LoadLinesThread(path, generation, cache_path(self.cache_folder, path), self)
+        thread.batch_loaded.connect(on_batch)
+        thread.progress.connect(self.show_load_progress)
+        thread.loading_finished.connect(on_finished)
+        thread.start()
+        return thread
+
+    def show_load_progress(self, generation, consumed, total):
+        if total:
+            self.statusBar().showMessage(f"Загрузка: {consumed * 100 // total}%")
 
     def load_participants_async(self):
         try:
-            self.load_thread = LoadParticipantsThread(self.participants_file)
-            self.load_thread.participants_loaded.connect(self.populate_participants)
-            self.load_thread.start()
+            self.participants_generation += 1
+            self.participants_collisions = []
+            self.load_thread = self.start_loading(
+                self.participants_file, self.participants_generation, self.load_thread,
+                self.populate_participants, self.participants_loaded
+            )
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка при загрузке участников: {e}")
 
     def load_requirements_async(self):
         try:
-            self.load_requirements_thread = LoadRequirementsThread(self.requirements_file)
-            self.load_requirements_thread.requirements_loaded.connect(self.populate_requirements)
-            self.load_requirements_thread.start()
+            self.requirements_generation += 1
+            self.requirements_collisions = []
+            self.load_requirements_thread = self.start_loading(
+                self.requirements_file, self.requirements_generation, self.load_requirements_thread,
+                self.populate_requirements, self.requirements_loaded
+            )
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка при загрузке требований: {e}")
 
-    def populate_participants(self, participants):
-        for participant in participants:
-            self.add_participant_checkbox(participant)
+    @timed("lists.populate")
+    def populate_participants(self, generation, participants, normalized):
+        if generation != self.participants_generation:
+            return  # Пачка от устаревшей загрузки
+        self.participants_collisions += self.participants_model.append_names(participants, normalized=normalized)
+
+    @timed("lists.populate")
+    def populate_requirements(self, generation, requirements, normalized):
+        if generation != self.requirements_generation:
+            return  # Пачка от устаревшей загрузки
+        self.requirements_collisions += self.requirements_model.append_names(requirements, normalized=normalized)
+
+    def participants_loaded(self, generation, error):
+        if generation != self.participants_generation:
+            return
+        self.statusBar().clearMessage()
+        if error:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка при загрузке участников: {error}")
+        self.report_collisions("участников", self.participants_collisions)
+        self.startup_stage_done("participants")
+
+    def requirements_loaded(self, generation, error):
+        if generation != self.requirements_generation:
+            return
+        self.statusBar().clearMessage()
+        if error:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка при загрузке требований: {error}")
+        self.report_collisions("требований", self.requirements_collisions)
+        self.startup_stage_done("requirements")
+
+    def report_collisions(self, kind, collisions):
+        """Сообщает в строке состояния о пропущенных при загрузке повторах."""
+        if not collisions:
+            return
+        examples = ", ".join(f"{name} = {existing}" for name, existing in collisions[:5])
+        self.statusBar().showMessage(f"Пропущено повторов в списке {kind}: {len(collisions)} ({examples})")
 
-    def populate_requirements(self, requirements):
-        for requirement in requirements:
-            self.add_requirement_checkbox(requirement)
+    def save_participant(self, participant):
+        """Сохранение нового участника в файл."""
+        try:
+            with open(self.participants_file, "a", encoding="utf-8") as file:
+                file.write(participant + "\n")
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить участника: {e}")
 
     def save_requirement(self, requirement):
         """Сохранение нового требования в файл."""
@@ -226,29 +564,16 @@ class TournamentApp(QMainWindow):
             return
 
         # Проверка на уникальность
-        if participant in [cb.text() for cb in self.checkboxes]:
+        if self.participants_model.contains(participant):
             QMessageBox.warning(self, "Ошибка", "Участник с таким именем уже существует!")
             self.add_participant_input.clear()
             return
 
         # Добавляем участника, если он уникален
-        self.add_participant_checkbox(participant)
+        self.participants_model.append_names([participant])
         self.save_participant(participant)
         self.add_participant_input.clear()
 
-    def add_participant_checkbox(self, participant):
-        checkbox = QCheckBox(participant)
-        self.scroll_layout.addWidget(checkbox)
-        self.checkboxes.append(checkbox)
-
-    def add_requirement_checkbox(self, requirement):
-        """Добавляет чекбокс с требованием в правую панель."""
-        try:
-            checkbox = QCheckBox(requirement)  # Создаём новый чекбокс
-            self.requirements_scroll_layout.addWidget(checkbox)  # Добавляем его в правую панель
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Произошла ошибка при добавлении чекбокса требования: {e}")
-
     def add_requirement(self):
         """Добавление нового требования в список и сохранение его в файл с обработкой ошибок."""
         try:
@@ -258,16 +583,13 @@ class TournamentApp(QMainWindow):
                 return
 
             # Проверка на уникальность
-            existing_requirements = [
-                cb.text() for cb in self.requirements_scroll_layout.children() if isinstance(cb, QCheckBox)
-            ]
-            if requirement in existing_requirements:
+            if self.requirements_model.contains(requirement):
                 QMessageBox.warning(self, "Ошибка", "Требование с таким названием уже существует!")
                 self.add_requirement_input.clear()
                 return
 
             # Добавляем требование в интерфейс
-            self.add_requirement_checkbox(requirement)
+            self.requirements_model.append_names([requirement])
 
             # Сохраняем требование в файл
             self.save_requirement(requirement)
@@ -283,6 +605,7 @@ class TournamentApp(QMainWindow):
             if not os.path.exists(self.participants_file):
                 with open(self.participants_file, "w", encoding="utf-8") as file:
                     pass  # Создаём пустой файл, если его нет
+            import subprocess  # Нужен только для запуска редактора
             subprocess.Popen(["notepad", self.participants_file])
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось открыть файл участников: {e}")
@@ -293,257 +616,435 @@ class TournamentApp(QMainWindow):
             if not os.path.exists(self.requirements_file):
                 with open(self.requirements_file, "w", encoding="utf-8") as file:
                     pass  # Создаём пустой файл, если его нет
+            import subprocess
             subprocess.Popen(["notepad", self.requirements_file])
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось открыть файл требований: {e}")
 
+    def watch_list_files(self):
+        """Следит за файлами участников и требований и применяет их изменения к спискам.
+
+        Изменения собираются с задержкой FILE_SYNC_DELAY_MS: редактор может
+        записать файл в несколько приёмов. Папка тоже отслеживается, так как
+        многие редакторы сохраняют файл заменой, и наблюдение за ним теряется.
+        """
+        self.file_watcher = QFileSystemWatcher(self)
+        self.file_watcher.addPath(self.txt_folder)
+        self.sync_timers = {}
+        for path, refresh in ((self.participants_file, self.refresh_participants),
+                              (self.requirements_file, self.refresh_requirements)):
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.setInterval(FILE_SYNC_DELAY_MS)
+            timer.timeout.connect(refresh)
+            self.sync_timers[path] = timer
+        self.file_watcher.fileChanged.connect(self.list_file_changed)
+        self.file_watcher.directoryChanged.connect(self.list_folder_changed)
+        self.watch_existing_files()
+
+    def watch_existing_files(self):
+        """Возвращает под наблюдение файлы, которые были заменены или созданы; возвращает их список."""
+        watched = set(self.file_watcher.files())
+        added = [path for path in self.sync_timers if path not in watched and os.path.exists(path)]
+        if added:
+            self.file_watcher.addPaths(added)
+        return added
+
+    def list_file_changed(self, path):
+        self.watch_existing_files()
+        self.sync_timers[path].start()
+
+    def list_folder_changed(self, folder):
+        for path in self.watch_existing_files():
+            self.sync_timers[path].start()
+
+    @timed("lists.sync")
+    def sync_list(self, model, path, load_thread, kind):
+        """Применяет к списку построчную разницу с файлом, сохраняя отметки."""
+        if load_thread is not None and load_thread.isRunning():
+            self.sync_timers[path].start()  # Файл ещё загружается: повторим позже
+            return
+        self.report_collisions(kind, model.apply_lines(read_lines(path)))
+
     def refresh_participants(self):
         """Обновляет список участников из файла."""
         try:
-            # Очищаем текущий список участников
-            for i in reversed(range(self.scroll_layout.count())):
-                widget = self.scroll_layout.itemAt(i).widget()
-                if widget:
-                    widget.deleteLater()
-
-            # Перечитываем участников из файла
-            self.load_participants_async()
+            self.sync_list(self.participants_model, self.participants_file, self.load_thread, "участников")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось обновить список участников: {e}")
 
     def refresh_requirements(self):
         """Обновляет список требований из файла."""
         try:
-            # Очищаем текущий список требований
-            for i in reversed(range(self.requirements_scroll_layout.count())):
-                widget = self.requirements_scroll_layout.itemAt(i).widget()
-                if widget:
-                    widget.deleteLater()
-
-            # Перечитываем требования из файла
-            self.load_requirements_async()
+            self.sync_list(
+                self.requirements_model, self.requirements_file, self.load_requirements_thread, "требований"
+            )
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось обновить список требований: {e}")
 
-    def save_tournament_state(self):
-        state = {
-            "participants": self.participants,
-            "current_round": self.current_round,
-            "next_round": self.next_round,
-            "round_display": self.round_display.toPlainText(),
-            "current_round_number": self.calculate_total_rounds(len(self.participants)) - self.calculate_total_rounds(
-                len(self.current_round)) + 1  # Номер текущего раунда
-        }
-        with open(self.current_tournament_file, "w", encoding="utf-8") as file:
-            json.dump(state, file, ensure_ascii=False, indent=4)
-
-    def load_last_tournament(self):
-        tournament_path = self.current_tournament_file
-        if os.path.exists(tournament_path):
+    def tournament_path(self, tournament_id):
+        return os.path.join(self.active_tournaments_folder, f"{tournament_id}.json")
+
+    def saved_tournament_paths(self):
+        """Файлы снимков идущих турниров: (идентификатор, путь), включая турнир старого формата."""
+        ids = set()
+        for file_name in os.listdir(self.active_tournaments_folder):
+            for suffix in (".journal.jsonl", ".json"):
+                if file_name.endswith(suffix):
+                    ids.add(file_name[:-len(suffix)])
+                    break
+        paths = [(tournament_id, self.tournament_path(tournament_id)) for tournament_id in sorted(ids)]
+        legacy_journal = os.path.splitext(self.current_tournament_file)[0] + ".journal.jsonl"
+        if os.path.exists(self.current_tournament_file) or os.path.exists(legacy_journal):
+            paths.insert(0, ("current_tournament", self.current_tournament_file))
+        return paths
+
+    def add_tournament_tab(self, tournament_id, path):
+        """Открывает вкладку турнира; None, если турнир уже открыт другим экземпляром приложения."""
+        from tournament_tab import TournamentTab  # Вкладки турниров не нужны для первого показа окна
+        journal = Journal(path, writer=self.journal_writer)
+        journal.lock.acquire()
+        tab = TournamentTab(self, tournament_id, journal)
+        self.tournament_tabs.addTab(tab, f"Турнир {self.tournament_tabs.count() + 1}")
+        self.tournament_tabs.setTabToolTip(self.tournament_tabs.indexOf(tab), f"{tournament_id}\n{path}")
+        return tab
+
+    def open_saved_tournaments(self):
+        """Открывает все незавершённые турниры, не занятые другим экземпляром приложения.
+
+        Вкладки появляются сразу, а снимки и журналы читаются в фоновом потоке.
+        """
+        busy = 0
+        tabs = []
+        for tournament_id, path in self.saved_tournament_paths():
             try:
-                with open(tournament_path, "r", encoding="utf-8") as file:
-                    state = json.load(file)
-                    self.participants = state.get("participants", [])
-                    self.current_round = state.get("current_round", [])
-                    self.next_round = state.get("next_round", [])
-                    self.round_display.setText(state.get("round_display", ""))
-                    self.current_round_number = state.get("current_round_number", 0)
-
-                    # Проверка на основе current_round_number
-                    if self.current_round_number > 0:
-                        self.next_round_button.setEnabled(True)
-                    else:
-                        self.next_round_button.setEnabled(False)
-            except Exception as e:
-                QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить состояние турнира: {e}")
+                tab = self.add_tournament_tab(tournament_id, path)
+            except FileLockedError:
+                busy += 1
+                continue
+            tab.round_display.setPlainText("Загрузка турнира…")
+            tabs.append(tab)
+        if busy:
+            self.statusBar().showMessage(f"Турниров открыто в другом окне приложения: {busy}")
+        if not tabs:
+            self.startup_stage_done("tournaments")
+            return
+        self.restoring_tabs.update(tabs)
+        self.restore_thread = RestoreTournamentsThread(tabs, self)
+        self.restore_thread.restored.connect(self.tournament_restored)
+        self.restore_thread.finished.connect(lambda: self.startup_stage_done("tournaments"))
+        self.restore_thread.start()
+
+    def import_reports_async(self):
+        """Переносит в индекс старые отчёты в фоне, если индекс только что создан."""
+        if not self.report_index.needs_import:
+            self.startup_stage_done("reports")
+            return
+        self.import_thread = ImportReportsThread(self.report_index_path, self.tournaments_folder, self)
+        self.import_thread.imported.connect(self.reports_imported)
+        self.import_thread.finished.connect(lambda: self.startup_stage_done("reports"))
+        self.import_thread.start()
+
+    def reports_imported(self, failures, error):
+        if error:
+            self.statusBar().showMessage(f"Не удалось перенести старые отчёты в индекс: {error}")
+        elif failures:
+            examples = ", ".join(f"{file_name} ({reason})" for file_name, reason in failures[:3])
+            self.statusBar().showMessage(f"Не удалось проиндексировать отчётов: {len(failures)}: {examples}")
+
+    def tournament_restored(self, tab, saved, error):
+        self.restoring_tabs.discard(tab)
+        if error:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить состояние турнира {tab.tournament_id}: {error}")
+            tab.round_display.clear()
+        elif saved is None:
+            self.remove_tournament_tab(tab)  # Сохранять было нечего
+        else:
+            tab.restore(saved)
 
-    def clear_current_tournament(self):
-        """Удаляет JSON текущего турнира и очищает холст."""
-        try:
-            # Удаляем файл текущего турнира, если он существует
-            if os.path.exists(self.current_tournament_file):
-                os.remove(self.current_tournament_file)
+    def remove_tournament_tab(self, tab):
+        tab.journal.close()
+        self.tournament_tabs.removeTab(self.tournament_tabs.indexOf(tab))
+        tab.deleteLater()
+
+    def close_tournament_tab(self, index):
+        """Закрывает вкладку; незавершённый турнир остаётся на диске и откроется при следующем запуске."""
+        if self.tournament_tabs.widget(index) in self.restoring_tabs:
+            self.statusBar().showMessage("Турнир ещё загружается", 3000)
+            return
+        self.remove_tournament_tab(self.tournament_tabs.widget(index))
+
+    def tournament_finished(self, tab):
+        index = self.tournament_tabs.indexOf(tab)
+        self.tournament_tabs.setTabText(index, self.tournament_tabs.tabText(index) + " (завершён)")
+        self.update_history()
+        self.update_ratings()
 
-            # Очищаем текстовый холст
-            self.round_display.clear()
+    def update_history(self):
+        """Дописывает новые отчёты в колоночный архив турниров в фоне, если он ведётся."""
+        if not os.path.exists(os.path.join(self.history_folder, "manifest.json")):
+            return
+        if self.history_thread is not None and self.history_thread.isRunning():
+            self.history_pending = True
+            return
+        self.history_pending = False
+        self.history_thread = HistoryUpdateThread(
+            self.history_folder, self.report_index_path, self.tournaments_folder, self
+        )
+        self.history_thread.updated.connect(self.history_updated)
+        self.history_thread.finished.connect(self.history_thread_finished)
+        self.history_thread.start()
+
+    def history_updated(self, exported, error):
+        if error:
+            self.statusBar().showMessage(f"Не удалось дописать архив турниров: {error}")
+
+    def history_thread_finished(self):
+        if self.history_pending:
+            self.update_history()
+
+    def update_ratings(self):
+        """Досчитывает рейтинги участников по новым отчётам в фоне, если они ведутся."""
+        if not os.path.exists(self.participant_store_path):
+            return
+        if self.ratings_thread is not None and self.ratings_thread.isRunning():
+            self.ratings_pending = True
+            return
+        self.ratings_pending = False
+        self.ratings_thread = RatingsUpdateThread(
+            self.participant_store_path, self.report_index_path, self.tournaments_folder, self
+        )
+        self.ratings_thread.updated.connect(self.ratings_updated)
+        self.ratings_thread.finished.connect(self.ratings_thread_finished)
+        self.ratings_thread.start()
+
+    def ratings_updated(self, played, error):
+        if error:
+            self.statusBar().showMessage(f"Не удалось обновить рейтинги участников: {error}")
+        elif played:
+            self.statusBar().showMessage(f"Рейтинги участников обновлены по турнирам: {played}", 5000)
+
+    def ratings_thread_finished(self):
+        if self.ratings_pending:
+            self.update_ratings()
+
+    def seed_by_rating(self, participants):
+        """Участники по убыванию рейтинга (см. ParticipantStore.seeded)."""
+        if self.participant_store is None:
+            from participant_store import ParticipantStore  # NumPy нужен только для рейтингов
+            self.participant_store = ParticipantStore(self.participant_store_path)
+            # Хранилище могло только что появиться: учитываем все прошлые турниры
+            self.participant_store.update(self.report_index)
+        return self.participant_store.seeded(participants)
+
+    def update_rating_seed_check(self):
+        self.rating_seed_check.setEnabled(self.pairing_combo.currentData() != KnockoutPairing.name)
+
+    def show_journal_error(self, message):
+        QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить состояние турнира: {message}")
 
-            # Выключаем кнопку "Следующий этап"
-            self.next_round_button.setEnabled(False)
+    def clear_current_tournament(self):
+        """Удаляет файлы турнира текущей вкладки и закрывает её."""
+        try:
+            tab = self.tournament_tabs.currentWidget()
+            if tab is None:
+                QMessageBox.information(self, "Очистка", "Нет открытого турнира.")
+                return
+            if tab in self.restoring_tabs:
+                QMessageBox.information(self, "Очистка", "Турнир ещё загружается.")
+                return
+            tab.clear()
+            self.tournament_tabs.removeTab(self.tournament_tabs.indexOf(tab))
+            tab.deleteLater()
 
             QMessageBox.information(self, "Очистка", "Текущий турнир успешно очищен.")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось очистить текущий турнир: {e}")
 
+    @timed("tournament.start")
     def start_tournament(self):
+        """Начинает новый турнир из отмеченных участников в отдельной вкладке."""
         try:
-            self.participants = [cb.text() for cb in self.checkboxes if cb.isChecked()]
-            if len(self.participants) < 2:
+            participants = self.participants_model.checked_names()
+            if len(participants) < 2:
                 QMessageBox.warning(self, "Ошибка", "Необходимо выбрать минимум 2 участников!")
                 return
 
+            # Требования раздаются без повторов за весь турнир, поэтому их число проверяется сразу
+            strategy = self.selected_pairing()
+            pool = RequirementPool(self.get_checked_requirements())
+            needed = strategy.schedule(len(participants)).total_requirements
+            if pool.remaining < needed:
+                QMessageBox.warning(
+                    self, "Ошибка",
+                    f"Недостаточно требований для турнира: выбрано {pool.remaining}, необходимо {needed}"
+                )
+                return
 
-
-            random.shuffle(self.participants)
-            self.next_round_button.setEnabled(True)
-            self.current_round = self.participants
-            self.current_round_number = 1  # Устанавливаем первый раунд
-
-            self.display_round()
-            self.save_tournament_state()
+            if self.rating_seed_check.isEnabled() and self.rating_seed_check.isChecked():
+                try:
+                    participants = self.seed_by_rating(participants)
+                except (ImportError, OSError, sqlite3.Error) as e:
+                    QMessageBox.critical(self, "Ошибка", f"Не удалось прочитать рейтинги участников: {e}")
+                    return
+
+            tournament_id = time.strftime("%Y%m%d-%H%M%S-") + os.urandom(3).hex()
+            tab = self.add_tournament_tab(tournament_id, self.tournament_path(tournament_id))
+            self.tournament_tabs.setCurrentWidget(tab)
+            tab.start(participants, strategy, pool)
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка при старте турнира: {e}")
 
+    def selected_pairing(self):
+        name = self.pairing_combo.currentData()
+        if name == KnockoutPairing.name:
+            return KnockoutPairing()
+        # Остальные стратегии подключаются только при выборе
+        from pairing import STRATEGIES
+        return STRATEGIES[name]()
+
     def get_checked_requirements(self):
         """Возвращает список выбранных требований."""
-        requirements = [
-            cb.text() for cb in self.requirements_scroll_area_widget.findChildren(QCheckBox) if cb.isChecked()
-        ]
-        print("Выбранные требования:", requirements)
-        return requirements
-
-    def calculate_requirements(self, num_participants):
-        """Вычисляет количество уникальных требований для турнира."""
-        requirements = 0
-        while num_participants > 1:
-            group_size = 3 if num_participants % 2 != 0 else 2
-            groups_in_round = num_participants // group_size + (1 if num_participants % group_size else 0)
-            requirements += groups_in_round
-            num_participants = groups_in_round  # Уменьшаем количество участников для следующего этапа
-        return requirements
-
-    def total_requirements(self):
-        # Подсчёт уникальных требований
-        total_requirements = self.calculate_requirements(len(self.participants))
-        return total_requirements
-
-    def display_round(self):
-        total_rounds = self.calculate_total_rounds(len(self.participants))
-        current_round_number = self.calculate_total_rounds(len(self.current_round))
-        round_index = total_rounds - current_round_number + 1
-
-        self.round_display.append(f"Раунд {round_index} ({len(self.current_round)} участников):\n")
-        self.next_round = []
-
-        # Получаем список доступных требований
-        requirements = self.get_checked_requirements()
-        if len(requirements) < len(self.current_round) // 2:
-            print(len(self.current_round))
-            print(len(requirements))
-            total_req = self.total_requirements()
-            QMessageBox.warning(self, "Ошибка", f"Недостаточно требований для всех пар!, Необходимо {total_req} требований ")
-            return
-
-        random.shuffle(requirements)
-
-        while len(self.current_round) > 3:
-            group_size = 3 if len(self.current_round) % 2 != 0 else 2
-            group = self.current_round[:group_size]
-            self.current_round = self.current_round[group_size:]
-            requirement = requirements.pop(0)
-            self.round_display.append(f"  Группа: {', '.join(group)} -> Требование: {requirement}")
-            self.next_round.append(group)
+        return self.requirements_model.checked_names()
 
-        if self.current_round:
-            requirement = requirements.pop(0) if requirements else "Без требования"
-            self.round_display.append(f"  Группа: {', '.join(self.current_round)} -> Требование: {requirement}")
-            self.next_round.append(self.current_round)
-            self.current_round = []
-
-        self.save_tournament_state()
-
-    def calculate_total_rounds(self, num_participants):
-        rounds = 0
-        while num_participants > 1:
-            num_participants = (num_participants + 1) // 2
-            rounds += 1
-        return rounds
-
-    def next_round_selection(self):
-        try:
-            winners = []
-            for group in self.next_round:
-                winner, ok = QInputDialog.getItem(
-                    self, "Выбор победителя",
-                    f"Выберите победителя из группы: {', '.join(group)}", group, 0, False
-                )
-                if ok and winner:
-                    winners.append(winner)
-
-            self.current_round = winners
-            self.round_display.append("\nПобедители текущего этапа:")
-            self.round_display.append(", ".join(winners) + "\n")
-
-            if len(winners) == 1:
-                self.round_display.append(f"Победитель: {winners[0]}\n")
-                self.next_round_button.setEnabled(False)
-
-                # Сохраняем завершённый турнир в отчётах
-                tournament_number = len(
-                    [f for f in os.listdir(self.tournaments_folder) if f.startswith("tournament_")]) + 1
-                report_path = os.path.join(self.tournaments_folder, f"tournament_{tournament_number}.json")
-                with open(report_path, "w", encoding="utf-8") as file:
-                    json.dump({
-                        "participants": self.participants,
-                        "winner": winners[0],
-                        "log": self.round_display.toPlainText()
-                    }, file, ensure_ascii=False, indent=4)
-
-                os.remove(os.path.join(self.tournaments_folder, self.current_tournament_file))
-            elif len(winners) < 2:
-                QMessageBox.warning(self, "Ошибка", "В следующем этапе должно быть минимум 2 участника!")
-            else:
-                self.display_round()
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", f"Ошибка при выборе победителей: {e}")
+    def show_schedule(self):
+        """Показывает форму турнира из отмеченных участников при выбранной жеребьёвке."""
+        with metrics.span("schedule.preview"):
+            schedule = self.selected_pairing().schedule(self.participants_model.checked_count())
+            self.schedule_label.setText(format_schedule(schedule))
 
     def view_reports(self):
-        reports = [f for f in os.listdir(self.tournaments_folder) if f.startswith("tournament_")]
-        if reports:
-            dialog = QMainWindow(self)
-            dialog.setWindowTitle("Выберите отчет")
-
-            list_widget = QListWidget()
-            for report_file in reports:
-                list_widget.addItem(report_file)
-
-            list_widget.itemDoubleClicked.connect(lambda item: self.show_report(item.text(), dialog))
-
-            layout = QVBoxLayout()
-            layout.addWidget(list_widget)
-
-            container = QWidget()
-            container.setLayout(layout)
-            dialog.setCentralWidget(container)
-            dialog.resize(400, 300)
-            dialog.show()
+        if self.report_index.count():
+            from report_browser import ReportBrowser  # Окно отчётов строится только по запросу
+            ReportBrowser(self.report_index, self).show()
         else:
             QMessageBox.information(self, "Отчёты о турнирах", "Нет завершённых турниров.")
 
-    def show_report(self, report_file, dialog):
-        dialog.close()
-
-        report_path = os.path.join(self.tournaments_folder, report_file)
-        with open(report_path, "r", encoding="utf-8") as file:
-            report_data = json.load(file)
-
-        report_dialog = QMainWindow(self)
-        report_dialog.setWindowTitle(f"Отчет: {report_file}")
+    def init_diagnostics(self):
+        """Меню «Диагностика»; режимы из TOURNAMENT_DIAGNOSTICS включаются сразу."""
+        self.stall_watchdog = None
+        self.profile = None  # Последний остановленный профиль
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.setInterval(int(STALL_THRESHOLD * 1000 / 4))
+
+        menu = self.menuBar().addMenu("Диагностика")
+        self.metrics_action = menu.addAction("Замеры времени и зависания")
+        self.metrics_action.setCheckable(True)
+        self.metrics_action.toggled.connect(self.set_metrics_enabled)
+        self.trace_action = menu.addAction("Трасса операций")
+        self.trace_action.setCheckable(True)
+        self.trace_action.toggled.connect(self.set_tracing)
+        self.profile_action = menu.addAction("Профилирование (cProfile)")
+        self.profile_action.setCheckable(True)
+        self.profile_action.toggled.connect(self.set_profiling)
+        menu.addSeparator()
+        menu.addAction("Сохранить замеры…").triggered.connect(self.save_metrics)
+        menu.addAction("Сохранить трассу (Chrome)…").triggered.connect(self.save_trace)
+        menu.addAction("Сохранить профиль…").triggered.connect(self.save_profile)
+        menu.addAction("Сбросить замеры").triggered.connect(lambda: metrics.reset())
+
+        modes = diagnostics_from_environment()
+        self.metrics_action.setChecked(bool(modes))
+        self.trace_action.setChecked("trace" in modes)
+        self.profile_action.setChecked("profile" in modes or metrics.profiling)
+
+    def set_metrics_enabled(self, enabled):
+        metrics.enabled = enabled
+        if enabled and self.stall_watchdog is None:
+            # Таймер главного потока отмечается в сторожевом потоке; опоздание — зависание
+            self.stall_watchdog = StallWatchdog(on_stall=print_stall)
+            self.heartbeat_timer.timeout.connect(self.stall_watchdog.beat)
+            self.stall_watchdog.start()
+            self.heartbeat_timer.start()
+        elif not enabled and self.stall_watchdog is not None:
+            self.heartbeat_timer.stop()
+            self.heartbeat_timer.timeout.disconnect()
+            self.stall_watchdog.stop()
+            self.stall_watchdog = None
+            self.trace_action.setChecked(False)
+
+    def set_tracing(self, enabled):
+        if enabled:
+            self.metrics_action.setChecked(True)
+        metrics.tracing = enabled
+
+    def set_profiling(self, enabled):
+        if enabled:
+            metrics.start_profile()
+        else:
+            self.profile = metrics.stop_profile() or self.profile
 
-        report_display = QTextEdit()
-        report_display.setReadOnly(True)
-        report_display.setText(report_data["log"])
+    def diagnostics_file(self, title, default_name, file_filter):
+        path, _ = QFileDialog.getSaveFileName(self, title, default_name, file_filter)
+        return path
 
-        layout = QVBoxLayout()
-        layout.addWidget(report_display)
+    def save_metrics(self):
+        path = self.diagnostics_file("Сохранить замеры", "metrics.json", "JSON (*.json)")
+        if not path:
+            return
+        report = metrics.report()
+        profiler = metrics.profiler or self.profile
+        if profiler is not None:
+            report["profile"] = profile_stats(profiler)
+        try:
+            save_json(path, report)
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить замеры: {e}")
 
-        container = QWidget()
-        container.setLayout(layout)
-        report_dialog.setCentralWidget(container)
-        report_dialog.resize(600, 400)
-        report_dialog.show()
+    def save_trace(self):
+        if not metrics.trace:
+            QMessageBox.information(self, "Диагностика", "Трасса пуста: включите «Трасса операций».")
+            return
+        path = self.diagnostics_file("Сохранить трассу", "trace.json", "Chrome Trace (*.json)")
+        if not path:
+            return
+        try:
+            save_json(path, metrics.chrome_trace())
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить трассу: {e}")
+
+    def save_profile(self):
+        profiler = metrics.profiler or self.profile
+        if profiler is None:
+            QMessageBox.information(self, "Диагностика", "Профиль пуст: включите «Профилирование (cProfile)».")
+            return
+        path = self.diagnostics_file("Сохранить профиль", "profile.prof", "pstats (*.prof);;JSON (*.json)")
+        if not path:
+            return
+        try:
+            save_profile(path, profiler)
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось сохранить профиль: {e}")
+
+    def closeEvent(self, event):
+        if self.restore_thread is not None:
+            self.restore_thread.requestInterruption()
+            self.restore_thread.wait()
+        if self.import_thread is not None:
+            self.import_thread.requestInterruption()  # Остаток импорта продолжится при следующем запуске
+            self.import_thread.wait()
+        if self.ratings_thread is not None:
+            self.ratings_thread.wait()  # Досчёт идёт одной транзакцией, дожидаемся её конца
+        if self.history_thread is not None:
+            self.history_thread.wait()  # Выгрузка в архив не прерывается, дожидаемся её конца
+        # Дописываем журналы всех турниров до выхода
+        for index in range(self.tournament_tabs.count()):
+            self.tournament_tabs.widget(index).journal.close()
+        self.journal_writer.stop()
+        if self.stall_watchdog is not None:
+            self.stall_watchdog.stop()
+        folder = os.environ.get("TOURNAMENT_DIAGNOSTICS_DIR")
+        if folder:
+            try:
+                save_diagnostics(folder, metrics.stop_profile() or self.profile)
+            except OSError as e:
+                print(f"Не удалось сохранить диагностику: {e}", file=sys.stderr)
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
+    if "profile" in diagnostics_from_environment():
+        metrics.start_profile()  # Профиль с самого начала, включая построение окна
     app = QApplication(sys.argv)
     window = TournamentApp()
     window.show()
@@ -0,0 +1,65 @@
+"""Хеш-индекс имён для проверки уникальности за O(1)."""
+
+
+def normalize_name(name):
+    """Ключ сравнения: регистр не учитывается, пробелы схлопываются."""
+    return " ".join(name.split()).casefold()
+
+
+class NameIndex:
+    """Соответствие нормализованное имя -> имя в том виде, в каком оно добавлено.
+
+    Номера строк здесь не хранятся: при вставке и удалении строк в середине
+    списка (см. CheckableNameListModel.apply_lines) их пришлось бы сдвигать.
+    """
+
+    def __init__(self, names=()):
+        self.names = {}
+        self.add_many(names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return normalize_name(name) in self.names
+
+    def existing(self, name):
+        """Уже добавленное имя, совпадающее с name, или None."""
+        return self.names.get(normalize_name(name))
+
+    def add(self, name):
+        """Добавляет имя; возвращает False, если такое имя уже есть."""
+        key = normalize_name(name)
+        if key in self.names:
+            return False
+        self.names[key] = name
+        return True
+
+    def add_many(self, names, keys=None):
+        """Добавляет пачку имён за один проход.
+
+        keys — уже посчитанные normalize_name для каждого имени (например, в
+        потоке загрузки); без них ключи считаются здесь. Возвращает список
+        уникальных имён в исходном порядке и список коллизий в виде пар
+        (отброшенное имя, совпавшее с ним имя).
+        """
+        index = self.names
+        unique, collisions = [], []
+        if keys is None:
+            keys = [" ".join(name.split()).casefold() for name in names]
+        for name, key in zip(names, keys):
+            existing = index.get(key)
+            if existing is None:
+                index[key] = name
+                unique.append(name)
+            else:
+                collisions.append((name, existing))
+        return unique, collisions
+
+    def discard_many(self, names):
+        index = self.names
+        for name in names:
+            index.pop(" ".join(name.split()).casefold(), None)
+
+    def clear(self):
+        self.names = {}
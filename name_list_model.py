@@ -0,0 +1,174 @@
+"""Модель списка имён с флажками для виртуализированного представления.
+
+Вместо отдельного QCheckBox на каждую строку хранится список имён и
+массив отметок, а представление отрисовывает только видимые строки.
+Фильтр по началу имени хранится в самой модели как список номеров
+видимых строк, поэтому не требует вызова data() для каждой строки.
+"""
+from array import array
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+from instrumentation import timed
+from line_diff import diff_lines
+from name_index import NameIndex
+
+
+class CheckableNameListModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.names = []
+        self.keys = []  # Имена в нижнем регистре для фильтра
+        self.checked = bytearray()
+        self.name_index = NameIndex()
+        self.prefix = ""
+        self.visible = None  # Номера видимых строк; None — видны все
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.names) if self.visible is None else len(self.visible)
+
+    def source_row(self, row):
+        return row if self.visible is None else self.visible[row]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.source_row(index.row())
+        if role == Qt.DisplayRole:
+            return self.names[row]
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if self.checked[row] else Qt.Unchecked
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or not index.isValid():
+            return False
+        self.checked[self.source_row(index.row())] = 1 if value == Qt.Checked else 0
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def contains(self, name):
+        return name in self.name_index
+
+    @timed("names.append")
+    def append_names(self, names, checked=False, normalized=None):
+        """Добавляет пачку имён в конец списка одной вставкой строк.
+
+        Повторы (с точностью до регистра и пробелов) отбрасываются; возвращается
+        список пар (отброшенное имя, уже существующее имя). normalized —
+        готовые ключи сравнения имён, если они посчитаны заранее.
+        """
+        first = len(self.names)
+        names, collisions = self.name_index.add_many(names, normalized)
+        if not names:
+            return collisions
+        keys = [name.casefold() for name in names]
+        if self.visible is None:
+            self.beginInsertRows(QModelIndex(), first, first + len(names) - 1)
+        else:
+            # При активном фильтре видны только подходящие новые имена
+            shown = [first + i for i, key in enumerate(keys) if key.startswith(self.prefix)]
+            if shown:
+                self.beginInsertRows(QModelIndex(), len(self.visible), len(self.visible) + len(shown) - 1)
+        self.names.extend(names)
+        self.keys.extend(keys)
+        self.checked.extend(b"\x01" * len(names) if checked else bytes(len(names)))
+        if self.visible is None:
+            self.endInsertRows()
+        elif shown:
+            self.visible.extend(shown)
+            self.endInsertRows()
+        return collisions
+
+    @timed("names.apply_lines")
+    def apply_lines(self, lines):
+        """Приводит список к строкам lines, применяя только построчную разницу.
+
+        Отметки неизменившихся строк сохраняются, новые строки не отмечены.
+        Повторы отбрасываются до сравнения так же, как при загрузке файла
+        заново (остаётся первое вхождение), поэтому порядок имён не зависит
+        от того, каким был список до правки. Возвращает пары (отброшенное
+        имя, совпавшее имя) для всех повторов в lines.
+        """
+        lines, collisions = NameIndex().add_many(lines)
+        edits = diff_lines(self.names, lines)
+        if not edits:
+            return collisions
+        filtered = self.visible is not None
+        if filtered:
+            # Номера видимых строк сдвигаются при любой правке: фильтр пересчитывается заново
+            self.beginResetModel()
+        for i1, i2, _, _ in reversed(edits):
+            if i1 == i2:
+                continue
+            if not filtered:
+                self.beginRemoveRows(QModelIndex(), i1, i2 - 1)
+            self.name_index.discard_many(self.names[i1:i2])
+            del self.names[i1:i2], self.keys[i1:i2], self.checked[i1:i2]
+            if not filtered:
+                self.endRemoveRows()
+
+        # После удалений остались только имена из lines, а в lines повторов уже нет
+        for _, _, j1, j2 in edits:
+            if j1 == j2:
+                continue
+            names, _ = self.name_index.add_many(lines[j1:j2])
+            if not filtered:
+                self.beginInsertRows(QModelIndex(), j1, j2 - 1)
+            self.names[j1:j1] = names
+            self.keys[j1:j1] = [name.casefold() for name in names]
+            self.checked[j1:j1] = bytes(len(names))
+            if not filtered:
+                self.endInsertRows()
+        if filtered:
+            self.visible = array("l", [row for row, key in enumerate(self.keys) if key.startswith(self.prefix)])
+            self.endResetModel()
+        return collisions
+
+    def clear(self):
+        self.beginResetModel()
+        self.names = []
+        self.keys = []
+        self.checked = bytearray()
+        self.name_index.clear()
+        if self.visible is not None:
+            self.visible = array("l")
+        self.endResetModel()
+
+    @timed("names.filter")
+    def set_prefix(self, prefix):
+        """Оставляет видимыми только имена, начинающиеся с prefix (без учёта регистра)."""
+        self.beginResetModel()
+        self.prefix = prefix.casefold()
+        if self.prefix:
+            self.visible = array("l", [row for row, key in enumerate(self.keys) if key.startswith(self.prefix)])
+        else:
+            self.visible = None
+        self.endResetModel()
+
+    def set_all_checked(self, value):
+        """Отмечает (или снимает отметку) у всех видимых имён."""
+        if not self.rowCount():
+            return
+        flag = 1 if value else 0
+        if self.visible is None:
+            self.checked = bytearray(b"\x01" * len(self.names)) if flag else bytearray(len(self.names))
+        else:
+            checked = self.checked
+            for row in self.visible:
+                checked[row] = flag
+        self.dataChanged.emit(self.index(0), self.index(self.rowCount() - 1), [Qt.CheckStateRole])
+
+    def checked_count(self):
+        return self.checked.count(1)
+
+    @timed("names.checked")
+    def checked_names(self):
+        return [name for name, flag in zip(self.names, self.checked) if flag]
@@ -0,0 +1,345 @@
+"""Стратегии составления групп: посев 1–N, швейцарская система, круговые группы с плей-офф.
+
+Стратегия по умолчанию (случайная жеребьёвка с выбыванием) —
+bracket.KnockoutPairing. Номер участника одновременно его посев: 0 — первый
+сеянный, то есть порядок имён при старте турнира задаёт рейтинг.
+"""
+import math
+
+from bracket import BracketSchedule, KnockoutPairing, Round
+
+FINALISTS = 2  # Финалистов там, где финальной группы нет: как в финальной паре выбывания
+
+
+def seed_positions(size):
+    """Стандартная расстановка посевов в сетке на size мест (степень двойки): 1–16, 8–9, ..."""
+    order = [0]
+    while len(order) < size:
+        mirror = 2 * len(order) - 1
+        order = [position for seed in order for position in (seed, mirror - seed)]
+    return order
+
+
+def seeded_round(seeds):
+    """Раунд на выбывание по посеву: сильнейшие получают свободный проход до степени двойки."""
+    size = 1 << max(0, len(seeds) - 1).bit_length()
+    positions = seed_positions(size)
+    groups = []
+    for index in range(0, size, 2):
+        groups.append([seeds[p] for p in positions[index:index + 2] if p < len(seeds)])
+    return Round.from_groups(groups)
+
+
+class SeededPairing(KnockoutPairing):
+    """Посев 1–N: первый сеянный играет с последним, со свободными проходами для сильнейших."""
+    name = "seeded"
+
+    def __init__(self):
+        super().__init__(shuffle=False)
+
+    def to_state(self):
+        return {"name": self.name}
+
+    def schedule(self, count):
+        return BracketSchedule.seeded(count)
+
+    def first_round(self, count, rng):
+        round_ = seeded_round(range(count))
+        return round_.ids.tolist(), round_.offsets.tolist()
+
+
+def pair_score_group(players, opponents):
+    """Пары внутри очковой группы по голландской схеме без повторных встреч.
+
+    Верхняя половина группы сопоставляется с нижней (первый с первым и т. д.).
+    Это задача о паросочетании в двудольном графе, где рёбра — ещё не
+    игравшие пары; она решается жадным проходом по диагонали и затем
+    поиском увеличивающих путей (алгоритм Куна), так что число пар
+    максимально. Возвращает пары и не получивших пару (в порядке рейтинга).
+    """
+    half = len(players) // 2
+    top, bottom = players[:half], players[half:]
+    match_top = [None] * len(top)
+    match_bottom = [None] * len(bottom)
+
+    def candidates(i):
+        # Сначала свой «диагональный» соперник, затем ниже по рейтингу, затем выше
+        yield from range(i, len(bottom))
+        yield from range(i - 1, -1, -1)
+
+    def allowed(i, j):
+        return bottom[j] not in opponents[top[i]]
+
+    for i in range(len(top)):
+        for j in candidates(i):
+            if match_bottom[j] is None and allowed(i, j):
+                match_top[i], match_bottom[j] = j, i
+                break
+
+    for root in range(len(top)):
+        if match_top[root] is not None:
+            continue
+        visited = bytearray(len(bottom))
+        stack = [[root, candidates(root), None]]
+        while stack:
+            level = stack[-1]
+            i = level[0]
+            for j in level[1]:
+                if visited[j] or not allowed(i, j):
+                    continue
+                visited[j] = 1
+                level[2] = j
+                if match_bottom[j] is None:
+                    # Увеличивающий путь найден: перекидываем пары вдоль него
+                    for top_index, _, bottom_index in stack:
+                        match_top[top_index], match_bottom[bottom_index] = bottom_index, top_index
+                    stack = []
+                else:
+                    stack.append([match_bottom[j], candidates(match_bottom[j]), None])
+                break
+            else:
+                stack.pop()
+
+    pairs = [[top[i], bottom[j]] for i, j in enumerate(match_top) if j is not None]
+    unmatched = [top[i] for i, j in enumerate(match_top) if j is None]
+    unmatched += [bottom[j] for j, i in enumerate(match_bottom) if i is None]
+    return pairs, unmatched
+
+
+class SwissPairing:
+    """Швейцарская система: все играют все туры, пары — из равных по очкам, без повторов.
+
+    Победа в группе приносит очко, свободный проход — тоже. Не нашедшие пару
+    в своей очковой группе опускаются в следующую. Если в самом конце
+    остаются участники, которые уже играли друг с другом, повторная встреча
+    допускается. Победитель — по очкам, затем по коэффициенту Бухгольца
+    (сумма очков соперников), затем по посеву.
+    """
+    name = "swiss"
+
+    def __init__(self, rounds=None):
+        self.rounds = rounds
+        # Итоги уже завершённых туров: (сетка, последний учтённый тур, очки, соперники, проходы)
+        self.cache = None
+
+    def to_state(self):
+        return {"name": self.name, "rounds": self.rounds}
+
+    def total_rounds(self, count):
+        return self.rounds or max(1, math.ceil(math.log2(count)))
+
+    def schedule(self, count):
+        return BracketSchedule([(count, count // 2, 0, count % 2)] * self.total_rounds(count))
+
+    def first_round(self, count, rng):
+        round_ = self.make_round([0] * count, [set() for _ in range(count)], set())
+        return round_.ids.tolist(), round_.offsets.tolist()
+
+    def standings(self, bracket):
+        """Очки, множества соперников и получившие свободный проход по сыгранным турам.
+
+        Итоги запоминаются между вызовами, так что каждый новый тур добавляет
+        только свои группы: соперники учитываются для всех туров (состав
+        групп не меняется), очки — для всех, кроме текущего, где победители
+        ещё могут измениться. Если туры сетки изменились (отмена хода), итоги
+        пересчитываются заново.
+        """
+        rounds = bracket.rounds
+        cache = self.cache
+        if (cache is None or cache[0] is not bracket or len(cache[1]) > len(rounds)
+                or any(a is not b for a, b in zip(cache[1], rounds))):
+            count = len(bracket.names)
+            cache = self.cache = (bracket, [], [0] * count, [set() for _ in range(count)], set())
+        _, counted, scores, opponents, byes = cache
+        for round_ in rounds[len(counted):]:
+            if counted:
+                self.count_scores(counted[-1], scores)
+            self.count_groups(round_, opponents, byes)
+            counted.append(round_)
+
+        scores = list(scores)
+        if rounds:
+            self.count_scores(rounds[-1], scores)
+        return scores, opponents, byes
+
+    @staticmethod
+    def count_scores(round_, scores):
+        for winner in round_.winners:
+            if winner >= 0:
+                scores[winner] += 1
+
+    @staticmethod
+    def count_groups(round_, opponents, byes):
+        ids, offsets = round_.ids, round_.offsets
+        for index in range(round_.group_count):
+            start, end = offsets[index], offsets[index + 1]
+            if end - start == 1:
+                byes.add(ids[start])
+            elif end - start == 2:
+                first, second = ids[start], ids[start + 1]
+                opponents[first].add(second)
+                opponents[second].add(first)
+            else:
+                group = ids[start:end]
+                for member in group:
+                    opponents[member].update(group)
+                    opponents[member].discard(member)
+
+    def make_round(self, scores, opponents, byes):
+        order = sorted(range(len(scores)), key=lambda p: (-scores[p], p))
+        bye = None
+        if len(order) % 2:
+            # Свободный проход — самому слабому из ещё не получавших его
+            bye = next((p for p in reversed(order) if p not in byes), order[-1])
+            order.remove(bye)
+
+        pairs, floaters = [], []
+        start = 0
+        while start < len(order):
+            end = start
+            while end < len(order) and scores[order[end]] == scores[order[start]]:
+                end += 1
+            group_pairs, floaters = pair_score_group(floaters + order[start:end], opponents)
+            pairs += group_pairs
+            start = end
+        if floaters:
+            # Пары без повторов не нашлось: допускаем повторную встречу
+            no_history = [()] * len(scores)
+            group_pairs, _ = pair_score_group(floaters, no_history)
+            pairs += group_pairs
+        if bye is not None:
+            pairs.append([bye])
+        return Round.from_groups(pairs)
+
+    def next_round(self, bracket):
+        if len(bracket.rounds) >= self.total_rounds(len(bracket.names)):
+            return None
+        return self.make_round(*self.standings(bracket))
+
+    def ranking(self, bracket):
+        """Участники по местам: очки, затем коэффициент Бухгольца, затем посев."""
+        scores, opponents, _ = self.standings(bracket)
+        return sorted(
+            range(len(scores)),
+            key=lambda p: (scores[p], sum(scores[o] for o in opponents[p]), -p), reverse=True
+        )
+
+    def champion(self, bracket):
+        return self.ranking(bracket)[0]
+
+    def finalists(self, bracket):
+        """Финала нет: финалисты — верх итоговой таблицы."""
+        return self.ranking(bracket)[:FINALISTS]
+
+
+class PoolsPairing(KnockoutPairing):
+    """Круговые группы (каждый с каждым), из которых лучшие выходят в плей-офф по посеву.
+
+    Участники распределяются по группам «змейкой» по посеву. Внутри группы
+    туры составляются методом вращения; за тур каждый играет не больше
+    одной встречи. Место в группе — по числу побед, затем по посеву.
+    """
+    name = "pools"
+
+    def __init__(self, pool_size=4, advance=2):
+        super().__init__(shuffle=False)
+        if pool_size < 2 or advance < 1:
+            raise ValueError("Размер группы должен быть не меньше 2, число выходящих — не меньше 1")
+        self.pool_size = pool_size
+        self.advance = advance
+
+    def to_state(self):
+        return {"name": self.name, "pool_size": self.pool_size, "advance": self.advance}
+
+    def pools(self, count):
+        number = max(1, math.ceil(count / self.pool_size))
+        pools = [[] for _ in range(number)]
+        for seed in range(count):
+            row, column = divmod(seed, number)
+            pools[number - 1 - column if row % 2 else column].append(seed)
+        return pools
+
+    def pool_rounds(self, count):
+        return max(len(pool) - 1 if len(pool) % 2 == 0 else len(pool) for pool in self.pools(count))
+
+    @staticmethod
+    def round_robin_pairs(pool, round_index):
+        players = pool + [None] if len(pool) % 2 else list(pool)
+        size = len(players)
+        if size < 2 or round_index >= size - 1:
+            return []
+        rest = players[1:]
+        shift = round_index % len(rest)
+        players = [players[0]] + rest[-shift:] + rest[:-shift] if shift else players
+        pairs = [[players[i], players[size - 1 - i]] for i in range(size // 2)]
+        return [pair for pair in pairs if None not in pair]
+
+    def schedule(self, count):
+        # «Змейка» даёт группы двух размеров: extra групп по base + 1 и остальные по base
+        number = max(1, math.ceil(count / self.pool_size))
+        base, extra = divmod(count, number)
+        sizes = [(base + 1, extra), (base, number - extra)]
+        pool_rounds = max(size - 1 if size % 2 == 0 else size for size, pools in sizes if pools)
+        shapes = []
+        for index in range(pool_rounds):
+            # Метод вращения: size // 2 встреч за тур, size - 1 туров при чётном size и size при нечётном
+            pairs = sum(pools * (size // 2) for size, pools in sizes if index < size - 1 + size % 2)
+            shapes.append((2 * pairs, pairs, 0, 0))
+        qualifiers = sum(pools * min(self.advance, size) for size, pools in sizes)
+        playoff = BracketSchedule.seeded(qualifiers)
+        shapes += zip(playoff.participants, playoff.pairs, playoff.triples, playoff.byes)
+        return BracketSchedule(shapes)
+
+    def pool_round(self, count, round_index):
+        groups = [pair for pool in self.pools(count) for pair in self.round_robin_pairs(pool, round_index)]
+        return Round.from_groups(groups)
+
+    def first_round(self, count, rng):
+        round_ = self.pool_round(count, 0)
+        return round_.ids.tolist(), round_.offsets.tolist()
+
+    def pool_places(self, bracket):
+        """Группы, упорядоченные по местам: по числу побед, затем по посеву."""
+        wins = [0] * len(bracket.names)
+        for round_ in bracket.rounds[:self.pool_rounds(len(bracket.names))]:
+            for winner in round_.chosen_winners():
+                wins[winner] += 1
+        return [sorted(pool, key=lambda p: (-wins[p], p)) for pool in self.pools(len(wins))]
+
+    def qualifiers(self, bracket):
+        """Вышедшие из групп: сначала победители групп, затем вторые места и т. д."""
+        places = [pool[:self.advance] for pool in self.pool_places(bracket)]
+        return [pool[place] for place in range(self.advance) for pool in places if place < len(pool)]
+
+    def next_round(self, bracket):
+        count = len(bracket.names)
+        played = len(bracket.rounds)
+        pool_rounds = self.pool_rounds(count)
+        if played < pool_rounds:
+            return self.pool_round(count, played)
+        if played == pool_rounds:
+            qualifiers = self.qualifiers(bracket)
+            return seeded_round(qualifiers) if len(qualifiers) > 1 else None
+        return super().next_round(bracket)
+
+    def champion(self, bracket):
+        if len(bracket.rounds) <= self.pool_rounds(len(bracket.names)):
+            return self.qualifiers(bracket)[0]
+        return super().champion(bracket)
+
+    def finalists(self, bracket):
+        """Финал плей-офф; если плей-офф не понадобился — верх единственной группы."""
+        if len(bracket.rounds) <= self.pool_rounds(len(bracket.names)):
+            return self.pool_places(bracket)[0][:FINALISTS]
+        return super().finalists(bracket)
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (KnockoutPairing, SeededPairing, SwissPairing, PoolsPairing)}
+
+
+def strategy_from_state(state):
+    params = dict(state)
+    name = params.pop("name")
+    if name not in STRATEGIES:
+        raise ValueError(f"Неизвестная стратегия жеребьёвки: {name}")
+    return STRATEGIES[name](**params)
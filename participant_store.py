@@ -0,0 +1,618 @@
+"""Участники между турнирами: номера, псевдонимы, рейтинги и личные встречи.
+
+В participants.txt — только имена, поэтому здесь, в отдельной базе SQLite,
+каждому имени выдаётся постоянный номер, к номеру можно привязать
+псевдонимы (другие написания того же участника), а по завершённым
+турнирам из индекса отчётов (report_index.py) считаются рейтинги Эло и
+Глико и счёт личных встреч.
+
+Группа с выбранным победителем — это встречи победителя с каждым из
+остальных участников группы; в тройке каждая встреча идёт с весом 1/2,
+чтобы победа в тройке стоила столько же, сколько победа в паре.
+Группы из одного (свободный проход) и группы без победителя не учитываются.
+
+Раунд турнира — период рейтинга Глико: все встречи раунда считаются по
+рейтингам до раунда, а отклонение рейтинга растёт со временем без игр
+(DEVIATION_GROWTH за день). Встречи обрабатываются массивами NumPy не по
+одной, а уровнями: уровень раунда — на единицу больше последнего уровня
+его участников, поэтому в одном уровне каждый участник встречается только
+в одном раунде, а свои встречи проходит в том же порядке, что и при
+последовательном расчёте. Результат совпадает с расчётом встреча за
+встречей, а число шагов — длина самой длинной цепочки раундов, а не
+число встреч.
+
+Хранилище помнит последний учтённый отчёт (update дописывает только
+новые), поэтому его можно обновлять из любого экземпляра приложения и из
+cli.py. recompute пересчитывает всё заново, быстрее всего — по
+колоночному архиву (history_export.py), где встречи уже лежат массивами.
+"""
+import json
+import math
+import os
+import sqlite3
+from itertools import chain
+
+import numpy as np
+
+from bracket import Bracket
+from instrumentation import timed
+
+DEFAULT_RATING = 1500.0
+DEFAULT_DEVIATION = 350.0  # Отклонение рейтинга нового участника, оно же наибольшее
+DEVIATION_GROWTH = 18.1  # Рост отклонения за день без игр: за год 50 возвращается к 350
+ELO_K = 32.0
+GLICKO_Q = math.log(10) / 400  # Заодно 10 ** (x / 400) = exp(x * GLICKO_Q)
+GLICKO_G = 3.0 * GLICKO_Q ** 2 / math.pi ** 2  # g(RD) = 1 / sqrt(1 + GLICKO_G * RD^2)
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+CHUNK_OUTCOMES = 1 << 21  # Результатов участников в одной порции расчёта
+ROUND_KEY = 1 << 16  # Ключ раунда: номер турнира * ROUND_KEY + номер раунда
+PAIR_DTYPE = np.dtype("<i4")  # Номера соперников и победы в строках личных встреч
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS participants (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    elo REAL NOT NULL DEFAULT {DEFAULT_RATING},
+    rating REAL NOT NULL DEFAULT {DEFAULT_RATING},
+    deviation REAL NOT NULL DEFAULT {DEFAULT_DEVIATION},
+    last_played REAL,
+    matches INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT PRIMARY KEY,
+    participant INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS head_to_head (
+    first INTEGER PRIMARY KEY,
+    seconds BLOB NOT NULL,
+    first_wins BLOB NOT NULL,
+    second_wins BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS store_state (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+
+class Ratings:
+    """Рейтинги части участников в массивах; ids — их номера в хранилище по возрастанию.
+
+    last_played — день последней встречи от 1970-01-01 (NaN — не играл).
+    """
+
+    def __init__(self, ids, elo=None, rating=None, deviation=None, last_played=None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        count = len(self.ids)
+        self.elo = np.full(count, DEFAULT_RATING) if elo is None else np.asarray(elo, dtype=np.float64)
+        self.rating = np.full(count, DEFAULT_RATING) if rating is None else np.asarray(rating, dtype=np.float64)
+        self.deviation = (np.full(count, DEFAULT_DEVIATION) if deviation is None
+                          else np.asarray(deviation, dtype=np.float64))
+        self.last_played = (np.full(count, np.nan) if last_played is None
+                            else np.asarray(last_played, dtype=np.float64))
+        self.matches = np.zeros(count, dtype=np.int64)  # Прибавка к сохранённым счётчикам
+        self.wins = np.zeros(count, dtype=np.int64)
+
+    def merged(self, other):
+        """Рейтинги участников обоих объектов; номера в них не пересекаются."""
+        ids = np.concatenate((self.ids, other.ids))
+        order = np.argsort(ids, kind="stable")
+        result = Ratings(ids[order])
+        for name in ("elo", "rating", "deviation", "last_played", "matches", "wins"):
+            setattr(result, name, np.concatenate((getattr(self, name), getattr(other, name)))[order])
+        return result
+
+    def play(self, group, participant, won, round_key, day):
+        """Учитывает результаты участников в группах; возвращает личные встречи.
+
+        Аргументы — массивы по результату участника: ключ группы (результаты
+        одной группы подряд), номер участника в хранилище, победил ли он,
+        ключ раунда (не убывает) и день турнира. Возвращает (первый,
+        второй, побед первого, побед второго) по парам номеров first < second.
+        """
+        if not len(group):
+            return empty_head_to_head()
+        # Номера хранилища плотные, поэтому в номера массивов их переводит таблица, а не поиск
+        lookup = np.full(int(self.ids[-1]) + 1 if len(self.ids) else 0, -1, dtype=np.int64)
+        lookup[self.ids] = np.arange(len(self.ids))
+        local = lookup[participant]
+        won = np.asarray(won, dtype=bool)
+        new_group = np.empty(len(group), dtype=bool)
+        new_group[0] = True
+        np.not_equal(group[1:], group[:-1], out=new_group[1:])
+        group_index = np.cumsum(new_group) - 1
+        groups = int(group_index[-1]) + 1
+        sizes = np.bincount(group_index, minlength=groups)
+        decided = (np.bincount(group_index, won, minlength=groups) == 1) & (sizes >= 2)
+        winner_of = np.full(groups, -1, dtype=np.int64)
+        winner_of[group_index[won]] = local[won]
+
+        counted = decided[group_index]
+        self.matches += np.bincount(local[counted], minlength=len(self.ids))
+        self.wins += np.bincount(local[counted & won], minlength=len(self.ids))
+
+        # Встречи: победитель группы с каждым из остальных, вес 1 / (размер группы - 1)
+        losers = counted & ~won
+        loser_groups = group_index[losers]
+        winners = winner_of[loser_groups]
+        losers_local = local[losers]
+        weights = 1.0 / (sizes[loser_groups] - 1)
+        self.rate(winners, losers_local, loser_groups, weights, round_key[losers], day[losers])
+        return head_to_head(self.ids[winners], self.ids[losers_local])
+
+    def rate(self, winners, losers, groups, weights, round_key, day):
+        """Рейтинги по встречам (номера в массивах этого объекта), уровнями раундов.
+
+        groups — номер группы встречи; встречи группы идут подряд, раунды — по порядку.
+        """
+        count = len(winners)
+        if not count:
+            return
+        round_starts = np.concatenate(([0], np.flatnonzero(np.diff(round_key)) + 1, [count]))
+
+        # Уровень раунда — на единицу больше последнего уровня его участников
+        sides = np.empty(2 * count, dtype=np.int64)
+        sides[0::2], sides[1::2] = winners, losers
+        side_starts = 2 * round_starts
+        last_level = np.zeros(len(self.ids), dtype=np.int32)
+        levels = np.empty(len(round_starts) - 1, dtype=np.int32)
+        for index in range(len(levels)):
+            members = sides[side_starts[index]:side_starts[index + 1]]
+            level = last_level[members].max() + 1
+            last_level[members] = level
+            levels[index] = level
+        pair_levels = np.repeat(levels, np.diff(round_starts))
+
+        # Встречи по уровням; у крупных турниров уровни уже идут по порядку раундов
+        if np.any(pair_levels[1:] < pair_levels[:-1]):
+            order = np.argsort(pair_levels, kind="stable")
+            winners, losers, groups, weights, day, pair_levels = (
+                values[order] for values in (winners, losers, groups, weights, day, pair_levels)
+            )
+            sides[0::2], sides[1::2] = winners, losers
+
+        # Участники уровня: проигравшие всех встреч и победитель первой встречи каждой группы
+        first_of_group = np.empty(count, dtype=bool)
+        first_of_group[0] = True
+        first_of_group[1:] = (groups[1:] != groups[:-1]) | (pair_levels[1:] != pair_levels[:-1])
+        is_member = np.empty(2 * count, dtype=bool)
+        is_member[0::2], is_member[1::2] = first_of_group, True
+        member_index = np.cumsum(is_member) - 1
+        winner_index = np.maximum.accumulate(np.where(first_of_group, member_index[0::2], 0))
+        loser_index = member_index[1::2]
+        members = sides[is_member]
+        member_days = np.repeat(day, 2)[is_member]
+        member_levels = np.repeat(pair_levels, 2)[is_member]
+        own = np.empty(2 * count, dtype=np.int64)
+        own[0::2], own[1::2] = winner_index, loser_index
+        opponents = np.empty(2 * count, dtype=np.int64)
+        opponents[0::2], opponents[1::2] = loser_index, winner_index
+        scores = np.tile(np.array([1.0, 0.0]), count)
+        side_weights = np.repeat(weights, 2)
+        member_starts = np.concatenate(([0], np.flatnonzero(np.diff(member_levels)) + 1, [len(members)]))
+        level_starts = 2 * np.concatenate(([0], np.flatnonzero(np.diff(pair_levels)) + 1, [count]))
+
+        for level in range(len(member_starts) - 1):
+            start, end = member_starts[level], member_starts[level + 1]
+            side_start, side_end = level_starts[level], level_starts[level + 1]
+            self.rate_level(
+                members[start:end], member_days[start:end], own[side_start:side_end] - start,
+                opponents[side_start:side_end] - start, scores[side_start:side_end], side_weights[side_start:side_end]
+            )
+
+    def rate_level(self, members, days, own, opponents, scores, weights):
+        """Один уровень: каждый участник members — в одной группе; own и opponents — номера в members.
+
+        Уровней бывают десятки тысяч по несколько сотен встреч, и время
+        здесь определяет число операций NumPy, а не объём данных.
+        """
+        size = len(members)
+        elo, rating, deviation = self.elo[members], self.rating[members], self.deviation[members]
+        # Отклонение растёт с последней встречи; у не игравших оно уже наибольшее
+        idle = np.fmax(days - self.last_played[members], 0.0)
+        deviation = np.minimum(np.sqrt(deviation * deviation + DEVIATION_GROWTH ** 2 * idle), DEFAULT_DEVIATION)
+
+        # Глико: g(RD соперника), ожидаемый результат и дисперсия по встречам участника
+        g_opponent = (1.0 / np.sqrt(1.0 + GLICKO_G * deviation * deviation))[opponents]
+        expected = 1.0 / (1.0 + np.exp(g_opponent * (rating[opponents] - rating[own]) * GLICKO_Q))
+        weighted_g = weights * g_opponent
+        variance = np.bincount(own, weighted_g * g_opponent * expected * (1.0 - expected), minlength=size)
+        precision = 1.0 / (deviation * deviation) + GLICKO_Q ** 2 * variance
+        improvement = np.bincount(own, weighted_g * (scores - expected), minlength=size)
+        self.rating[members] = rating + GLICKO_Q / precision * improvement
+        self.deviation[members] = np.sqrt(1.0 / precision)
+
+        elo_expected = 1.0 / (1.0 + np.exp((elo[opponents] - elo[own]) * GLICKO_Q))
+        self.elo[members] = elo + ELO_K * np.bincount(own, weights * (scores - elo_expected), minlength=size)
+        self.last_played[members] = days
+
+
+def empty_head_to_head():
+    return (np.zeros(0, np.int64),) * 4
+
+
+def count_pairs(first, second, first_wins, second_wins):
+    """Складывает счёт повторяющихся пар; результат — по возрастанию (first, second)."""
+    pairs, inverse = np.unique((first << 32) | second, return_inverse=True)
+    return (
+        pairs >> 32, pairs & 0xFFFFFFFF,
+        np.bincount(inverse, first_wins, minlength=len(pairs)).astype(np.int64),
+        np.bincount(inverse, second_wins, minlength=len(pairs)).astype(np.int64),
+    )
+
+
+def head_to_head(winners, losers):
+    """Счёт личных встреч по парам (first < second) из номеров победителей и проигравших."""
+    if not len(winners):
+        return empty_head_to_head()
+    first, second = np.minimum(winners, losers), np.maximum(winners, losers)
+    first_won = winners == first
+    return count_pairs(first, second, first_won, ~first_won)
+
+
+class ParticipantStore:
+    def __init__(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        self.name_ids = None  # Имя или псевдоним -> номер; перечитывается, если базу менял другой процесс
+        self.data_version = None
+
+    def close(self):
+        self.connection.close()
+
+    # Номера и псевдонимы
+
+    def known_names(self):
+        version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        if self.name_ids is None or version != self.data_version:
+            self.name_ids = dict(self.connection.execute("SELECT name, id FROM participants"))
+            self.name_ids.update(self.connection.execute("SELECT alias, participant FROM aliases"))
+            self.data_version = version
+        return self.name_ids
+
+    def resolve(self, names, create=True):
+        """Номера участников по именам и псевдонимам; новые имена добавляются (create) или дают -1."""
+        known = self.known_names()
+        ids = np.fromiter((known.get(name, -1) for name in names), np.int64, len(names))
+        if create:
+            missing = np.flatnonzero(ids < 0)
+            if len(missing):
+                next_id = (self.connection.execute("SELECT max(id) FROM participants").fetchone()[0] or 0) + 1
+                added = {}
+                for index in missing.tolist():
+                    name = names[index]
+                    if name not in added:
+                        added[name] = next_id + len(added)
+                    ids[index] = added[name]
+                self.connection.executemany("INSERT INTO participants (id, name) VALUES (?, ?)",
+                                            ((number, name) for name, number in added.items()))
+                known.update(added)
+        return ids
+
+    def participant_id(self, name):
+        return self.known_names().get(name)
+
+    def add_alias(self, alias, name):
+        """Привязывает псевдоним к участнику name; возвращает True, если рейтинги нужно пересчитать.
+
+        Если под псевдонимом уже играл отдельный участник, его записи
+        сливаются с участником name: номер освобождается, а рейтинги и
+        личные встречи верны только после recompute.
+        """
+        if alias == name:
+            raise ValueError("Псевдоним совпадает с именем участника")
+        connection = self.connection
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            target = int(self.resolve([name])[0])
+            known = self.known_names()
+            current = known.get(alias)
+            if current == target:
+                return False
+            if current is not None and connection.execute(
+                    "SELECT 1 FROM aliases WHERE alias = ?", (alias,)).fetchone():
+                raise ValueError(f"«{alias}» уже псевдоним другого участника")
+            merged = current is not None
+            if merged:
+                connection.execute("UPDATE aliases SET participant = ? WHERE participant = ?", (target, current))
+                connection.execute("DELETE FROM participants WHERE id = ?", (current,))
+                self.set_state("stale", 1)
+            connection.execute("INSERT INTO aliases (alias, participant) VALUES (?, ?)", (alias, target))
+        self.name_ids = None
+        return merged
+
+    # Служебное состояние
+
+    def state(self, key, default=None):
+        row = self.connection.execute("SELECT value FROM store_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, key, value):
+        self.connection.execute("INSERT OR REPLACE INTO store_state (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def last_report(self):
+        return self.state("last_report", 0)
+
+    @property
+    def stale(self):
+        """Псевдоним слил двух участников, и рейтинги ждут пересчёта."""
+        return bool(self.state("stale", 0))
+
+    # Рейтинги
+
+    def select_ids(self, query, ids):
+        """Строки запроса query по номерам ids; query выбирает их из временной таблицы selected."""
+        connection = self.connection
+        connection.execute("CREATE TEMP TABLE IF NOT EXISTS selected (id INTEGER PRIMARY KEY)")
+        connection.executemany("INSERT INTO selected (id) VALUES (?)", ((number,) for number in ids.tolist()))
+        try:
+            return connection.execute(query).fetchall()
+        finally:
+            connection.execute("DELETE FROM selected")
+
+    def load(self, ids):
+        """Сохранённые рейтинги участников с номерами ids (по возрастанию, без повторов)."""
+        rows = self.select_ids(
+            "SELECT elo, rating, deviation, last_played FROM participants "
+            "WHERE id IN (SELECT id FROM selected) ORDER BY id", ids
+        )
+        if len(rows) != len(ids):
+            raise ValueError("В хранилище нет части участников")
+        values = np.array(rows, dtype=np.float64).reshape(-1, 4)  # NULL становится NaN
+        return Ratings(ids, values[:, 0], values[:, 1], values[:, 2], values[:, 3])
+
+    def save(self, ratings, pairs):
+        last_played = np.where(np.isnan(ratings.last_played), None, ratings.last_played)
+        self.connection.executemany(
+            "UPDATE participants SET elo = ?, rating = ?, deviation = ?, last_played = ?, "
+            "matches = matches + ?, wins = wins + ? WHERE id = ?",
+            zip(ratings.elo.tolist(), ratings.rating.tolist(), ratings.deviation.tolist(), last_played.tolist(),
+                ratings.matches.tolist(), ratings.wins.tolist(), ratings.ids.tolist())
+        )
+        self.save_head_to_head(pairs)
+
+    def save_head_to_head(self, pairs):
+        """Прибавляет счёт личных встреч (first, second, побед first, побед second) к сохранённому.
+
+        Встречи участника first со всеми соперниками с большим номером —
+        одна строка: массивы int32 номеров соперников (по возрастанию) и
+        побед, поэтому миллионы пар записываются тысячами строк и
+        складываются с прежними массивами NumPy, а не запросом на пару.
+        """
+        first, second, first_wins, second_wins = pairs
+        if not len(first):
+            return
+        rows = self.select_ids(
+            "SELECT first, seconds, first_wins, second_wins FROM head_to_head "
+            "WHERE first IN (SELECT id FROM selected)", np.unique(first)
+        )
+        if rows:
+            saved = [np.frombuffer(b"".join(row[column] for row in rows), PAIR_DTYPE) for column in (1, 2, 3)]
+            lengths = [len(row[1]) // PAIR_DTYPE.itemsize for row in rows]
+            first, second, first_wins, second_wins = count_pairs(
+                np.concatenate((np.repeat(np.array([row[0] for row in rows], dtype=np.int64), lengths), first)),
+                np.concatenate((saved[0].astype(np.int64), second)),
+                np.concatenate((saved[1], first_wins)), np.concatenate((saved[2], second_wins)),
+            )
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(first)) + 1))
+        bounds = np.append(starts, len(first)) * PAIR_DTYPE.itemsize
+        columns = [values.astype(PAIR_DTYPE).tobytes() for values in (second, first_wins, second_wins)]
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO head_to_head (first, seconds, first_wins, second_wins) VALUES (?, ?, ?, ?)",
+            (
+                (number, columns[0][start:end], columns[1][start:end], columns[2][start:end])
+                for number, start, end in zip(first[starts].tolist(), bounds[:-1].tolist(), bounds[1:].tolist())
+            )
+        )
+
+    def play(self, chunks):
+        """Учитывает порции результатов (группы, участники, победы, раунды, дни) и сохраняет итог.
+
+        Рейтинги участника читаются из базы, когда он впервые встретился в
+        порциях, а записываются один раз в конце; личные встречи
+        складываются в памяти. Так число порций не множит обращения к базе.
+        """
+        ratings = Ratings([])
+        pairs = []
+        for group, participant, won, round_key, day in chunks:
+            involved = np.flatnonzero(np.bincount(participant))  # Номера плотные: быстрее np.unique
+            new = involved[~np.isin(involved, ratings.ids, assume_unique=True)]
+            if len(new):
+                ratings = ratings.merged(self.load(new))
+            pairs.append(ratings.play(group, participant, won, round_key, day))
+        if pairs:
+            self.save(ratings, count_pairs(*(np.concatenate(column) for column in zip(*pairs))))
+
+    @timed("ratings.update")
+    def update(self, report_index):
+        """Учитывает отчёты индекса, ещё не попавшие в рейтинги; возвращает их число."""
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            last_report = self.last_report
+            reports = ReportOutcomes(self, report_index.reports_after(last_report), last_report)
+            self.play(reports)
+            self.set_state("last_report", reports.last_report)
+            return reports.played
+
+    @timed("ratings.recompute")
+    def recompute(self, report_index, history_folder=None):
+        """Пересчитывает рейтинги и личные встречи по всем отчётам; возвращает число турниров.
+
+        С history_folder начало истории берётся из колоночного архива, а
+        отчёты новее архива — из индекса.
+        """
+        connection = self.connection
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DELETE FROM head_to_head")
+            connection.execute(
+                "UPDATE participants SET elo = ?, rating = ?, deviation = ?, last_played = NULL, matches = 0, wins = 0",
+                (DEFAULT_RATING, DEFAULT_RATING, DEFAULT_DEVIATION)
+            )
+            archive = ArchiveOutcomes(self, history_folder) if history_folder else None
+            last_report = archive.last_report if archive else 0
+            reports = ReportOutcomes(self, report_index.reports_after(last_report), last_report)
+            self.play(chain(archive or (), reports))
+            self.set_state("last_report", reports.last_report)
+            self.set_state("stale", 0)
+            return (archive.played if archive else 0) + reports.played
+
+    # Чтение
+
+    def ratings_of(self, names):
+        """(рейтинг Глико, отклонение) по именам; у незнакомых — начальные значения."""
+        ids = self.resolve(names, create=False)
+        rating = np.full(len(names), DEFAULT_RATING)
+        deviation = np.full(len(names), DEFAULT_DEVIATION)
+        known = ids >= 0
+        if known.any():
+            present = np.unique(ids[known])
+            with self.connection:  # Временная таблица выборки открывает транзакцию; она сразу закрывается
+                ratings = self.load(present)
+            index = np.searchsorted(present, ids[known])
+            rating[known], deviation[known] = ratings.rating[index], ratings.deviation[index]
+        return rating, deviation
+
+    def seeded(self, names):
+        """Имена по убыванию осторожной оценки силы (рейтинг - 2 отклонения) для посева 1–N.
+
+        Участники без истории оказываются внизу: их отклонение наибольшее.
+        При равенстве сохраняется исходный порядок.
+        """
+        rating, deviation = self.ratings_of(names)
+        order = np.argsort(-(rating - 2.0 * deviation), kind="stable")
+        return [names[index] for index in order.tolist()]
+
+    def top(self, limit=20):
+        """Лучшие по рейтингу Глико: (имя, Глико, отклонение, Эло, встреч, побед)."""
+        return self.connection.execute(
+            "SELECT name, rating, deviation, elo, matches, wins FROM participants "
+            "WHERE matches > 0 ORDER BY rating DESC LIMIT ?", (limit,)
+        ).fetchall()
+
+    def versus(self, name, other):
+        """Счёт личных встреч (побед name, побед other) или None, если участник неизвестен."""
+        first, second = self.participant_id(name), self.participant_id(other)
+        if first is None or second is None:
+            return None
+        low, high = min(first, second), max(first, second)
+        row = self.connection.execute(
+            "SELECT seconds, first_wins, second_wins FROM head_to_head WHERE first = ?", (low,)
+        ).fetchone()
+        wins = (0, 0)
+        if row:
+            seconds = np.frombuffer(row[0], PAIR_DTYPE)
+            index = int(np.searchsorted(seconds, high))
+            if index < len(seconds) and seconds[index] == high:
+                wins = (int(np.frombuffer(row[1], PAIR_DTYPE)[index]), int(np.frombuffer(row[2], PAIR_DTYPE)[index]))
+        return (wins[1], wins[0]) if first > second else wins
+
+
+class ReportOutcomes:
+    """Результаты участников из отчётов индекса порциями по CHUNK_OUTCOMES.
+
+    Отчёты — строки (номер, время завершения в юлианских днях, JSON сетки);
+    после обхода played — число учтённых турниров, last_report — номер
+    последнего просмотренного отчёта (отчёты старого формата без сетки
+    пропускаются).
+    """
+
+    def __init__(self, store, rows, last_report):
+        self.store = store
+        self.rows = rows
+        self.played = 0
+        self.last_report = last_report
+        self.parts = []
+        self.size = 0
+        self.groups = 0  # Ключи групп сквозные в пределах порции
+        self.names = None  # Список участников прошлого отчёта и их номера
+        self.store_ids = None
+
+    def __iter__(self):
+        for report_id, finished_at, bracket_json in self.rows:
+            self.last_report = max(self.last_report, report_id)
+            if not bracket_json:
+                continue
+            bracket = Bracket.from_state(json.loads(bracket_json))
+            if bracket.names != self.names:  # Турниры подряд обычно идут с одним списком участников
+                self.names, self.store_ids = bracket.names, self.store.resolve(bracket.names)
+            self.add(report_id, finished_at - UNIX_EPOCH_JULIAN_DAY, bracket, self.store_ids)
+            self.played += 1
+            if self.size >= CHUNK_OUTCOMES:
+                yield self.take()
+        if self.size:
+            yield self.take()
+
+    def add(self, report_id, day, bracket, store_ids):
+        for number, round_ in enumerate(bracket.rounds, 1):
+            ids = np.asarray(round_.ids, dtype=np.int64)
+            sizes = np.diff(np.asarray(round_.offsets, dtype=np.int64))
+            winners = np.repeat(np.asarray(round_.winners, dtype=np.int64), sizes)
+            count = len(ids)
+            self.parts.append((
+                self.groups + np.repeat(np.arange(len(sizes), dtype=np.int64), sizes),
+                store_ids[ids], ids == winners,
+                np.full(count, report_id * ROUND_KEY + number, dtype=np.int64), np.full(count, day),
+            ))
+            self.groups += len(sizes)
+            self.size += count
+
+    def take(self):
+        columns = [np.concatenate(column) for column in zip(*self.parts)]
+        self.parts, self.size = [], 0
+        return columns
+
+
+class ArchiveOutcomes:
+    """Результаты участников всех турниров колоночного архива (history_export.py) порциями.
+
+    Порция кончается на границе турнира; столбцы читаются из отображённых
+    в память файлов без разбора отчётов.
+    """
+
+    def __init__(self, store, folder):
+        from history_export import HistoryExport, open_columns  # Архив нужен только для пересчёта
+
+        history = HistoryExport(folder)
+        self.last_report = history.last_report
+        tables = open_columns(folder)
+        if history.manifest["format"] == "arrow":
+            tables = {
+                table: {name: column.to_numpy() for name, column in zip(data.column_names, data.columns)}
+                if data is not None else {}
+                for table, data in tables.items()
+            }
+            names = list(tables["participants"].get("name", ()))
+        else:
+            names = history.columns.read_strings("participants", "name") if tables["participants"] else []
+        self.tournaments, self.outcomes = tables["tournaments"], tables["outcomes"]
+        self.played = len(self.tournaments.get("id", ()))
+        self.store_ids = store.resolve(names)
+
+    def __iter__(self):
+        if not self.played or not self.outcomes:
+            return
+        tournament_ids = np.asarray(self.tournaments["id"])
+        days = np.asarray(self.tournaments["finished_at"]) / 86400.0
+        outcomes = self.outcomes
+        column = outcomes["tournament"]
+        total = len(column)
+        start = 0
+        while start < total:
+            end = min(total, start + CHUNK_OUTCOMES)
+            if end < total:
+                end = int(np.searchsorted(column, column[end - 1], side="right"))
+            tournament = np.asarray(column[start:end], dtype=np.int64)
+            yield (
+                np.asarray(outcomes["group_row"][start:end], dtype=np.int64),
+                self.store_ids[np.asarray(outcomes["participant"][start:end], dtype=np.int64)],
+                np.asarray(outcomes["won"][start:end]) != 0,
+                tournament * ROUND_KEY + np.asarray(outcomes["round"][start:end], dtype=np.int64),
+                days[np.searchsorted(tournament_ids, tournament)],
+            )
+            start = end
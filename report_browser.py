@@ -0,0 +1,109 @@
+"""Окно просмотра отчётов: постраничный список, поиск и статистика участников."""
+from PyQt5.QtWidgets import (
+    QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLineEdit, QLabel, QListWidget,
+    QListWidgetItem, QTabWidget, QTableWidget, QTableWidgetItem, QTextEdit, QHeaderView
+)
+from PyQt5.QtCore import Qt
+
+from instrumentation import timed
+
+PAGE_SIZE = 100
+
+
+class ReportBrowser(QMainWindow):
+    def __init__(self, report_index, parent=None):
+        super().__init__(parent)
+        self.report_index = report_index
+        self.page = 0
+        self.query = ""
+        self.setWindowTitle("Выберите отчет")
+
+        tabs = QTabWidget()
+
+        # Вкладка со списком отчётов
+        reports_tab = QWidget()
+        reports_layout = QVBoxLayout()
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Поиск по протоколам")
+        self.search_input.returnPressed.connect(self.search)
+        reports_layout.addWidget(self.search_input)
+
+        self.list_widget = QListWidget()
+        self.list_widget.itemDoubleClicked.connect(self.show_report)
+        reports_layout.addWidget(self.list_widget)
+
+        navigation = QHBoxLayout()
+        self.previous_button = QPushButton("<")
+        self.previous_button.clicked.connect(lambda: self.show_page(self.page - 1))
+        navigation.addWidget(self.previous_button)
+        self.page_label = QLabel()
+        self.page_label.setAlignment(Qt.AlignCenter)
+        navigation.addWidget(self.page_label)
+        self.next_button = QPushButton(">")
+        self.next_button.clicked.connect(lambda: self.show_page(self.page + 1))
+        navigation.addWidget(self.next_button)
+        reports_layout.addLayout(navigation)
+
+        reports_tab.setLayout(reports_layout)
+        tabs.addTab(reports_tab, "Отчёты")
+
+        # Вкладка со статистикой участников
+        self.stats_table = QTableWidget(0, 4)
+        self.stats_table.setHorizontalHeaderLabels(["Участник", "Турниров", "Побед", "Финалов"])
+        self.stats_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.stats_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        tabs.addTab(self.stats_table, "Статистика")
+        tabs.currentChanged.connect(lambda index: index == 1 and self.show_stats())
+
+        self.setCentralWidget(tabs)
+        self.resize(500, 400)
+        self.show_page(0)
+
+    def search(self):
+        self.query = self.search_input.text().strip()
+        self.show_page(0)
+
+    @timed("reports.show_page")
+    def show_page(self, page):
+        total = self.report_index.count(self.query)
+        pages = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
+        self.page = min(max(page, 0), pages - 1)
+
+        self.list_widget.clear()
+        for report_id, file_name, winner, participants_count in self.report_index.list_reports(
+                self.page * PAGE_SIZE, PAGE_SIZE, self.query):
+            item = QListWidgetItem(f"{file_name} — победитель: {winner} ({participants_count} участников)")
+            item.setData(Qt.UserRole, (report_id, file_name))
+            self.list_widget.addItem(item)
+
+        self.page_label.setText(f"Страница {self.page + 1} из {pages} (отчётов: {total})")
+        self.previous_button.setEnabled(self.page > 0)
+        self.next_button.setEnabled(self.page < pages - 1)
+
+    def show_stats(self):
+        rows = self.report_index.top_participants()
+        self.stats_table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                self.stats_table.setItem(row, column, QTableWidgetItem(str(value)))
+
+    def show_report(self, item):
+        report_id, file_name = item.data(Qt.UserRole)
+
+        report_dialog = QMainWindow(self.parent())
+        report_dialog.setWindowTitle(f"Отчет: {file_name}")
+
+        report_display = QTextEdit()
+        report_display.setReadOnly(True)
+        report_display.setPlainText(self.report_index.log_of(report_id))
+
+        layout = QVBoxLayout()
+        layout.addWidget(report_display)
+
+        container = QWidget()
+        container.setLayout(layout)
+        report_dialog.setCentralWidget(container)
+        report_dialog.resize(600, 400)
+        report_dialog.show()
+        self.close()
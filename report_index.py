@@ -0,0 +1,265 @@
+"""Индекс завершённых турниров в SQLite.
+
+Индекс выдаёт монотонные номера отчётов, постраничный список, полнотекстовый
+поиск по протоколам и заранее посчитанную статистику участников (турниров
+сыграно, побед, выходов в финал), поэтому браузер отчётов не читает папку
+с JSON-файлами и сами файлы.
+
+Отчёт хранит сетку турнира в структурном виде (см. Bracket.to_state), а
+текст протокола строится из неё при показе; текст попадает только в
+поисковый индекс. Отчёты старого формата хранят готовый текст протокола.
+"""
+import json
+import os
+import re
+import sqlite3
+
+from bracket import Bracket
+from instrumentation import timed
+from round_log import render_log
+
+REPORT_FILE_PATTERN = re.compile(r"^tournament_(\d+)\.json$")
+IMPORT_BATCH = 1000  # Отчётов в одной транзакции импорта
+INDEX_VERSION = 1  # PRAGMA user_version после завершённого импорта старых отчётов
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file TEXT NOT NULL UNIQUE,
+    winner TEXT NOT NULL,
+    participants_count INTEGER NOT NULL,
+    bracket TEXT,
+    finished_at REAL NOT NULL DEFAULT (julianday('now'))
+);
+CREATE TABLE IF NOT EXISTS participant_stats (
+    name TEXT PRIMARY KEY,
+    played INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    finals INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS participant_stats_wins ON participant_stats (wins DESC);
+"""
+
+
+def fts5_available(connection):
+    try:
+        connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(x)")
+        connection.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+class ReportIndex:
+    def __init__(self, index_path, reports_folder, import_existing=True):
+        """Индекс в файле index_path для отчётов из папки reports_folder.
+
+        Отчёты, сохранённые до появления индекса, переносятся в него один
+        раз: сразу (import_existing) или позже вызовом
+        import_existing_reports, например в фоновом потоке — тогда
+        needs_import остаётся True до конца импорта. Ошибки сразу
+        выполненного импорта остаются в import_failures.
+        """
+        self.reports_folder = reports_folder
+        self.import_failures = []
+        self.connection = sqlite3.connect(index_path, timeout=30)
+        self.connection.executescript(SCHEMA)
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(reports)")]
+        if "bracket" not in columns:
+            self.connection.execute("ALTER TABLE reports ADD COLUMN bracket TEXT")
+        self.full_text = fts5_available(self.connection)
+        if self.full_text:
+            self.connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS report_logs USING fts5(log)")
+        else:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS report_logs (log TEXT NOT NULL)")
+        self.connection.commit()
+        if self.needs_import:
+            self.reserve_report_ids()
+            if import_existing:
+                self.import_failures = self.import_existing_reports()
+
+    @property
+    def needs_import(self):
+        return self.connection.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION
+
+    def close(self):
+        self.connection.close()
+
+    @timed("reports.add")
+    def add_report(self, participants, bracket):
+        """Сохраняет завершённый турнир в файл и в индекс; возвращает номер отчёта."""
+        names = bracket.names
+        return self.insert_report(
+            participants, names[bracket.champion], [names[i] for i in bracket.strategy.finalists(bracket)],
+            render_log(bracket), bracket.to_state()
+        )
+
+    def insert_report(self, participants, winner, finalists, log, bracket_state=None):
+        """Записывает отчёт; номер выделяется внутри транзакции.
+
+        Поэтому два экземпляра приложения не получат один и тот же номер.
+        """
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            return self.write_report(participants, winner, finalists, log, bracket_state)
+
+    def write_report(self, participants, winner, finalists, log, bracket_state=None, report_id=None):
+        """Записывает отчёт в уже открытой транзакции; возвращает его номер.
+
+        Файл отчёта не перезаписывается, если уже существует (импорт старых отчётов).
+        """
+        connection = self.connection
+        bracket_json = json.dumps(bracket_state, ensure_ascii=False, separators=(",", ":")) if bracket_state else None
+        if report_id is None:
+            report_id = connection.execute(
+                "INSERT INTO reports (file, winner, participants_count, bracket) VALUES ('', ?, ?, ?)",
+                (winner, len(participants), bracket_json)
+            ).lastrowid
+        else:
+            connection.execute(
+                "INSERT INTO reports (id, file, winner, participants_count, bracket) VALUES (?, '', ?, ?, ?)",
+                (report_id, winner, len(participants), bracket_json)
+            )
+        file_name = f"tournament_{report_id}.json"
+        connection.execute("UPDATE reports SET file = ? WHERE id = ?", (file_name, report_id))
+        connection.execute("INSERT INTO report_logs (rowid, log) VALUES (?, ?)", (report_id, log))
+        connection.executemany(
+            "INSERT INTO participant_stats (name, played) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET played = played + 1",
+            ((name,) for name in participants)
+        )
+        connection.executemany(
+            "UPDATE participant_stats SET finals = finals + 1 WHERE name = ?",
+            ((name,) for name in finalists)
+        )
+        connection.execute("UPDATE participant_stats SET wins = wins + 1 WHERE name = ?", (winner,))
+
+        report_path = os.path.join(self.reports_folder, file_name)
+        if not os.path.exists(report_path):
+            report = {"participants": participants, "winner": winner, "finalists": list(finalists)}
+            if bracket_state:
+                report["bracket"] = bracket_state
+            else:
+                report["log"] = log
+            with open(report_path, "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=4)
+        return report_id
+
+    def existing_report_files(self):
+        """Отчёты в папке: (номер, имя файла)."""
+        if not os.path.isdir(self.reports_folder):
+            return []
+        return [
+            (int(match.group(1)), file_name) for file_name, match in
+            ((file_name, REPORT_FILE_PATTERN.match(file_name)) for file_name in os.listdir(self.reports_folder))
+            if match
+        ]
+
+    def reserve_report_ids(self):
+        """Новые отчёты получают номера после всех файлов в папке, даже ещё не импортированных."""
+        last = max((report_id for report_id, _ in self.existing_report_files()), default=0)
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            row = self.connection.execute("SELECT seq FROM sqlite_sequence WHERE name = 'reports'").fetchone()
+            if row is None:
+                self.connection.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('reports', ?)", (last,))
+            elif row[0] < last:
+                self.connection.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'reports'", (last,))
+
+    @timed("reports.import")
+    def import_existing_reports(self, interrupted=None):
+        """Переносит в индекс отчёты, сохранённые до его появления; возвращает [(файл, ошибка)].
+
+        Отчёты пишутся пачками по IMPORT_BATCH в одной транзакции, уже
+        проиндексированные пропускаются, поэтому прерванный импорт
+        (interrupted() вернула True) продолжится при следующем вызове.
+        """
+        failures = []
+        connection = self.connection
+        indexed = {row[0] for row in connection.execute("SELECT id FROM reports")}
+        pending = sorted(item for item in self.existing_report_files() if item[0] not in indexed)
+        for start in range(0, len(pending), IMPORT_BATCH):
+            if interrupted is not None and interrupted():
+                return failures
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                for report_id, file_name in pending[start:start + IMPORT_BATCH]:
+                    try:
+                        with open(os.path.join(self.reports_folder, file_name), "r", encoding="utf-8") as file:
+                            report = json.load(file)
+                        bracket_state = report.get("bracket")
+                        log = render_log(Bracket.from_state(bracket_state)) if bracket_state else report.get("log", "")
+                    except (OSError, ValueError, KeyError, TypeError) as e:
+                        failures.append((file_name, str(e)))
+                        continue
+                    # Точка сохранения: сбой одного отчёта не откатывает всю пачку
+                    connection.execute("SAVEPOINT report")
+                    try:
+                        self.write_report(
+                            report.get("participants", []), report.get("winner", ""), report.get("finalists", ()),
+                            log, bracket_state, report_id
+                        )
+                    except (OSError, sqlite3.Error) as e:
+                        connection.execute("ROLLBACK TO report")
+                        failures.append((file_name, str(e)))
+                    connection.execute("RELEASE report")
+        connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        return failures
+
+    @timed("reports.count")
+    def count(self, query=""):
+        if not query:
+            return self.connection.execute("SELECT count(*) FROM reports").fetchone()[0]
+        where, argument = self.search_condition(query)
+        return self.connection.execute(f"SELECT count(*) FROM report_logs WHERE {where}", (argument,)).fetchone()[0]
+
+    @timed("reports.list")
+    def list_reports(self, offset=0, limit=100, query=""):
+        """Страница отчётов от новых к старым: (номер, файл, победитель, число участников)."""
+        if not query:
+            return self.connection.execute(
+                "SELECT id, file, winner, participants_count FROM reports ORDER BY id DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+        where, argument = self.search_condition(query)
+        return self.connection.execute(
+            "SELECT id, file, winner, participants_count FROM reports WHERE id IN "
+            f"(SELECT rowid FROM report_logs WHERE {where}) ORDER BY id DESC LIMIT ? OFFSET ?",
+            (argument, limit, offset)
+        ).fetchall()
+
+    def search_condition(self, query):
+        if self.full_text:
+            # Запрос ищется как фраза, чтобы спецсимволы FTS5 не ломали поиск
+            return "report_logs MATCH ?", '"' + query.replace('"', '""') + '"'
+        return "log LIKE ?", "%" + query.replace("%", "").replace("_", "") + "%"
+
+    def bracket_of(self, report_id):
+        """Сетка турнира из отчёта или None для отчётов старого формата."""
+        row = self.connection.execute("SELECT bracket FROM reports WHERE id = ?", (report_id,)).fetchone()
+        return Bracket.from_state(json.loads(row[0])) if row and row[0] else None
+
+    def log_of(self, report_id):
+        bracket = self.bracket_of(report_id)
+        if bracket is not None:
+            return render_log(bracket)
+        row = self.connection.execute("SELECT log FROM report_logs WHERE rowid = ?", (report_id,)).fetchone()
+        return row[0] if row else ""
+
+    def reports_after(self, report_id):
+        """Отчёты с номером больше report_id по возрастанию: (номер, время завершения в юлианских днях, JSON сетки)."""
+        return self.connection.execute(
+            "SELECT id, finished_at, bracket FROM reports WHERE id > ? ORDER BY id", (report_id,)
+        )
+
+    def top_participants(self, limit=100):
+        """Участники с наибольшим числом побед: (имя, сыграно, побед, финалов)."""
+        return self.connection.execute(
+            "SELECT name, played, wins, finals FROM participant_stats ORDER BY wins DESC, finals DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+
+    def participant_stats(self, name):
+        return self.connection.execute(
+            "SELECT name, played, wins, finals FROM participant_stats WHERE name = ?", (name,)
+        ).fetchone()
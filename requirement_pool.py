@@ -0,0 +1,87 @@
+"""Пул требований турнира: выдача без повторов за весь турнир.
+
+Порядок выдачи — перестановка требований, построенная один раз при старте
+турнира; выдача требования группе — сдвиг курсора по этой перестановке,
+поэтому раунд с любым числом групп обслуживается за время, пропорциональное
+числу групп, даже при сотнях тысяч требований.
+
+Требованию можно задать вес (сложность, приоритет категории) строкой вида
+«требование;вес»: чем больше вес, тем раньше требование попадает в
+выдачу. Перестановка с весами — выборка без возвращения по
+Эфраимидису–Спиракису: ключ log(u) / вес, порядок по убыванию ключа.
+"""
+import math
+import random
+
+WEIGHT_SEPARATOR = ";"
+
+
+def parse_requirement(line):
+    """Текст требования и его вес; строка без веса получает вес 1."""
+    if WEIGHT_SEPARATOR not in line:
+        return line, 1.0
+    text, _, weight = line.rpartition(WEIGHT_SEPARATOR)
+    if text.strip():
+        try:
+            value = float(weight)
+        except ValueError:
+            value = None
+        if value is not None and value > 0 and math.isfinite(value):
+            return text.strip(), value
+    return line, 1.0
+
+
+def used_requirements(bracket):
+    """Требования, уже выданные в раундах сетки."""
+    if bracket is None:
+        return set()
+    return {requirement for round_ in bracket.rounds for requirement in round_.requirements if requirement}
+
+
+class RequirementPool:
+    def __init__(self, lines, rng=random, exclude=()):
+        """Строит порядок выдачи из строк требований (возможно, с весами).
+
+        Требования из exclude (уже выданные до перезапуска приложения) и
+        повторяющиеся строки в пул не попадают.
+        """
+        exclude = set(exclude)
+        texts, weights = [], []
+        seen = set()
+        for line in lines:
+            text, weight = parse_requirement(line)
+            if text in exclude or text in seen:
+                continue
+            seen.add(text)
+            texts.append(text)
+            weights.append(weight)
+
+        if all(weight == 1.0 for weight in weights):
+            rng.shuffle(texts)
+            self.order = texts
+        else:
+            random_value = rng.random
+            keys = [math.log(1.0 - random_value()) / weight for weight in weights]
+            self.order = [texts[i] for i in sorted(range(len(texts)), key=keys.__getitem__, reverse=True)]
+        self.cursor = 0
+
+    @property
+    def remaining(self):
+        return len(self.order) - self.cursor
+
+    def take(self, count):
+        """Следующие count требований порядка выдачи."""
+        if count > self.remaining:
+            raise ValueError(f"Недостаточно требований: нужно {count}, осталось {self.remaining}")
+        start = self.cursor
+        self.cursor += count
+        return self.order[start:self.cursor]
+
+    def deal(self, round_):
+        """Требования для всех групп раунда; группа из одного участника остаётся без требования."""
+        offsets = round_.offsets
+        played = [index for index in range(round_.group_count) if offsets[index + 1] - offsets[index] > 1]
+        requirements = [None] * round_.group_count
+        for index, requirement in zip(played, self.take(len(played))):
+            requirements[index] = requirement
+        return requirements
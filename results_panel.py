@@ -0,0 +1,290 @@
+"""Панель результатов раунда: таблица групп с выбором победителя в строке.
+
+Победителей можно выбрать в выпадающем списке ячейки, цифрой с
+клавиатуры — номер участника в группе (1–9; курсор сразу переходит к
+следующей группе) или вставить результаты всего раунда из буфера обмена или
+CSV-файла. Выбор хранится в панели и попадает в сетку только целиком,
+одной пачкой событий при переходе к следующему этапу.
+"""
+import csv
+from array import array
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import (
+    QAbstractItemView, QApplication, QComboBox, QFileDialog, QHBoxLayout, QHeaderView, QLabel,
+    QMessageBox, QPushButton, QStyledItemDelegate, QTableView, QVBoxLayout, QWidget
+)
+
+from bracket import NO_WINNER
+from instrumentation import timed
+from round_log import NO_REQUIREMENT
+
+GROUP_COLUMN, MEMBERS_COLUMN, REQUIREMENT_COLUMN, WINNER_COLUMN = range(4)
+HEADERS = ("Группа", "Участники", "Требование", "Победитель")
+RESULT_DELIMITERS = (";", "\t", ",")
+
+
+@timed("results.parse")
+def parse_results(text, bracket):
+    """Победители групп текущего раунда из текста CSV.
+
+    Строка — либо «номер группы;победитель», либо только имя победителя:
+    тогда группа находится по участнику. Разделитель — «;», «,» или
+    табуляция. Первая нераспознанная строка считается заголовком.
+    Возвращает список пар (индекс группы, номер участника) и список ошибок.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return [], []
+    delimiter = next((d for d in RESULT_DELIMITERS if d in lines[0]), RESULT_DELIMITERS[0])
+
+    current = bracket.current
+    names, ids, offsets = bracket.names, current.ids, current.offsets
+    group_of = {}
+    for index in range(current.group_count):
+        for participant_id in ids[offsets[index]:offsets[index + 1]]:
+            group_of[names[participant_id]] = (index, participant_id)
+
+    results, errors = [], []
+    for number, row in enumerate(csv.reader(lines, delimiter=delimiter), 1):
+        fields = [field.strip() for field in row if field.strip()]
+        if not fields:
+            continue
+        if len(fields) >= 2 and fields[0].isdigit():
+            group, name = int(fields[0]) - 1, fields[1]
+            if not 0 <= group < current.group_count:
+                errors.append(f"Строка {number}: нет группы {group + 1}")
+                continue
+            found = group_of.get(name)
+            if found is None or found[0] != group:
+                errors.append(f"Строка {number}: {name} не состоит в группе {group + 1}")
+                continue
+        else:
+            name = fields[-1]
+            found = group_of.get(name)
+            if found is None:
+                if number > 1 or results:
+                    errors.append(f"Строка {number}: участника {name} нет в этом раунде")
+                continue
+        results.append(found)
+    return results, errors
+
+
+class RoundResultsModel(QAbstractTableModel):
+    """Группы текущего раунда и выбранные, но ещё не записанные в сетку победители."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.bracket = None
+        self.round_ = None
+        self.winners = array("l")
+
+    @timed("results.set_round")
+    def set_round(self, bracket):
+        """Показывает текущий раунд сетки; None — пустая таблица."""
+        self.beginResetModel()
+        self.bracket = bracket
+        self.round_ = bracket.current if bracket is not None and not bracket.is_finished else None
+        self.winners = array("l", self.round_.winners) if self.round_ is not None else array("l")
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.winners)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return HEADERS[section]
+        return None
+
+    def group_size(self, row):
+        offsets = self.round_.offsets
+        return offsets[row + 1] - offsets[row]
+
+    def members(self, row):
+        return self.bracket.group_names(row, self.round_)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if column == GROUP_COLUMN:
+                return row + 1
+            if column == MEMBERS_COLUMN:
+                return ", ".join(self.members(row))
+            if column == REQUIREMENT_COLUMN:
+                return self.round_.requirements[row] or NO_REQUIREMENT
+            winner = self.winners[row]
+            return self.bracket.names[winner] if winner != NO_WINNER else ""
+        if role == Qt.ToolTipRole and column == WINNER_COLUMN and self.winners[row] == NO_WINNER:
+            return "Победитель не выбран: цифрой — номер участника в группе, или двойной щелчок"
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == WINNER_COLUMN and self.group_size(index.row()) > 1:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid() or index.column() != WINNER_COLUMN:
+            return False
+        names = self.bracket.names
+        for participant_id in self.round_.group(index.row()):
+            if names[participant_id] == value:
+                self.winners[index.row()] = participant_id
+                self.dataChanged.emit(index, index, [Qt.DisplayRole])
+                return True
+        return False
+
+    def set_winner_at(self, row, position):
+        """Отмечает победителем участника с номером position (с 0) в группе row."""
+        if position >= self.group_size(row):
+            return False
+        self.winners[row] = self.round_.ids[self.round_.offsets[row] + position]
+        index = self.index(row, WINNER_COLUMN)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole])
+        return True
+
+    def apply_results(self, results):
+        """Записывает пачку пар (индекс группы, номер участника) одним обновлением таблицы."""
+        if not results:
+            return
+        for row, participant_id in results:
+            self.winners[row] = participant_id
+        top = min(row for row, _ in results)
+        bottom = max(row for row, _ in results)
+        self.dataChanged.emit(self.index(top, WINNER_COLUMN), self.index(bottom, WINNER_COLUMN), [Qt.DisplayRole])
+
+    def missing_count(self):
+        return self.winners.count(NO_WINNER)
+
+    def first_missing(self):
+        """Индекс первой группы без победителя или None."""
+        return self.winners.index(NO_WINNER) if NO_WINNER in self.winners else None
+
+    def winner_events(self):
+        """События выбора победителей для групп, где выбор отличается от сетки."""
+        round_number = self.bracket.rounds.index(self.round_) + 1
+        recorded = self.round_.winners
+        return [
+            {"type": "winner", "round": round_number, "group": row, "id": winner}
+            for row, winner in enumerate(self.winners) if winner != recorded[row]
+        ]
+
+
+class WinnerDelegate(QStyledItemDelegate):
+    """Выпадающий список участников группы в ячейке победителя."""
+
+    def createEditor(self, parent, option, index):
+        editor = QComboBox(parent)
+        editor.addItems(index.model().members(index.row()))
+        return editor
+
+    def setEditorData(self, editor, index):
+        position = editor.findText(index.data(Qt.EditRole))
+        editor.setCurrentIndex(max(position, 0))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText())
+
+
+class RoundResultsView(QTableView):
+    """Таблица результатов с вводом с клавиатуры: цифра — победитель, курсор — к следующей группе."""
+
+    def keyPressEvent(self, event):
+        model = self.model()
+        row = self.currentIndex().row()
+        key = event.key()
+        if Qt.Key_1 <= key <= Qt.Key_9 and row >= 0 and self.state() != QAbstractItemView.EditingState:
+            if model.set_winner_at(row, key - Qt.Key_1) and row + 1 < model.rowCount():
+                self.setCurrentIndex(model.index(row + 1, WINNER_COLUMN))
+            return
+        if event.matches(QKeySequence.Paste):
+            self.parent().paste_results()
+            return
+        super().keyPressEvent(event)
+
+
+class RoundResultsPanel(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model = RoundResultsModel(self)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        self.view = RoundResultsView(self)
+        self.view.setModel(self.model)
+        self.view.setItemDelegateForColumn(WINNER_COLUMN, WinnerDelegate(self.view))
+        self.view.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.view.setSelectionMode(QAbstractItemView.SingleSelection)
+        # Фиксированная высота строк: таблица не обходит все группы при отрисовке
+        self.view.verticalHeader().hide()
+        self.view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.view.verticalHeader().setDefaultSectionSize(self.view.fontMetrics().height() + 8)
+        self.view.horizontalHeader().setSectionResizeMode(MEMBERS_COLUMN, QHeaderView.Stretch)
+        layout.addWidget(self.view)
+
+        buttons = QHBoxLayout()
+        paste_button = QPushButton("Вставить результаты")
+        paste_button.clicked.connect(self.paste_results)
+        buttons.addWidget(paste_button)
+        import_button = QPushButton("Импорт CSV")
+        import_button.clicked.connect(self.import_results)
+        buttons.addWidget(import_button)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+        self.model.modelReset.connect(self.update_status)
+        self.model.dataChanged.connect(self.update_status)
+        self.update_status()
+
+    def set_round(self, bracket):
+        self.model.set_round(bracket)
+        if self.model.rowCount():
+            self.view.setCurrentIndex(self.model.index(0, WINNER_COLUMN))
+
+    def update_status(self):
+        total = self.model.rowCount()
+        if total:
+            self.status_label.setText(f"Победители выбраны: {total - self.model.missing_count()} из {total}")
+        else:
+            self.status_label.setText("Нет текущего раунда")
+
+    def load_results(self, text):
+        if self.model.round_ is None:
+            return
+        results, errors = parse_results(text, self.model.bracket)
+        self.model.apply_results(results)
+        if errors:
+            shown = "\n".join(errors[:10])
+            more = f"\n… и ещё {len(errors) - 10}" if len(errors) > 10 else ""
+            QMessageBox.warning(self, "Ошибка", f"Принято результатов: {len(results)}.\n{shown}{more}")
+
+    def paste_results(self):
+        self.load_results(QApplication.clipboard().text())
+
+    def import_results(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Результаты раунда", "", "CSV (*.csv *.txt);;Все файлы (*)")
+        if not path:
+            return
+        try:
+            with open(path, "r", encoding="utf-8-sig") as file:
+                self.load_results(file.read())
+        except OSError as e:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось прочитать файл результатов: {e}")
+
+    def select_group(self, row):
+        index = self.model.index(row, WINNER_COLUMN)
+        self.view.setCurrentIndex(index)
+        self.view.scrollTo(index)
@@ -0,0 +1,56 @@
+"""Текст протокола турнира: одинаковый для окна приложения и пакетного режима.
+
+Протокол не хранится отдельно: источник данных — сама сетка (раунды, группы,
+требования, победители), а текст строится из неё целиком или по раундам.
+"""
+
+NO_REQUIREMENT = "Без требования"
+
+
+def format_round(bracket, round_=None):
+    """Заголовок раунда и строки групп с требованиями."""
+    round_ = round_ or bracket.current
+    lines = [f"Раунд {bracket.rounds.index(round_) + 1} ({len(round_.ids)} участников):\n"]
+    for group, requirement in zip(bracket.groups(round_), round_.requirements):
+        lines.append(f"  Группа: {', '.join(group)} -> Требование: {requirement or NO_REQUIREMENT}")
+    return "\n".join(lines)
+
+
+def format_winners(winners):
+    return "\nПобедители текущего этапа:\n" + ", ".join(winners) + "\n"
+
+
+def format_champion(winner):
+    return f"Победитель: {winner}\n"
+
+
+def format_schedule(schedule, current=None):
+    """Форма турнира по раундам и число нужных требований; current — индекс текущего раунда."""
+    if not len(schedule):
+        return "Турнир не состоится: нужно минимум 2 участника"
+    lines = [f"Раундов: {len(schedule)}, требований: {schedule.total_requirements}"]
+    for index in range(len(schedule)):
+        parts = []
+        if schedule.pairs[index]:
+            parts.append(f"пар: {schedule.pairs[index]}")
+        if schedule.triples[index]:
+            parts.append(f"троек: {schedule.triples[index]}")
+        if schedule.byes[index]:
+            parts.append(f"без игры: {schedule.byes[index]}")
+        marker = "▶ " if index == current else "  "
+        lines.append(f"{marker}Раунд {index + 1}: {schedule.participants[index]} участников, {', '.join(parts)}")
+    return "\n".join(lines)
+
+
+def render_log(bracket):
+    """Полный текст протокола по состоянию сетки одной строкой."""
+    if bracket is None:
+        return ""
+    parts = []
+    for index, round_ in enumerate(bracket.rounds):
+        parts.append(format_round(bracket, round_))
+        if index + 1 < len(bracket.rounds) or bracket.is_finished:
+            parts.append(format_winners(bracket.winner_names(round_)))
+    if bracket.is_finished:
+        parts.append(format_champion(bracket.names[bracket.champion]))
+    return "\n".join(parts)
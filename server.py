@@ -0,0 +1,660 @@
+"""Сетевой режим: приём результатов групп по HTTP и рассылка хода турнира по WebSocket.
+
+Сервер написан на asyncio без сторонних библиотек и, как cli.py, не
+импортирует Qt. Он ведёт один турнир в тех же файлах снимка и журнала, что
+и вкладка приложения (см. tournament_tab.py, journal.py), поэтому турнир,
+начатый на сервере, можно продолжить в окне и наоборот — но не одновременно:
+файл турнира заблокирован.
+
+    python cli.py serve --port 8765
+    python cli.py serve --tournament 20240301-120000-a1b2c3 --auto-advance
+
+API (группы нумеруются с 1, как в протоколе):
+    GET  /bracket                        текущий раунд: группы, требования, победители
+    POST /rounds/<r>/groups/<g>/winner   {"winner": "Имя", "replace": false}
+    POST /rounds/<r>/advance             переход к следующему этапу
+    GET  /ws                             WebSocket: {"type": "bracket"} при смене раунда,
+                                         {"type": "winner"} при выборе победителя
+
+Запросы на изменение принимают заголовок Idempotency-Key: повтор запроса с
+тем же ключом (например, после обрыва связи) возвращает прежний ответ и не
+меняет турнир второй раз. Ответ отправляется только после записи события в
+журнал; события от многих судей собираются в пачки и пишутся одной записью
+в фоновом потоке, так что сотни одновременных запросов не упираются в диск.
+
+В записи одновременно не больше одной пачки. Если запись не удалась,
+события пачки остаются в памяти и встают в начало очереди, а запросы, чьи
+изменения ещё не на диске, получают 503; повтор (с тем же ключом или без
+него) ждёт записи именно тех событий, которые подтверждает его ответ.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import sys
+from collections import OrderedDict
+from http import HTTPStatus
+
+from bracket import NO_WINNER, Bracket, KnockoutPairing, start_event
+from journal import JournalWriter
+from requirement_pool import RequirementPool, used_requirements
+from round_log import NO_REQUIREMENT
+
+MAX_BODY = 1 << 20  # Больше не бывает ни у запроса, ни у кадра WebSocket
+FLUSH_INTERVAL = 0.02  # Сколько секунд копится пачка событий перед записью
+FLUSH_BATCH = 1000  # Пачка такого размера пишется сразу
+RETRY_INTERVAL = 1.0  # Через сколько секунд повторяется не удавшаяся запись пачки
+IDEMPOTENCY_KEYS = 100000  # Сколько последних ключей помнит сервер
+SUBSCRIBER_QUEUE = 256  # Неотправленных сообщений на подписчика, после — отключение
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WINNER_PATH = re.compile(r"^/rounds/(\d+)/groups/(\d+)/winner$")
+ADVANCE_PATH = re.compile(r"^/rounds/(\d+)/advance$")
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def dump_json(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+async def read_request(reader):
+    """Читает один запрос HTTP/1.1; None — клиент закрыл соединение между запросами."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, "Слишком длинные заголовки запроса")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HttpError(400, "Неверная строка запроса")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Неверный Content-Length")
+    if length > MAX_BODY:
+        raise HttpError(413, "Слишком большой запрос")
+    body = await reader.readexactly(length) if length else b""
+    return method, target.split("?", 1)[0], version, headers, body
+
+
+def keeps_alive(version, headers):
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+def response_bytes(status, body, keep_alive=True):
+    head = (
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+    )
+    if not keep_alive:
+        head += "Connection: close\r\n"
+    return head.encode("latin-1") + b"\r\n" + body
+
+
+def error_body(message):
+    return dump_json({"error": message})
+
+
+def websocket_accept(key):
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+
+
+def encode_frame(payload, opcode=0x1):
+    """Кадр WebSocket от сервера: без маски, целиком в одном кадре."""
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, length))
+    elif length < 1 << 16:
+        header = bytes((0x80 | opcode, 126)) + length.to_bytes(2, "big")
+    else:
+        header = bytes((0x80 | opcode, 127)) + length.to_bytes(8, "big")
+    return header + payload
+
+
+def unmask(payload, mask):
+    """Снимает маску клиента: XOR всего кадра одним большим целым."""
+    length = len(payload)
+    key = (mask * (length // 4 + 1))[:length]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+
+
+async def read_frame(reader):
+    """Возвращает (код операции, данные) очередного кадра клиента."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), "big")
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), "big")
+    if length > MAX_BODY:
+        raise ValueError("Слишком большой кадр WebSocket")
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask is not None:
+        payload = unmask(payload, mask)
+    return first & 0x0F, payload
+
+
+class TournamentServer:
+    """Один турнир, открытый для приёма результатов по сети.
+
+    Все изменения сетки выполняются в цикле событий синхронно, между
+    проверкой запроса и применением события нет ожиданий, поэтому
+    одновременные запросы не мешают друг другу без блокировок. Ожидается
+    только запись в журнал.
+    """
+
+    def __init__(self, tournament_id, journal, report_index, requirements, auto_advance=False,
+                 flush_interval=FLUSH_INTERVAL, log=None):
+        self.tournament_id = tournament_id
+        self.journal = journal
+        self.report_index = report_index
+        self.requirements = requirements
+        self.auto_advance = auto_advance
+        self.flush_interval = flush_interval
+        self.log = log or (lambda text: print(text, flush=True))
+        self.participants = []
+        self.bracket = None
+        self.requirement_pool = None
+        self.missing = 0  # Групп текущего раунда без победителя
+        self.bracket_body = None  # Закодированный ответ GET /bracket до следующего изменения
+
+        self.loop = None
+        self.server = None
+        self.write_error = None  # Ошибка последнего задания потока записи
+        self.batch_error = None  # Ошибка записи пачки, которая сейчас пишется
+        # Позиции считаются в событиях, применённых к сетке с запуска сервера
+        self.applied = 0  # Применено к сетке в памяти
+        self.saved = 0  # Из них записано в журнал
+        self.pending_events = []  # Применены, но ещё не отданы в журнал
+        self.writing = None  # Пачка, которая сейчас пишется
+        self.waiters = []  # (позиция, future): ответы, ждущие записи событий до позиции
+        self.winner_positions = {}  # Группа текущего раунда -> позиция события с её победителем
+        self.flush_handle = None
+        self.responses = OrderedDict()  # Idempotency-Key -> (отпечаток запроса, результат execute)
+        self.subscribers = {}  # Очередь кадров -> поток записи соединения
+
+    # Турнир
+
+    def open(self, participants, strategy=None, rng=random):
+        """Продолжает сохранённый турнир или начинает новый с участниками participants."""
+        self.journal.lock.acquire()
+        state, events = self.journal.load()
+        if state is None and not events:
+            strategy = strategy or KnockoutPairing()
+            if self.requirements:
+                self.requirement_pool = RequirementPool(self.requirements, rng)
+                needed = strategy.schedule(len(participants)).total_requirements
+                if self.requirement_pool.remaining < needed:
+                    self.journal.close(remove_lock=True)
+                    raise ValueError(
+                        f"Недостаточно требований для турнира: есть {self.requirement_pool.remaining}, нужно {needed}"
+                    )
+            self.participants = list(participants)
+            self.bracket = Bracket([])
+            events = [start_event(participants, rng=rng, strategy=strategy)]
+            self.bracket.apply(events[0])
+            events += self.deal_requirements()
+            self.journal.extend(events)
+            self.save_state()
+        else:
+            state = state or {}
+            self.participants = state.get("participants", [])
+            self.bracket = Bracket.from_state(state["bracket"]) if state.get("bracket") else None
+            for event in events:
+                if event["type"] == "log":
+                    continue
+                if event["type"] == "start":
+                    self.participants = event["names"]
+                    self.bracket = Bracket([])
+                self.bracket.apply(event)
+            if self.bracket is None or not self.bracket.rounds:
+                raise ValueError(f"В файлах турнира {self.tournament_id} нет сетки")
+            if self.requirements:
+                self.requirement_pool = RequirementPool(self.requirements, exclude=used_requirements(self.bracket))
+        self.round_changed()
+
+    def save_state(self):
+        self.journal.write_snapshot(self.snapshot_state())
+
+    def deal_requirements(self):
+        """Событие с требованиями групп текущего раунда (пустой список, если требований нет)."""
+        if self.requirement_pool is None or self.bracket.is_finished:
+            return []
+        try:
+            requirements = self.requirement_pool.deal(self.bracket.current)
+        except ValueError as e:
+            self.log(f"Недостаточно требований для всех групп раунда: {e}")
+            return []
+        event = {"type": "requirements", "round": self.bracket.round_number, "requirements": requirements}
+        self.bracket.apply(event)
+        return [event]
+
+    def round_changed(self):
+        self.bracket_body = None
+        self.winner_positions = {}
+        if self.bracket.is_finished:
+            self.missing = 0
+            self.log(f"Победитель турнира: {self.bracket.names[self.bracket.champion]}")
+        else:
+            self.missing = self.bracket.current.winners.count(NO_WINNER)
+            self.log(f"Раунд {self.bracket.round_number}: групп {self.bracket.current.group_count}")
+
+    def bracket_state(self):
+        bracket = self.bracket
+        state = {
+            "type": "bracket",
+            "tournament": self.tournament_id,
+            "round": bracket.round_number,
+            "rounds": len(bracket.schedule),
+            "finished": bracket.is_finished,
+            "champion": bracket.names[bracket.champion] if bracket.is_finished else None,
+            "missing": self.missing,
+            "groups": [],
+        }
+        if not bracket.is_finished:
+            current, names = bracket.current, bracket.names
+            state["groups"] = [
+                {
+                    "group": index + 1,
+                    "members": members,
+                    "requirement": current.requirements[index] or NO_REQUIREMENT,
+                    "winner": names[winner] if winner != NO_WINNER else None,
+                }
+                for index, (members, winner) in enumerate(zip(bracket.groups(), current.winners))
+            ]
+        return state
+
+    def bracket_json(self):
+        if self.bracket_body is None:
+            self.bracket_body = dump_json(self.bracket_state())
+        return self.bracket_body
+
+    def check_round(self, round_number):
+        if self.bracket.is_finished:
+            raise HttpError(409, "Турнир завершён")
+        if round_number != self.bracket.round_number:
+            raise HttpError(409, f"Сейчас идёт раунд {self.bracket.round_number}, а не {round_number}")
+
+    def submit_winner(self, round_number, group_number, payload):
+        """Выбор победителя группы; возвращает (ответ, позиция событий, которые он подтверждает)."""
+        self.check_round(round_number)
+        current = self.bracket.current
+        index = group_number - 1
+        if not 0 <= index < current.group_count:
+            raise HttpError(404, f"Нет группы {group_number}")
+        name = payload.get("winner")
+        if not isinstance(name, str):
+            raise HttpError(400, "Не указан победитель")
+        try:
+            winner = self.bracket.member_id(index, name)
+        except ValueError as e:
+            raise HttpError(400, str(e))
+
+        recorded = current.winners[index]
+        events = []
+        position = self.winner_positions.get(index, 0)  # Повтор ждёт записи прежнего выбора
+        if recorded != winner:
+            if recorded != NO_WINNER and not payload.get("replace"):
+                raise HttpError(
+                    409, f"В группе {group_number} уже выбран победитель {self.bracket.names[recorded]}"
+                )
+            events.append({"type": "winner", "round": round_number, "group": index, "id": winner})
+            self.bracket.apply(events[0])
+            self.bracket_body = None
+            if recorded == NO_WINNER:
+                self.missing -= 1
+            self.broadcast({
+                "type": "winner", "round": round_number, "group": group_number,
+                "winner": name, "missing": self.missing,
+            })
+        if events:
+            position = self.commit(events)
+            self.winner_positions[index] = position
+        advanced = False
+        if events and self.auto_advance and self.missing == 0:
+            position = self.commit(self.advance_events())
+            advanced = True
+        return {"round": round_number, "group": group_number, "winner": name, "advanced": advanced}, position
+
+    def advance(self, round_number):
+        self.check_round(round_number)
+        if self.missing:
+            first = self.bracket.current.winners.index(NO_WINNER)
+            raise HttpError(
+                409, f"Не выбран победитель в группе {first + 1} (всего групп без победителя: {self.missing})"
+            )
+        position = self.commit(self.advance_events())
+        return {"round": self.bracket.round_number, "finished": self.bracket.is_finished}, position
+
+    def advance_events(self):
+        """Переход к следующему этапу и требования нового раунда; сетка меняется сразу."""
+        events = [{"type": "advance"}]
+        self.bracket.apply(events[0])
+        events += self.deal_requirements()
+        self.round_changed()
+        self.broadcast(self.bracket_state())
+        return events
+
+    def round_advanced(self):
+        """Завершённый турнир после записи последнего события уходит в отчёты."""
+        if not self.bracket.is_finished or self.journal is None or self.saved != self.applied:
+            return
+        report_id = self.report_index.add_report(self.participants, self.bracket)
+        self.log(f"Отчёт сохранён: tournament_{report_id}.json")
+        self.journal.clear()
+        self.journal.close(remove_lock=True)
+        self.journal = None
+
+    # Пакетная запись
+
+    def commit(self, events):
+        """Ставит уже применённые к сетке события в очередь записи; возвращает позицию после них."""
+        self.pending_events.extend(events)
+        self.applied += len(events)
+        if len(self.pending_events) >= FLUSH_BATCH:
+            self.flush()
+        elif self.flush_handle is None and self.writing is None:
+            self.flush_handle = self.loop.call_later(self.flush_interval, self.flush)
+        return self.applied
+
+    def persisted(self, position):
+        """Future, который завершится, когда события до позиции position будут в журнале.
+
+        Если запись сорвалась раньше, future получит HttpError 503: ответ
+        нельзя подтверждать, пока его изменения не на диске.
+        """
+        future = self.loop.create_future()
+        if position <= self.saved:
+            future.set_result(None)
+        else:
+            self.waiters.append((position, future))
+        return future
+
+    def flush(self):
+        """Отдаёт накопленные события в поток записи одной записью журнала."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if self.writing is not None or not self.pending_events or self.journal is None:
+            return  # Следующая пачка уйдёт после записи текущей (см. finish_batch)
+        events, self.pending_events = self.pending_events, []
+        self.writing = events
+        self.journal.extend(events)
+        # Задания потока записи выполняются по очереди: ошибка пачки известна до снимка
+        self.journal.run(self.take_batch_error)
+        if self.journal.needs_snapshot:
+            # Снимок — состояние после этой пачки; если она не записалась, снимок не пишется,
+            # иначе повтор пачки применился бы к снимку второй раз
+            self.journal.write_snapshot(self.snapshot_state(), skip=lambda: self.batch_error is not None)
+        self.journal.run(self.batch_written)
+
+    def take_batch_error(self):
+        # Вызывается в потоке записи сразу после записи пачки
+        self.batch_error, self.write_error = self.write_error, None
+
+    def batch_written(self):
+        # Вызывается в потоке записи после пачки и её снимка
+        error, snapshot_error = self.batch_error, self.write_error
+        self.batch_error = self.write_error = None
+        if snapshot_error is not None:
+            self.log(f"Не удалось записать снимок турнира: {snapshot_error}")  # Журнал цел, снимок будет позже
+        self.loop.call_soon_threadsafe(self.finish_batch, error)
+
+    def finish_batch(self, error):
+        events, self.writing = self.writing, None
+        if error is not None:
+            # События уже в сетке: они встают в начало очереди и будут записаны повторно в том же порядке
+            self.pending_events[:0] = events
+            self.log(f"Не удалось записать журнал турнира, повтор через {RETRY_INTERVAL:g} с: {error}")
+            failure = HttpError(503, f"Не удалось записать журнал турнира: {error}")
+            waiters, self.waiters = self.waiters, []
+            for _, future in waiters:
+                if not future.done():
+                    future.set_exception(failure)
+            self.flush_handle = self.loop.call_later(RETRY_INTERVAL, self.flush)
+            return
+        self.saved += len(events)
+        waiting = []
+        for position, future in self.waiters:
+            if position <= self.saved:
+                if not future.done():
+                    future.set_result(None)
+            else:
+                waiting.append((position, future))
+        self.waiters = waiting
+        if self.pending_events:
+            self.flush()  # Накопилось за время записи
+        else:
+            self.round_advanced()
+
+    def journal_write_failed(self, error):
+        # Вызывается в потоке записи, если не удалось задание журнала
+        self.write_error = error
+
+    def snapshot_state(self):
+        return {
+            "id": self.tournament_id,
+            "participants": self.participants,
+            "bracket": self.bracket.to_state(),
+            "current_round_number": self.bracket.round_number,
+        }
+
+    # Идемпотентность
+
+    async def idempotent(self, key, fingerprint, handler):
+        """Выполняет handler один раз на ключ; повтор получает тот же ответ.
+
+        Ответ запоминается вместе с позицией событий, которые он
+        подтверждает, поэтому повтор после сбоя записи не выполняет
+        запрос заново, а ждёт записи тех же событий.
+        """
+        if key is None:
+            return await self.reply(self.execute(handler))
+        known = self.responses.get(key)
+        if known is not None:
+            if known[0] != fingerprint:
+                return 422, error_body("Ключ Idempotency-Key уже использован для другого запроса")
+            self.responses.move_to_end(key)
+            return await self.reply(known[1])
+        result = self.execute(handler)
+        if result[0] >= 500:
+            return await self.reply(result)  # Ошибка самого сервера: повтор выполнит запрос заново
+        self.responses[key] = (fingerprint, result)
+        if len(self.responses) > IDEMPOTENCY_KEYS:
+            self.responses.popitem(last=False)
+        return await self.reply(result)
+
+    def execute(self, handler):
+        """(статус, тело ответа, позиция подтверждаемых событий или None)."""
+        try:
+            payload, position = handler()
+            return 200, dump_json(payload), position
+        except HttpError as e:
+            return e.status, error_body(str(e)), None
+        except Exception as e:
+            self.log(f"Ошибка при обработке запроса: {e!r}")
+            return 500, error_body(f"Внутренняя ошибка сервера: {e}"), None
+
+    async def reply(self, result):
+        """Ответ после записи подтверждаемых им событий; 503, если запись не удалась."""
+        status, body, position = result
+        if position is not None:
+            try:
+                await self.persisted(position)
+            except HttpError as e:
+                return e.status, error_body(str(e))
+        return status, body
+
+    # HTTP и WebSocket
+
+    async def route(self, method, path, headers, body):
+        if path == "/bracket":
+            if method != "GET":
+                raise HttpError(405, "Метод не поддерживается")
+            return 200, self.bracket_json()
+
+        match = WINNER_PATH.match(path)
+        if match:
+            round_number, group_number = int(match.group(1)), int(match.group(2))
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                raise HttpError(400, "Тело запроса — не JSON")
+            if not isinstance(payload, dict):
+                raise HttpError(400, "Тело запроса должно быть объектом JSON")
+            handler = lambda: self.submit_winner(round_number, group_number, payload)
+        else:
+            match = ADVANCE_PATH.match(path)
+            if not match:
+                raise HttpError(404, "Нет такого адреса")
+            round_number = int(match.group(1))
+            handler = lambda: self.advance(round_number)
+        if method != "POST":
+            raise HttpError(405, "Метод не поддерживается")
+        return await self.idempotent(headers.get("idempotency-key"), (path, body), handler)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = True
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, path, version, headers, body = request
+                    keep_alive = keeps_alive(version, headers)
+                    if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                        await self.serve_websocket(reader, writer, headers)
+                        break
+                    status, payload = await self.route(method, path, headers, body)
+                except HttpError as e:
+                    status, payload, keep_alive = e.status, error_body(str(e)), False
+                writer.write(response_bytes(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key")
+        if not key:
+            raise HttpError(400, "Нет заголовка Sec-WebSocket-Key")
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n"
+        ).encode("latin-1"))
+        frames = asyncio.Queue(SUBSCRIBER_QUEUE)
+        frames.put_nowait(encode_frame(self.bracket_json()))
+        self.subscribers[frames] = writer
+        sender = asyncio.ensure_future(self.send_frames(frames, writer))
+        try:
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == 0x8:
+                    writer.write(encode_frame(payload[:2], 0x8))
+                    break
+                if opcode == 0x9:
+                    writer.write(encode_frame(payload, 0xA))
+                # Остальные сообщения клиента не нужны: подписка только на чтение
+        except ValueError:
+            pass
+        finally:
+            self.subscribers.pop(frames, None)
+            sender.cancel()
+
+    async def send_frames(self, frames, writer):
+        try:
+            while True:
+                writer.write(await frames.get())
+                await writer.drain()
+        except ConnectionError:
+            pass
+
+    def broadcast(self, message):
+        if not self.subscribers:
+            return
+        frame = encode_frame(dump_json(message))
+        for frames, writer in list(self.subscribers.items()):
+            try:
+                frames.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Подписчик не успевает читать: отключаем, при переподключении он получит всю сетку
+                del self.subscribers[frames]
+                writer.close()
+
+    # Запуск
+
+    async def start(self, host, port):
+        """Запускает приём соединений; возвращает фактический порт (важно при port=0)."""
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for writer in self.subscribers.values():
+            writer.close()
+        self.subscribers.clear()
+        # Дописываем всё принятое; при сбое записи не ждём бесконечно
+        while self.journal is not None and (self.writing is not None or self.pending_events):
+            self.flush()
+            await self.loop.run_in_executor(None, self.journal.wait)
+            await asyncio.sleep(0)  # finish_batch приходит через call_soon_threadsafe
+            if self.flush_handle is not None:
+                self.flush_handle.cancel()
+                self.flush_handle = None
+                self.log(f"Не записано событий турнира: {len(self.pending_events)}")
+                break
+
+    async def serve_forever(self, host, port):
+        port = await self.start(host, port)
+        self.log(f"Турнир {self.tournament_id}: сервер слушает http://{host}:{port}")
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def serve(tournament_id, journal_factory, report_index, participants, requirements, host, port,
+          strategy=None, rng=random, auto_advance=False):
+    """Открывает турнир и обслуживает его до Ctrl+C."""
+    server = TournamentServer(tournament_id, None, report_index, requirements, auto_advance)
+    writer = JournalWriter(on_error=server.journal_write_failed)
+    server.journal = journal_factory(writer)
+    try:
+        server.open(participants, strategy, rng)
+        asyncio.run(server.serve_forever(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server.journal is not None:
+            server.journal.close()
+        writer.stop()
+        print("Сервер остановлен", file=sys.stderr)
@@ -0,0 +1,201 @@
+"""Оценка шансов участников по их силе: точный расчёт и метод Монте-Карло.
+
+Точный расчёт ведётся для одной заданной жеребьёвки (порядка участников).
+Усреднение по случайным жеребьёвкам (averaged_draw_probabilities) —
+приближение: перебрать все N! жеребьёвок невозможно, поэтому берётся
+среднее по нескольким случайным, и результат меняется с зерном.
+
+Модель группы — Брэдли–Терри: участник i побеждает в группе G с
+вероятностью s_i / sum(s_j, j in G). Группы строятся по тому же правилу,
+что и в display_round (см. bracket.group_offsets): при нечётном числе
+участников первая группа — тройка, остальные — пары.
+
+Результат обоих режимов — словарь с массивами:
+    reach[r, i] — вероятность, что участник i сыграет в раунде r + 1;
+    win[i] — вероятность, что участник i выиграет турнир.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bracket import group_offsets
+
+# Ограничения на размер промежуточных массивов точного режима
+CHUNK_ELEMENTS = 1 << 22
+MAX_OPPONENT_POINTS = 1 << 16
+
+
+def strengths_from_ratings(ratings, scale=400.0):
+    """Сила по рейтингу в шкале Эло: разница в scale пунктов — шансы 10 к 1."""
+    ratings = np.asarray(ratings, dtype=np.float64)
+    return np.power(10.0, (ratings - ratings.mean()) / scale)
+
+
+def round_sizes(count):
+    """Число участников в каждом раунде: в следующий раунд выходит по одному из группы."""
+    sizes = []
+    while count >= 2:
+        sizes.append(count)
+        count //= 2
+    return sizes
+
+
+def expected_share(strength, opponents, weights):
+    """E[s / (s + X)] для каждого s из strength, где X принимает значения opponents с весами weights."""
+    result = np.empty(len(strength))
+    step = max(1, CHUNK_ELEMENTS // max(1, len(opponents)))
+    for start in range(0, len(strength), step):
+        part = strength[start:start + step, None]
+        result[start:start + step] = (part / (part + opponents[None, :])) @ weights
+    return result
+
+
+def compress_distribution(values, weights, points=MAX_OPPONENT_POINTS):
+    """Сжимает дискретное распределение до points интервалов равного веса.
+
+    Каждый интервал заменяется своим средним значением; используется только
+    для суммы сил двух соперников в тройке, когда её распределение слишком велико.
+    """
+    if len(values) <= points:
+        return values, weights
+    order = np.argsort(values)
+    values, weights = values[order], weights[order]
+    cumulative = np.cumsum(weights)
+    bounds = np.searchsorted(cumulative, np.linspace(0, cumulative[-1], points + 1)[1:-1])
+    starts = np.unique(np.concatenate(([0], bounds)))
+    bin_weights = np.add.reduceat(weights, starts)
+    bin_values = np.add.reduceat(values * weights, starts) / np.where(bin_weights > 0, bin_weights, 1)
+    return bin_values, bin_weights
+
+
+def group_win(slots, strengths):
+    """Распределение победителя группы по распределениям участников её позиций.
+
+    Позиция — пара (номера участников, вероятности); множества участников
+    разных позиций не пересекаются, поэтому позиции независимы.
+    """
+    shares = []
+    for index, (ids, probs) in enumerate(slots):
+        others = [slots[j] for j in range(len(slots)) if j != index]
+        values, weights = np.zeros(1), np.ones(1)
+        for other_ids, other_probs in others:
+            values = (values[:, None] + strengths[other_ids][None, :]).ravel()
+            weights = (weights[:, None] * other_probs[None, :]).ravel()
+            values, weights = compress_distribution(values, weights)
+        shares.append(probs * expected_share(strengths[ids], values, weights))
+    return np.concatenate([ids for ids, _ in slots]), np.concatenate(shares)
+
+
+def exact_probabilities(strengths, order=None):
+    """Точные вероятности для заданного порядка участников в первом раунде.
+
+    Без order используется порядок 0..n-1. Сложность — O(n^2) операций
+    (произведение размеров поддеревьев по всем группам), память ограничена
+    обработкой по частям. Для троек с очень большими поддеревьями сумма сил
+    двух соперников сжимается до MAX_OPPONENT_POINTS значений.
+    """
+    strengths = np.asarray(strengths, dtype=np.float64)
+    count = len(strengths)
+    order = np.arange(count) if order is None else np.asarray(order)
+    sizes = round_sizes(count)
+    reach = np.zeros((len(sizes), count))
+    slots = [(order[p:p + 1], np.ones(1)) for p in range(count)]
+    for round_index, size in enumerate(sizes):
+        for ids, probs in slots:
+            reach[round_index, ids] = probs
+        offsets = group_offsets(size)
+        slots = [group_win(slots[lo:hi], strengths) for lo, hi in zip(offsets, offsets[1:])]
+    win = np.zeros(count)
+    ids, probs = slots[0]
+    win[ids] = probs
+    return {"reach": reach, "win": win}
+
+
+def averaged_draw_probabilities(strengths, shuffles=16, seed=None):
+    """Приближённые шансы при случайной жеребьёвке (как в start_tournament).
+
+    Точный расчёт для каждой из shuffles случайных жеребьёвок, затем
+    среднее; погрешность убывает как 1 / sqrt(shuffles).
+    """
+    rng = np.random.default_rng(seed)
+    total = None
+    for _ in range(shuffles):
+        result = exact_probabilities(strengths, rng.permutation(len(strengths)))
+        total = result if total is None else {key: total[key] + result[key] for key in total}
+    return {key: value / shuffles for key, value in total.items()}
+
+
+def sample_batch(strengths, trials, rng, order=None):
+    """Разыгрывает trials турниров одновременно; возвращает счётчики выходов в раунды и побед.
+
+    Каждая строка массива — отдельный турнир; без order участники
+    перемешиваются заново в каждом турнире.
+    """
+    count = len(strengths)
+    if order is None:
+        current = rng.permuted(np.tile(np.arange(count, dtype=np.int32), (trials, 1)), axis=1)
+    else:
+        current = np.tile(np.asarray(order, dtype=np.int32), (trials, 1))
+    sizes = round_sizes(count)
+    reach = np.zeros((len(sizes), count), dtype=np.int64)
+    for round_index, size in enumerate(sizes):
+        reach[round_index] = np.bincount(current.ravel(), minlength=count)
+        start = 0
+        winners = []
+        if size % 2:
+            # Тройка в начале раунда
+            triple = current[:, :3]
+            weights = strengths[triple]
+            threshold = rng.random(trials) * weights.sum(axis=1)
+            pick = (threshold[:, None] >= np.cumsum(weights, axis=1)).sum(axis=1)
+            winners.append(triple[np.arange(trials), np.minimum(pick, 2)][:, None])
+            start = 3
+        first, second = current[:, start::2], current[:, start + 1::2]
+        first_strength = strengths[first]
+        draw = rng.random(first.shape, dtype=np.float32)
+        first_wins = draw * (first_strength + strengths[second]) < first_strength
+        winners.append(np.where(first_wins, first, second))
+        current = np.concatenate(winners, axis=1) if len(winners) > 1 else winners[0]
+    wins = np.bincount(current.ravel(), minlength=count)
+    return reach, wins
+
+
+# Сила участников в рабочем процессе пула, передаётся один раз через initializer
+worker_strengths = None
+
+
+def init_worker(strengths):
+    global worker_strengths
+    worker_strengths = strengths
+
+
+def sample_job(seed, trials, order):
+    return sample_batch(worker_strengths, trials, np.random.default_rng(seed), order)
+
+
+def sampled_probabilities(strengths, trials, batch_size=None, workers=None, seed=None, order=None):
+    """Оценка вероятностей по trials случайным турнирам.
+
+    Турниры разыгрываются пачками по batch_size (по умолчанию — около
+    16 млн ячеек на пачку) в пуле из workers процессов.
+    """
+    strengths = np.asarray(strengths, dtype=np.float64)
+    count = len(strengths)
+    batch_size = batch_size or max(1, min(trials, (1 << 24) // max(1, count)))
+    batches = [min(batch_size, trials - start) for start in range(0, trials, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    reach = np.zeros((len(round_sizes(count)), count), dtype=np.int64)
+    wins = np.zeros(count, dtype=np.int64)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(batches) == 1:
+        results = (sample_batch(strengths, size, np.random.default_rng(s), order) for s, size in zip(seeds, batches))
+        for batch_reach, batch_wins in results:
+            reach += batch_reach
+            wins += batch_wins
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(strengths,)) as executor:
+            for batch_reach, batch_wins in executor.map(sample_job, seeds, batches, [order] * len(batches)):
+                reach += batch_reach
+                wins += batch_wins
+    return {"reach": reach / trials, "win": wins / trials}
@@ -0,0 +1,135 @@
+"""Сетка турнира: переходы раундов, стратегии и сохранение состояния."""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bracket import NO_WINNER, Bracket, KnockoutPairing, start_event
+from pairing import PoolsPairing, SeededPairing, SwissPairing
+
+STRATEGIES = (KnockoutPairing, SeededPairing, SwissPairing, PoolsPairing)
+
+
+def names_for(count):
+    return [f"Участник {i}" for i in range(count)]
+
+
+def round_events(bracket, rng):
+    """События выбора случайных победителей текущего раунда и перехода."""
+    current = bracket.current
+    events = []
+    for index in range(current.group_count):
+        members = current.group(index)
+        events.append({"type": "winner", "round": bracket.round_number, "group": index, "id": rng.choice(members)})
+    return events + [{"type": "advance"}]
+
+
+def played(count, strategy, seed=1):
+    """Сетка, доведённая до конца событиями, и сами события."""
+    rng = random.Random(seed)
+    events = [start_event(names_for(count), rng=rng, strategy=strategy)]
+    bracket = Bracket([])
+    bracket.apply(events[0])
+    while not bracket.is_finished:
+        for event in round_events(bracket, rng):
+            bracket.apply(event)
+            events.append(event)
+    return bracket, events
+
+
+class KnockoutTest(unittest.TestCase):
+    def test_rounds_follow_schedule(self):
+        for count in (2, 3, 7, 16, 33):
+            bracket, _ = played(count, KnockoutPairing())
+            self.assertEqual(len(bracket.rounds), len(bracket.schedule), count)
+            for index, round_ in enumerate(bracket.rounds):
+                self.assertEqual(len(round_.ids), bracket.schedule.participants[index])
+                self.assertEqual(round_.group_count, bracket.schedule.group_count(index))
+            self.assertIn(bracket.champion, bracket.current.group(0))
+
+    def test_first_round_is_a_permutation(self):
+        bracket = Bracket.start(names_for(101), rng=random.Random(3))
+        self.assertEqual(sorted(bracket.current.ids), list(range(101)))
+        self.assertEqual(sum(len(group) for group in bracket.groups()), 101)
+
+    def test_advance_requires_every_winner(self):
+        bracket = Bracket.start(names_for(8), rng=random.Random(1))
+        bracket.current.pick_first()
+        bracket.current.winners[2] = NO_WINNER
+        with self.assertRaises(ValueError):
+            bracket.advance()
+        self.assertEqual(bracket.round_number, 1)
+
+    def test_winner_outside_group_is_rejected(self):
+        bracket = Bracket.start(names_for(8), rng=random.Random(1))
+        outsider = bracket.current.group(1)[0]
+        with self.assertRaises(ValueError):
+            bracket.apply({"type": "winner", "round": 1, "group": 0, "id": outsider})
+
+    def test_rewind_restores_earlier_round(self):
+        bracket = Bracket.start(names_for(8), rng=random.Random(1))
+        bracket.current.pick_first()
+        first = bracket.to_state()
+        bracket.advance()
+        bracket.apply({"type": "rewind", "rounds": 1})
+        self.assertEqual(bracket.to_state(), first)
+
+
+class StrategyTest(unittest.TestCase):
+    def test_every_strategy_finishes(self):
+        for strategy in STRATEGIES:
+            bracket, _ = played(13, strategy())
+            self.assertTrue(bracket.is_finished, strategy.name)
+            self.assertTrue(0 <= bracket.champion < 13)
+
+    def test_state_round_trip_mid_tournament(self):
+        for strategy in STRATEGIES:
+            rng = random.Random(5)
+            bracket = Bracket.start(names_for(20), rng=rng, strategy=strategy())
+            for event in round_events(bracket, rng):
+                bracket.apply(event)
+            bracket.current.requirements = [f"Требование {i}" for i in range(bracket.current.group_count)]
+            restored = Bracket.from_state(bracket.to_state())
+            self.assertEqual(restored.to_state(), bracket.to_state(), strategy.name)
+            # Восстановленная сетка продолжает турнир так же, как исходная
+            for event in round_events(bracket, random.Random(9)):
+                bracket.apply(event)
+            for event in round_events(restored, random.Random(9)):
+                restored.apply(event)
+            self.assertEqual(restored.to_state(), bracket.to_state(), strategy.name)
+
+    def test_finalists(self):
+        for strategy in (KnockoutPairing, SeededPairing, PoolsPairing):
+            bracket, _ = played(13, strategy())
+            finalists = bracket.strategy.finalists(bracket)
+            self.assertEqual(finalists, list(bracket.current.group(0)), strategy.name)
+            self.assertEqual(bracket.current.group_count, 1, strategy.name)
+            self.assertIn(bracket.champion, finalists)
+        # В швейцарской системе финала нет: финалисты — верх таблицы, а не все участники тура
+        bracket, _ = played(13, SwissPairing())
+        finalists = bracket.strategy.finalists(bracket)
+        self.assertEqual(len(finalists), 2)
+        self.assertEqual(finalists[0], bracket.champion)
+        scores, _, _ = bracket.strategy.standings(bracket)
+        self.assertEqual(scores[finalists[0]], max(scores))
+
+    def test_pools_without_playoff(self):
+        bracket, _ = played(4, PoolsPairing(pool_size=4, advance=1))
+        finalists = bracket.strategy.finalists(bracket)
+        self.assertEqual(len(finalists), 2)
+        self.assertEqual(finalists[0], bracket.champion)
+
+    def test_events_replay_to_same_bracket(self):
+        for strategy in STRATEGIES:
+            bracket, events = played(17, strategy())
+            replayed = Bracket([])
+            for event in events:
+                replayed.apply(event)
+            self.assertEqual(replayed.to_state(), bracket.to_state(), strategy.name)
+            self.assertEqual(replayed.champion, bracket.champion)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""История турнира: отмена, повтор и состояние на любую прошлую позицию."""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bracket_history
+from bracket import NO_WINNER, Bracket, start_event
+from bracket_history import BracketHistory
+
+
+class HistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(1)
+        self.bracket = Bracket([])
+        self.history = BracketHistory()
+        self.journal = []  # События в том виде, в каком их записала бы вкладка
+        self.record([start_event([f"Участник {i}" for i in range(16)], rng=self.rng)], "do")
+
+    def record(self, events, step):
+        self.journal += self.history.record(self.bracket, events, step)
+
+    def choose(self, group, member=0):
+        participant = self.bracket.current.group(group)[member]
+        self.record([{"type": "winner", "round": self.bracket.round_number, "group": group, "id": participant}], "do")
+        return participant
+
+    def finish_round(self):
+        for group in range(self.bracket.current.group_count):
+            if self.bracket.current.winners[group] == NO_WINNER:
+                self.choose(group)
+        self.record([{"type": "advance"}], "do")
+
+    def test_start_is_not_undoable(self):
+        self.assertFalse(self.history.can_undo)
+        self.assertEqual(self.history.undo(self.bracket), [])
+
+    def test_undo_and_redo_winner(self):
+        before = self.bracket.to_state()
+        self.choose(0)
+        after = self.bracket.to_state()
+        self.journal += self.history.undo(self.bracket)
+        self.assertEqual(self.bracket.to_state(), before)
+        self.assertTrue(self.history.can_redo)
+        self.journal += self.history.redo(self.bracket)
+        self.assertEqual(self.bracket.to_state(), after)
+        self.assertFalse(self.history.can_redo)
+
+    def test_undo_advance_rewinds_round(self):
+        self.finish_round()
+        self.assertEqual(self.bracket.round_number, 2)
+        self.journal += self.history.undo(self.bracket)
+        self.assertEqual(self.bracket.round_number, 1)
+        self.assertNotIn(NO_WINNER, self.bracket.current.winners)
+        self.journal += self.history.undo(self.bracket)  # Последний выбор победителя
+        self.assertEqual(self.bracket.current.winners.count(NO_WINNER), 1)
+
+    def test_new_move_clears_redo(self):
+        self.choose(0)
+        self.history.undo(self.bracket)
+        self.choose(1)
+        self.assertFalse(self.history.can_redo)
+
+    def test_state_at_every_position(self):
+        states = [Bracket([]).to_state()]
+        bracket = Bracket([])
+        self.finish_round()
+        self.choose(0, 1)
+        self.journal += self.history.undo(self.bracket)
+        self.finish_round()
+        for event in self.journal:
+            bracket.apply(event)
+            states.append(bracket.to_state())
+        for position, state in enumerate(states):
+            self.assertEqual(self.history.state_at(position).to_state(), state, position)
+
+    def test_state_at_with_many_checkpoints(self):
+        original = bracket_history.CHECKPOINT_EVERY
+        bracket_history.CHECKPOINT_EVERY = 2
+        self.addCleanup(setattr, bracket_history, "CHECKPOINT_EVERY", original)
+        self.test_state_at_every_position()
+
+    def test_replay_restores_undo_and_redo_stacks(self):
+        self.finish_round()
+        self.choose(0)
+        self.choose(1)
+        self.journal += self.history.undo(self.bracket)
+        history, bracket = BracketHistory.replay([dict(event) for event in self.journal])
+        self.assertEqual(bracket.to_state(), self.bracket.to_state())
+        self.assertEqual(history.undo_stack, self.history.undo_stack)
+        self.assertEqual(history.redo_stack, self.history.redo_stack)
+        history.redo(bracket)
+        self.history.redo(self.bracket)
+        self.assertEqual(bracket.to_state(), self.bracket.to_state())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Журнал турнира: снимок и повтор событий восстанавливают ту же сетку."""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bracket import Bracket, start_event
+from journal import Journal, JournalWriter
+
+
+def restore(journal):
+    """Сетка из снимка и событий после него, как при загрузке вкладки."""
+    state, events = journal.load()
+    bracket = Bracket.from_state(state["bracket"]) if state else Bracket([])
+    for event in events:
+        bracket.apply(event)
+    return bracket
+
+
+def round_events(bracket, rng):
+    current = bracket.current
+    return [
+        {"type": "winner", "round": bracket.round_number, "group": index, "id": rng.choice(current.group(index))}
+        for index in range(current.group_count)
+    ] + [{"type": "advance"}]
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, True)
+        self.path = os.path.join(self.folder, "tournament.json")
+        self.rng = random.Random(1)
+        self.bracket = Bracket([])
+
+    def play(self, journal, rounds):
+        """Играет rounds раундов, записывая каждое событие в журнал."""
+        for _ in range(rounds):
+            for event in round_events(self.bracket, self.rng):
+                self.bracket.apply(event)
+                journal.append(event)
+
+    def start(self, journal, count=32):
+        event = start_event([f"Участник {i}" for i in range(count)], rng=self.rng)
+        self.bracket.apply(event)
+        journal.append(event)
+
+    def snapshot(self, journal):
+        journal.write_snapshot({"bracket": self.bracket.to_state()})
+
+    def test_replay_without_snapshot(self):
+        journal = Journal(self.path)
+        self.start(journal)
+        self.play(journal, 3)
+        journal.close_file()
+        self.assertEqual(restore(Journal(self.path)).to_state(), self.bracket.to_state())
+
+    def test_snapshot_then_events(self):
+        journal = Journal(self.path)
+        self.start(journal)
+        self.play(journal, 2)
+        self.snapshot(journal)
+        self.play(journal, 1)
+        journal.close_file()
+        reopened = Journal(self.path)
+        state, events = reopened.load()
+        self.assertEqual(len(events), self.bracket.rounds[2].group_count + 1)
+        self.assertEqual(restore(Journal(self.path)).to_state(), self.bracket.to_state())
+        # История читается с начала турнира, несмотря на снимок
+        self.assertEqual(reopened.read_history()[0]["type"], "start")
+
+    def test_background_writer_matches_direct_writes(self):
+        writer = JournalWriter()
+        self.addCleanup(writer.stop)
+        journal = Journal(self.path, snapshot_every=10, writer=writer)
+        self.start(journal)
+        for _ in range(3):
+            self.play(journal, 1)
+            if journal.needs_snapshot:
+                self.snapshot(journal)
+        journal.close()
+        writer.flush()
+        self.assertEqual(restore(Journal(self.path)).to_state(), self.bracket.to_state())
+
+    def test_torn_tail_is_dropped(self):
+        journal = Journal(self.path)
+        self.start(journal)
+        self.play(journal, 1)
+        journal.close_file()
+        with open(journal.journal_path, "a", encoding="utf-8") as file:
+            file.write('{"type": "winner", "rou')
+        reopened = Journal(self.path)
+        self.assertEqual(restore(reopened).to_state(), self.bracket.to_state())
+        # Новые события не склеиваются с отрезанным хвостом
+        self.play(reopened, 1)
+        reopened.close_file()
+        self.assertEqual(restore(Journal(self.path)).to_state(), self.bracket.to_state())
+
+    def test_failed_write_leaves_no_partial_line(self):
+        journal = Journal(self.path)
+        self.start(journal)
+        journal.close_file()
+
+        class BrokenFile:
+            def __init__(self, file):
+                self.file = file
+
+            def tell(self):
+                return self.file.tell()
+
+            def write(self, text):
+                self.file.write(text[:len(text) // 2])
+                self.file.flush()
+                raise OSError("Нет места на диске")
+
+            def close(self):
+                self.file.close()
+
+        journal.file = BrokenFile(open(journal.journal_path, "a", encoding="utf-8"))
+        events = round_events(self.bracket, self.rng)
+        with self.assertRaises(OSError):
+            journal.extend(events)
+        journal.extend(events)  # Повтор той же пачки
+        journal.close_file()
+        for event in events:
+            self.bracket.apply(event)
+        self.assertEqual(restore(Journal(self.path)).to_state(), self.bracket.to_state())
+
+
+if __name__ == "__main__":
+    unittest.main()
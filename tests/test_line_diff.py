@@ -0,0 +1,59 @@
+"""Построчная разница списков: правки всегда переводят старый список в новый."""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from line_diff import diff_lines
+
+
+def apply_edits(old, new, edits):
+    result = list(old)
+    for i1, i2, j1, j2 in reversed(edits):
+        result[i1:i2] = new[j1:j2]
+    return result
+
+
+class DiffLinesTest(unittest.TestCase):
+    def check(self, old, new):
+        edits = diff_lines(old, new)
+        self.assertEqual(apply_edits(old, new, edits), new)
+        return edits
+
+    def test_equal_lists(self):
+        self.assertEqual(self.check(["a", "b"], ["a", "b"]), [])
+        self.assertEqual(self.check([], []), [])
+
+    def test_single_edits_are_minimal(self):
+        old = [str(i) for i in range(1000)]
+        self.assertEqual(self.check(old, old[:500] + ["new"] + old[500:]), [(500, 500, 500, 501)])
+        self.assertEqual(self.check(old, old[:500] + old[501:]), [(500, 501, 500, 500)])
+        self.assertEqual(self.check(old, old[:500] + ["new"] + old[501:]), [(500, 501, 500, 501)])
+
+    def test_moved_line(self):
+        old = ["a", "b", "c", "d", "e"]
+        edits = self.check(old, ["b", "c", "d", "e", "a"])
+        self.assertEqual(sum(i2 - i1 for i1, i2, _, _ in edits), 1)
+
+    def test_empty_sides(self):
+        self.check([], ["a", "b"])
+        self.check(["a", "b"], [])
+
+    def test_duplicates_and_random_edits(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            old = [rng.choice("abcdefgh") for _ in range(rng.randrange(30))]
+            new = list(old)
+            for _ in range(rng.randrange(5)):
+                position = rng.randrange(len(new) + 1)
+                if new and rng.random() < 0.5:
+                    del new[min(position, len(new) - 1)]
+                else:
+                    new.insert(position, rng.choice("abcdefghxyz"))
+            self.check(old, new)
+
+
+if __name__ == "__main__":
+    unittest.main()
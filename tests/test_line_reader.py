@@ -0,0 +1,55 @@
+"""Чтение списков: концы строк как при построчном чтении файла в текстовом режиме."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from line_reader import iter_line_batches, read_lines
+
+
+class LineReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, True)
+        self.path = os.path.join(self.folder, "names.txt")
+
+    def write(self, data):
+        with open(self.path, "wb") as file:
+            file.write(data)
+
+    def expected(self):
+        """Строки, как их читает обычный построчный цикл по файлу."""
+        with open(self.path, "r", encoding="utf-8-sig") as file:
+            return [line.strip() for line in file if line.strip()]
+
+    def read(self, chunk_size):
+        lines = []
+        for batch, _, _ in iter_line_batches(self.path, batch_interval=float("inf"), chunk_size=chunk_size):
+            lines.extend(batch)
+        return lines
+
+    def test_universal_newlines(self):
+        self.write("\ufeffАнна\r\nБорис\rВера\nГалина\r\r\nДмитрий \x0bи\x85 Ко \n\nЕлена".encode("utf-8"))
+        self.assertEqual(read_lines(self.path), self.expected())
+        self.assertIn("Дмитрий \x0bи\x85 Ко", read_lines(self.path))
+
+    def test_chunk_boundaries(self):
+        endings = ("\r\n", "\r", "\n")
+        self.write("".join(f"Имя {i}" + endings[i % 3] for i in range(200)).encode("utf-8"))
+        expected = self.expected()
+        self.assertEqual(len(expected), 200)
+        for chunk_size in (1, 2, 3, 5, 7, 64, 1 << 20):
+            self.assertEqual(self.read(chunk_size), expected, chunk_size)
+
+    def test_progress_reaches_file_size(self):
+        self.write(b"a\r\nb\rc")
+        batches = list(iter_line_batches(self.path, batch_size=1, chunk_size=2))
+        self.assertEqual([line for batch, _, _ in batches for line in batch], ["a", "b", "c"])
+        self.assertEqual(batches[-1][1:], (6, 6))
+
+
+if __name__ == "__main__":
+    unittest.main()
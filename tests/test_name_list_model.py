@@ -0,0 +1,58 @@
+"""Модель списка имён: правка по разнице даёт тот же список, что и загрузка заново."""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+try:
+    from PyQt5.QtWidgets import QApplication
+except ImportError:  # Модель построена на Qt; без PyQt5 проверять нечего
+    QApplication = None
+
+
+# Приложение одно на весь запуск тестов, и вкладкам турнира нужно QApplication, а не QCoreApplication
+@unittest.skipIf(QApplication is None, "PyQt5 не установлен")
+class ApplyLinesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def fresh(self, lines):
+        from name_list_model import CheckableNameListModel
+        model = CheckableNameListModel()
+        collisions = model.append_names(lines)
+        return model, collisions
+
+    def check(self, old, new):
+        model, _ = self.fresh(old)
+        collisions = model.apply_lines(new)
+        loaded, loaded_collisions = self.fresh(new)
+        self.assertEqual(model.names, loaded.names, (old, new))
+        self.assertEqual(model.keys, loaded.keys)
+        self.assertEqual(collisions, loaded_collisions)
+        self.assertEqual(sorted(model.name_index.names), sorted(loaded.name_index.names))
+
+    def test_duplicate_moved_before_original(self):
+        self.check(["Борис", "Анна"], ["Анна", "Борис", "Анна"])
+        self.check(["Анна", "Борис"], ["борис", "Анна", "Борис"])
+
+    def test_random_edits_with_duplicates(self):
+        rng = random.Random(3)
+        pool = ["Анна", "анна", "Борис", "Вера", "Галина", " Вера ", "Дмитрий"]
+        for _ in range(300):
+            old = [rng.choice(pool) for _ in range(rng.randrange(10))]
+            new = [rng.choice(pool) for _ in range(rng.randrange(10))]
+            self.check(old, new)
+
+    def test_checked_rows_survive(self):
+        model, _ = self.fresh(["Анна", "Борис", "Вера"])
+        model.checked[1] = 1
+        model.apply_lines(["Вера", "Анна", "Борис", "Галина"])
+        self.assertEqual([name for name, mark in zip(model.names, model.checked) if mark], ["Борис"])
+
+
+if __name__ == "__main__":
+    unittest.main()
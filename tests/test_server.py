@@ -0,0 +1,207 @@
+"""Сетевой режим на localhost: сервер на свободном порту, клиенты на asyncio."""
+import asyncio
+import base64
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server as server_module
+from bracket import KnockoutPairing
+from journal import Journal, JournalWriter
+from server import TournamentServer
+
+NAMES = [f"Участник {i}" for i in range(16)]
+
+
+async def request(port, method, path, payload=None, key=None):
+    """Один запрос в отдельном соединении; (статус, разобранное тело ответа)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    head = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Content-Length: {len(body)}", "Connection: close"]
+    if key is not None:
+        head.append(f"Idempotency-Key: {key}")
+    writer.write("\r\n".join(head).encode("latin-1") + b"\r\n\r\n" + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status_line, _, rest = response.partition(b"\r\n")
+    _, _, data = rest.partition(b"\r\n\r\n")
+    return int(status_line.split()[1]), json.loads(data)
+
+
+async def open_websocket(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    writer.write((
+        "GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+    ).encode("latin-1"))
+    head = await reader.readuntil(b"\r\n\r\n")
+    if not head.startswith(b"HTTP/1.1 101"):
+        raise AssertionError(head)
+    return reader, writer
+
+
+async def read_message(reader):
+    """Текстовый кадр сервера (сервер не маскирует кадры) в виде разобранного JSON."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length = int.from_bytes(await reader.readexactly(2), "big")
+    elif length == 127:
+        length = int.from_bytes(await reader.readexactly(8), "big")
+    if first & 0x0F != 0x1:
+        raise AssertionError(f"Ожидался текстовый кадр, получен {first:#x}")
+    return json.loads(await reader.readexactly(length))
+
+
+def replay(path):
+    """Сетка, восстановленная из файлов турнира так же, как при перезапуске сервера."""
+    journal = Journal(path)
+    restored = TournamentServer("test", journal, None, None, log=lambda text: None)
+    restored.open([])
+    journal.close(remove_lock=True)
+    return restored.bracket
+
+
+class ServerTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, True)
+        self.path = os.path.join(self.folder, "tournament.json")
+        self.server = TournamentServer("test", None, None, None, log=lambda text: None)
+        self.writer = JournalWriter(on_error=self.server.journal_write_failed)
+        self.journal = Journal(self.path, writer=self.writer)
+        self.server.journal = self.journal
+        self.server.open(NAMES, KnockoutPairing(), random.Random(1))
+        self.port = await self.server.start("127.0.0.1", 0)
+        self.stopped = False
+
+    async def asyncTearDown(self):
+        await self.shutdown()
+
+    async def shutdown(self):
+        if self.stopped:
+            return
+        self.stopped = True
+        await self.server.stop()
+        if self.server.journal is not None:
+            self.server.journal.close(remove_lock=True)
+        self.writer.stop()
+
+    def group_members(self, index):
+        return self.server.bracket.groups()[index]
+
+    async def choose_all(self, round_number, key_prefix=None):
+        groups = self.server.bracket.groups()
+        replies = await asyncio.gather(*(
+            request(
+                self.port, "POST", f"/rounds/{round_number}/groups/{index + 1}/winner", {"winner": members[-1]},
+                key=None if key_prefix is None else f"{key_prefix}-{index}",
+            )
+            for index, members in enumerate(groups)
+        ))
+        return groups, replies
+
+    async def test_concurrent_winners_are_all_recorded(self):
+        groups, replies = await self.choose_all(1, "w")
+        self.assertEqual([status for status, _ in replies], [200] * len(groups))
+        self.assertEqual(self.server.missing, 0)
+        self.assertEqual(self.server.bracket.winner_names(), [members[-1] for members in groups])
+        status, body = await request(self.port, "GET", "/bracket")
+        self.assertEqual(status, 200)
+        self.assertEqual([group["winner"] for group in body["groups"]], [members[-1] for members in groups])
+
+    async def test_idempotent_replay_returns_same_reply(self):
+        members = self.group_members(0)
+        path = "/rounds/1/groups/1/winner"
+        first = await request(self.port, "POST", path, {"winner": members[0]}, key="k")
+        self.assertEqual(first[0], 200)
+        # Повтор с тем же ключом не меняет турнир, даже если с тех пор победитель заменён
+        replaced = await request(self.port, "POST", path, {"winner": members[1], "replace": True}, key="other")
+        self.assertEqual(replaced[0], 200)
+        self.assertEqual(await request(self.port, "POST", path, {"winner": members[0]}, key="k"), first)
+        self.assertEqual(self.server.bracket.winner_names(), [members[1]])
+        status, _ = await request(self.port, "POST", path, {"winner": members[1]}, key="k")
+        self.assertEqual(status, 422)
+
+    async def test_conflicts(self):
+        members = self.group_members(0)
+        path = "/rounds/1/groups/1/winner"
+        self.assertEqual((await request(self.port, "POST", path, {"winner": members[0]}))[0], 200)
+        status, body = await request(self.port, "POST", path, {"winner": members[1]})
+        self.assertEqual(status, 409, body)
+        status, body = await request(self.port, "POST", "/rounds/1/advance", {})
+        self.assertEqual(status, 409, body)  # Не во всех группах выбран победитель
+        status, body = await request(self.port, "POST", "/rounds/2/groups/1/winner", {"winner": members[0]})
+        self.assertEqual(status, 409, body)
+        self.assertEqual(self.server.bracket.winner_names(), [members[0]])
+
+    async def test_websocket_receives_round_updates(self):
+        reader, writer = await open_websocket(self.port)
+        try:
+            message = await read_message(reader)
+            self.assertEqual((message["type"], message["round"], message["missing"]), ("bracket", 1, 8))
+            groups, _ = await self.choose_all(1)
+            winners = [await read_message(reader) for _ in groups]
+            self.assertEqual({message["type"] for message in winners}, {"winner"})
+            self.assertEqual(sorted(message["missing"] for message in winners), list(range(len(groups))))
+            status, body = await request(self.port, "POST", "/rounds/1/advance", {})
+            self.assertEqual((status, body["round"]), (200, 2))
+            message = await read_message(reader)
+            self.assertEqual((message["type"], message["round"]), ("bracket", 2))
+            self.assertEqual(
+                [group["members"] for group in message["groups"]], self.server.bracket.groups()
+            )
+        finally:
+            writer.close()
+
+    async def test_journal_replays_to_same_bracket(self):
+        for round_number in (1, 2):
+            await self.choose_all(round_number, f"r{round_number}")
+            status, _ = await request(self.port, "POST", f"/rounds/{round_number}/advance", {}, key=f"a{round_number}")
+            self.assertEqual(status, 200)
+        await self.choose_all(3)
+        await self.shutdown()
+        self.assertEqual(replay(self.path).to_state(), self.server.bracket.to_state())
+
+    async def test_retry_after_failed_write_persists_winner(self):
+        original = self.journal.write_lines
+        failures = []
+
+        def write_lines(text):
+            if not failures:
+                failures.append(text)
+                raise OSError("Нет места на диске")
+            return original(text)
+
+        self.journal.write_lines = write_lines
+        winner = self.group_members(0)[0]
+        with mock.patch.object(server_module, "RETRY_INTERVAL", 0.05):
+            status, body = await request(self.port, "POST", "/rounds/1/groups/1/winner", {"winner": winner}, key="a")
+            self.assertEqual(status, 503, body)
+            self.assertEqual(self.server.missing, 7)  # Выбор остался в памяти и будет записан повторно
+
+            status, body = await request(self.port, "POST", "/rounds/1/groups/1/winner", {"winner": winner}, key="a")
+            self.assertEqual(status, 200, body)
+            self.assertEqual(body["winner"], winner)
+            # Повтор без ключа тоже подтверждает только записанный выбор
+            status, body = await request(self.port, "POST", "/rounds/1/groups/1/winner", {"winner": winner})
+            self.assertEqual(status, 200, body)
+
+        await self.shutdown()
+        self.assertEqual(len(failures), 1)
+        restored = replay(self.path)
+        self.assertEqual(restored.winner_names()[0], winner)
+        self.assertEqual(restored.to_state(), self.server.bracket.to_state())
+
+
+if __name__ == "__main__":
+    unittest.main()
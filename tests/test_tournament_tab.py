@@ -0,0 +1,93 @@
+"""Вкладка турнира: переход к следующему этапу — одна запись журнала, отмена по ходам."""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+try:
+    from PyQt5.QtWidgets import QApplication
+except ImportError:  # Вкладка построена на Qt; без PyQt5 проверять нечего
+    QApplication = None
+
+from bracket import NO_WINNER
+from journal import Journal
+from requirement_pool import RequirementPool
+
+
+class CountingJournal(Journal):
+    """Журнал, запоминающий каждую пачку, отданную на запись."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.batches = []
+
+    def extend(self, events):
+        if events:
+            self.batches.append([event["type"] for event in events])
+        super().extend(events)
+
+
+class FakeApp:
+    def __init__(self, requirements):
+        self.requirements = requirements
+
+    def get_checked_requirements(self):
+        return self.requirements
+
+
+@unittest.skipIf(QApplication is None, "PyQt5 не установлен")
+class NextRoundTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+
+    def setUp(self):
+        from tournament_tab import TournamentTab
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder, True)
+        self.journal = CountingJournal(os.path.join(folder, "tournament.json"))
+        requirements = [f"Требование {i}" for i in range(20)]
+        self.tab = TournamentTab(FakeApp(requirements), "test", self.journal)
+        self.tab.start([f"Участник {i}" for i in range(8)], None, RequirementPool(requirements, random.Random(1)))
+
+    def choose_all(self):
+        model = self.tab.results_panel.model
+        for row in range(model.rowCount()):
+            model.set_winner_at(row, 0)
+
+    def test_next_round_is_one_write(self):
+        self.assertEqual(self.journal.batches, [["start", "requirements"]])
+        self.choose_all()
+        self.tab.next_round_selection()
+        self.assertEqual(self.journal.batches[1], ["winner"] * 4 + ["advance", "requirements"])
+        self.assertEqual(len(self.journal.batches), 2)
+        self.assertEqual(self.tab.bracket.round_number, 2)
+
+    def test_undo_steps_unchanged(self):
+        self.choose_all()
+        self.tab.next_round_selection()
+        self.tab.undo()  # Переход вместе с требованиями нового раунда
+        self.assertEqual(self.tab.bracket.round_number, 1)
+        self.assertNotIn(NO_WINNER, self.tab.bracket.current.winners)
+        self.tab.undo()  # Победители раунда
+        self.assertEqual(self.tab.bracket.current.winners.count(NO_WINNER), 4)
+        self.assertFalse(self.tab.history.can_undo)
+        self.tab.redo()
+        self.tab.redo()
+        self.assertEqual(self.tab.bracket.round_number, 2)
+        self.assertIsNotNone(self.tab.bracket.current.requirements[0])
+
+        from tournament_tab import read_saved_tournament
+        self.journal.close_file()
+        saved = read_saved_tournament(self.journal)
+        self.assertEqual(saved["bracket"].to_state(), self.tab.bracket.to_state())
+        self.assertEqual(saved["history"].undo_stack, self.tab.history.undo_stack)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,354 @@
+"""Вкладка одного турнира: протокол, форма сетки, результаты раунда и свой журнал.
+
+Турниров может быть открыто несколько; у каждого свой идентификатор и свои
+файлы снимка и журнала (см. journal.py), а запись идёт через общий фоновый
+поток, поэтому ход одного турнира не задерживает остальные. Ходы можно
+отменять и повторять, а ползунком истории — смотреть турнир на любой
+прошлый момент (см. bracket_history.py).
+"""
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import (
+    QHBoxLayout, QLabel, QMessageBox, QPushButton, QShortcut, QSlider, QSpinBox, QTextEdit, QVBoxLayout, QWidget
+)
+
+from bracket import Bracket, start_event
+from bracket_history import BracketHistory
+from instrumentation import timed
+from requirement_pool import RequirementPool, used_requirements
+from results_panel import RoundResultsPanel
+from round_log import format_round, format_winners, format_champion, format_schedule, render_log
+
+
+class TournamentTab(QWidget):
+    def __init__(self, app, tournament_id, journal, parent=None):
+        super().__init__(parent)
+        self.app = app
+        self.tournament_id = tournament_id
+        self.journal = journal
+        self.participants = []
+        self.bracket = None
+        self.history = None  # История ходов; None, пока турнир не начат или после его завершения
+        self.preview_position = None  # Позиция истории на экране; None — текущее состояние
+        self.requirement_pool = None  # Порядок выдачи требований турнира
+
+        layout = QVBoxLayout()
+        self.schedule_label = QLabel()
+        layout.addWidget(self.schedule_label)
+
+        self.round_display = QTextEdit()
+        self.round_display.setReadOnly(True)
+        layout.addWidget(self.round_display)
+
+        # Результаты текущего раунда: победители выбираются в таблице и записываются пачкой
+        self.results_panel = RoundResultsPanel()
+        layout.addWidget(self.results_panel)
+
+        self.next_round_button = QPushButton("Следующий этап")
+        self.next_round_button.clicked.connect(lambda: self.next_round_selection())
+        self.next_round_button.setEnabled(False)
+        layout.addWidget(self.next_round_button)
+
+        # История: отмена и повтор ходов, просмотр прошлого по позиции или по раунду и группе
+        history_row = QHBoxLayout()
+        self.undo_button = QPushButton("Отменить ход")
+        self.undo_button.clicked.connect(lambda: self.undo())
+        history_row.addWidget(self.undo_button)
+        self.redo_button = QPushButton("Повторить ход")
+        self.redo_button.clicked.connect(lambda: self.redo())
+        history_row.addWidget(self.redo_button)
+        self.history_slider = QSlider(Qt.Horizontal)
+        self.history_slider.setTracking(False)  # Прошлое строится, когда ползунок отпущен
+        self.history_slider.valueChanged.connect(self.preview)
+        history_row.addWidget(self.history_slider, 1)
+        self.round_spin = QSpinBox()
+        self.round_spin.setPrefix("Раунд ")
+        self.round_spin.setMinimum(1)
+        self.round_spin.valueChanged.connect(self.update_group_range)
+        history_row.addWidget(self.round_spin)
+        self.group_spin = QSpinBox()
+        self.group_spin.setPrefix("Группа ")
+        self.group_spin.setSpecialValueText("Весь раунд")
+        history_row.addWidget(self.group_spin)
+        jump_button = QPushButton("Показать")
+        jump_button.clicked.connect(lambda: self.jump_to_round())
+        history_row.addWidget(jump_button)
+        layout.addLayout(history_row)
+        self.history_label = QLabel()
+        layout.addWidget(self.history_label)
+        for keys, slot in ((QKeySequence.Undo, self.undo), (QKeySequence.Redo, self.redo)):
+            shortcut = QShortcut(keys, self)
+            shortcut.setContext(Qt.WidgetWithChildrenShortcut)  # Только во вкладке с фокусом
+            shortcut.activated.connect(slot)
+        self.setLayout(layout)
+        self.update_history_controls()
+
+    @property
+    def is_active(self):
+        return self.bracket is not None and bool(self.bracket.rounds) and not self.bracket.is_finished
+
+    @timed("tournament.save_state")
+    def save_tournament_state(self):
+        state = {
+            "id": self.tournament_id,
+            "participants": self.participants,
+            "bracket": self.bracket.to_state() if self.bracket else None,
+            "current_round_number": self.bracket.round_number if self.bracket else 0  # Номер текущего раунда
+        }
+        self.journal.write_snapshot(state)
+
+    @timed("tournament.record")
+    def write_events(self, events):
+        """Ставит события, уже применённые через self.history.record, в очередь записи одной записью журнала."""
+        self.journal.extend(events)
+        if self.journal.needs_snapshot:
+            self.save_tournament_state()
+        if any(event["type"] in ("start", "advance", "rewind") for event in events):
+            self.show_schedule()
+        self.update_history_controls()
+
+    @timed("tournament.log_append")
+    def log(self, text):
+        """Добавляет в протокол на экране готовый фрагмент одним обновлением документа."""
+        self.round_display.append(text)
+
+    @timed("tournament.restore")
+    def restore(self, saved):
+        """Показывает турнир, прочитанный read_saved_tournament (в том числе в фоновом потоке)."""
+        self.participants = saved["participants"]
+        self.bracket = saved["bracket"]
+        self.history = saved["history"] if self.is_active else None
+        self.round_display.setPlainText(saved["log"])
+        self.results_panel.set_round(self.bracket)
+        self.show_schedule()
+        self.next_round_button.setEnabled(self.is_active)
+        self.update_history_controls()
+
+    def start(self, participants, strategy, pool):
+        """Начинает турнир: первый раунд и требования к нему."""
+        self.participants = participants
+        self.bracket = Bracket([])
+        self.history = BracketHistory()
+        self.requirement_pool = pool
+        self.next_round_button.setEnabled(True)
+        self.display_round(self.history.record(self.bracket, [start_event(participants, strategy=strategy)], "do"))
+
+    def clear(self):
+        """Удаляет файлы турнира и освобождает его блокировку."""
+        self.journal.clear()
+        self.journal.close(remove_lock=True)
+        self.bracket = None
+        self.history = None
+        self.requirement_pool = None
+        self.next_round_button.setEnabled(False)
+        self.update_history_controls()
+
+    @timed("tournament.display_round")
+    def display_round(self, events=()):
+        """Выдаёт требования текущему раунду и показывает его.
+
+        events — уже записанные в историю события хода, который привёл к
+        этому раунду: они уходят в журнал одной записью вместе с требованиями.
+        """
+        events = list(events)
+        if self.requirement_pool is None:
+            # После перезапуска пул собирается заново без уже выданных требований
+            self.requirement_pool = RequirementPool(
+                self.app.get_checked_requirements(), exclude=used_requirements(self.bracket)
+            )
+        try:
+            requirements = self.requirement_pool.deal(self.bracket.current)
+        except ValueError as e:
+            self.write_events(events)
+            QMessageBox.warning(self, "Ошибка", f"Недостаточно требований для всех групп раунда: {e}")
+            self.results_panel.set_round(self.bracket)
+            return
+
+        events += self.history.record(self.bracket, [{
+            "type": "requirements",
+            "round": self.bracket.round_number,
+            "requirements": requirements,
+        }])
+        self.write_events(events)
+
+        self.log(format_round(self.bracket))
+        self.results_panel.set_round(self.bracket)
+
+    def show_schedule(self):
+        if self.is_active:
+            self.schedule_label.setText(format_schedule(self.bracket.schedule, self.bracket.round_number - 1))
+        else:
+            self.schedule_label.clear()
+
+    @timed("tournament.next_round")
+    def next_round_selection(self):
+        try:
+            results = self.results_panel.model
+            missing = results.first_missing()
+            if missing is not None:
+                self.results_panel.select_group(missing)
+                QMessageBox.warning(
+                    self, "Ошибка",
+                    f"Не выбран победитель в группе {missing + 1} (всего групп без победителя: {results.missing_count()})"
+                )
+                return
+
+            # Победители и переход — разные ходы: отмена перехода возвращает раунд с выбранными победителями.
+            # В журнал оба хода и требования нового раунда уходят одной записью (см. display_round)
+            names = self.bracket.names
+            self.log(format_winners([names[winner] for winner in results.winners]))
+            events = self.history.record(self.bracket, results.winner_events(), "do")
+            events += self.history.record(self.bracket, [{"type": "advance"}], "do")
+
+            if self.bracket.is_finished:
+                self.write_events(events)
+                self.log(format_champion(self.bracket.names[self.bracket.champion]))
+                self.next_round_button.setEnabled(False)
+                self.history = None  # Завершённый турнир уже в отчётах, его журнал удаляется
+                self.update_history_controls()
+
+                # Сохраняем завершённый турнир в отчётах
+                self.app.report_index.add_report(self.participants, self.bracket)
+
+                self.journal.clear()
+                self.journal.close(remove_lock=True)
+                self.results_panel.set_round(None)
+                self.app.tournament_finished(self)
+            else:
+                self.display_round(events)
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка при выборе победителей: {e}")
+
+    # История ходов
+
+    def undo(self):
+        """Отменяет последний ход: отменяющие события пишутся в журнал как обычные."""
+        if self.history is not None and self.preview_position is None:
+            self.apply_history_step(self.history.undo(self.bracket))
+
+    def redo(self):
+        if self.history is not None and self.preview_position is None:
+            self.apply_history_step(self.history.redo(self.bracket))
+
+    @timed("tournament.history_step")
+    def apply_history_step(self, events):
+        if not events:
+            return
+        self.write_events(events)
+        # Пул собирается заново: требования отменённых раундов снова доступны
+        self.requirement_pool = None
+        self.round_display.setPlainText(render_log(self.bracket))
+        self.results_panel.set_round(self.bracket)
+        self.next_round_button.setEnabled(self.is_active)
+
+    @timed("tournament.history_preview")
+    def preview(self, position):
+        """Показывает турнир на позицию истории; последняя позиция — текущее состояние."""
+        if self.history is None:
+            return
+        if position >= self.history.position:
+            if self.preview_position is None:
+                return
+            self.preview_position = None
+            self.round_display.setPlainText(render_log(self.bracket))
+        else:
+            self.preview_position = position
+            self.round_display.setPlainText(render_log(self.history.state_at(position)))
+        live = self.preview_position is None
+        self.results_panel.setEnabled(live)
+        self.next_round_button.setEnabled(live and self.is_active)
+        self.update_history_controls()
+
+    def jump_to_round(self):
+        """Показывает конец выбранного раунда или момент выбора победителя выбранной группы."""
+        if self.history is None:
+            return
+        round_number, group = self.round_spin.value(), self.group_spin.value()
+        if group:
+            position = self.history.group_position(round_number, group - 1)
+            if position is None:
+                QMessageBox.information(
+                    self, "История", f"В группе {group} раунда {round_number} победитель ещё не выбирался."
+                )
+                return
+        else:
+            position = self.history.round_end(round_number)
+        self.history_slider.setValue(position)
+
+    def update_group_range(self):
+        if self.bracket is not None and self.bracket.rounds:
+            round_number = min(self.round_spin.value(), self.bracket.round_number)
+            self.group_spin.setMaximum(self.bracket.rounds[round_number - 1].group_count)
+
+    def update_history_controls(self):
+        history = self.history
+        live = self.preview_position is None
+        self.undo_button.setEnabled(history is not None and live and history.can_undo)
+        self.redo_button.setEnabled(history is not None and live and history.can_redo)
+        for widget in (self.history_slider, self.round_spin, self.group_spin):
+            widget.setEnabled(history is not None)
+        if history is None:
+            self.history_label.clear()
+            return
+        self.history_slider.blockSignals(True)
+        self.history_slider.setRange(0, history.position)
+        self.history_slider.setValue(history.position if live else self.preview_position)
+        self.history_slider.blockSignals(False)
+        self.round_spin.setMaximum(self.bracket.round_number)
+        self.update_group_range()
+        if live:
+            self.history_label.setText(f"Событий в истории: {history.position}")
+        else:
+            self.history_label.setText(
+                f"Просмотр прошлого: раунд {history.round_count_at(self.preview_position)}, "
+                f"событие {self.preview_position} из {history.position}"
+            )
+
+
+@timed("tournament.load")
+def read_saved_tournament(journal):
+    """Читает турнир из снимка и журнала без обращения к интерфейсу.
+
+    Возвращает словарь с участниками, сеткой и текстом протокола или None,
+    если сохранять нечего. Не трогает виджеты, поэтому может выполняться в
+    фоновом потоке, пока окно уже показано.
+    """
+    state, events = journal.load()
+    if state is None and not events:
+        return None
+    state = state or {}
+    participants = state.get("participants", [])
+    if state.get("bracket"):
+        bracket = Bracket.from_state(state["bracket"])
+    elif state.get("next_round"):
+        # Состояние старого формата: группы хранились списками имён
+        bracket = Bracket.from_groups(state["next_round"])
+    else:
+        bracket = None
+
+    # Дополняем снимок событиями из журнала
+    for event in events:
+        if event["type"] == "log":
+            continue  # Текст протокола теперь строится по сетке
+        if event["type"] == "start":
+            participants = event["names"]
+            bracket = Bracket([])
+        bracket.apply(event)
+
+    if state.get("round_display") and not state.get("bracket") and not events:
+        # Старый формат: сохранён только готовый текст протокола
+        log = state["round_display"]
+    else:
+        log = render_log(bracket)
+    return {"participants": participants, "bracket": bracket, "log": log, "history": read_history(journal, bracket)}
+
+
+@timed("tournament.load_history")
+def read_history(journal, bracket):
+    """История ходов из журнала; если журнал сохранился не с начала турнира, история начинается с bracket."""
+    if bracket is None:
+        return None
+    events = journal.read_history()
+    if events and events[0]["type"] == "start" and events[0]["seq"] == 1:
+        return BracketHistory.replay(events)[0]
+    return BracketHistory(bracket)